@@ -56,6 +56,9 @@ echo "Installing/updating dependencies from ${REQUIREMENTS_FILE}..."
 pip install -r "${REQUIREMENTS_FILE}"
 echo "Dependencies installed."
 
+echo "Building static assets (fingerprinted and precompressed files)..."
+python "${PROJECT_ROOT}/backend/static_assets.py"
+
 deactivate
 echo "Deactivated virtual environment for script context."
 
@@ -1,10 +1,16 @@
 import os
 import json
+import time
 import logging
+import threading
 from pathlib import Path
 from cryptography.fernet import Fernet, InvalidToken
 import msal
 
+from utils import http_client
+from utils.metrics import upstream_call
+from utils.resilience import TIMEOUTS
+
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
@@ -24,39 +30,104 @@ def _decrypt_token(data):
 def _encrypt_token(data):
     return _get_fernet().encrypt(json.dumps(data).encode())
 
-def load_onedrive_credentials():
-    if not CLIENT_SECRET_ENV:
-        raise ValueError("Missing ONEDRIVE_CREDENTIALS_JSON environment variable.")
-
-    creds = json.loads(CLIENT_SECRET_ENV)
-    client_id = creds["client_id"]
-    tenant_id = creds["tenant_id"]
-    client_secret = creds["client_secret"]
-    scopes = creds.get("scopes", ["https://graph.microsoft.com/.default"])
-    authority = f"https://login.microsoftonline.com/{tenant_id}"
-
-    # Try decrypting existing token first
-    if TOKEN_PATH.exists():
-        try:
-            token_data = _decrypt_token(TOKEN_PATH.read_bytes())
-            if "access_token" in token_data:
-                logger.info("🔐 Loaded OneDrive token from encrypted file.")
-                return token_data["access_token"]
-        except InvalidToken:
-            logger.warning("⚠️ Token decryption failed — reauth required.")
-
-    # Request new token with client credentials
-    app = msal.ConfidentialClientApplication(
-        client_id=client_id,
-        client_credential=client_secret,
-        authority=authority
-    )
-
-    result = app.acquire_token_for_client(scopes=scopes)
-
-    if "access_token" not in result:
-        raise Exception(f"Failed to get OneDrive token: {result.get('error_description')}")
+# Refresh in the background once the token is this close to expiring, and block
+# callers for a refresh only when it is about to expire for real.
+REFRESH_AHEAD_SECONDS = 300
+EXPIRY_SKEW_SECONDS = 60
+
+# Decrypted token kept in memory: {"access_token": ..., "expires_at": epoch seconds}
+_token = None
+_msal_app = None
+_scopes = None
+_token_lock = threading.Lock()
+_refresh_in_progress = False
+
+def _get_msal_app():
+    """Builds the MSAL client once; it also keeps MSAL's own in-memory token cache."""
+    global _msal_app, _scopes
+    if _msal_app is None:
+        if not CLIENT_SECRET_ENV:
+            raise ValueError("Missing ONEDRIVE_CREDENTIALS_JSON environment variable.")
+
+        creds = json.loads(CLIENT_SECRET_ENV)
+        _scopes = creds.get("scopes", ["https://graph.microsoft.com/.default"])
+        _msal_app = msal.ConfidentialClientApplication(
+            client_id=creds["client_id"],
+            client_credential=creds["client_secret"],
+            authority=f"https://login.microsoftonline.com/{creds['tenant_id']}",
+            timeout=TIMEOUTS["token"],
+            http_client=http_client.new_session(),
+        )
+    return _msal_app
+
+def _seconds_left(token):
+    return token["expires_at"] - time.time() if token else 0
+
+def _load_token_file():
+    """Reads the encrypted token file, working out its expiry for older files without one."""
+    if not TOKEN_PATH.exists():
+        return None
+    try:
+        token_data = _decrypt_token(TOKEN_PATH.read_bytes())
+    except InvalidToken:
+        logger.warning("⚠️ Token decryption failed — reauth required.")
+        return None
+    if "access_token" not in token_data:
+        return None
+    if "expires_at" not in token_data:
+        token_data["expires_at"] = TOKEN_PATH.stat().st_mtime + int(token_data.get("expires_in", 0))
+    logger.info("🔐 Loaded OneDrive token from encrypted file.")
+    return {"access_token": token_data["access_token"], "expires_at": token_data["expires_at"]}
+
+def _acquire_token():
+    """Gets a fresh token with client credentials and persists it encrypted."""
+    with upstream_call("onedrive_token"):
+        result = _get_msal_app().acquire_token_for_client(scopes=_scopes)
+        if "access_token" not in result:
+            raise Exception(f"Failed to get OneDrive token: {result.get('error_description')}")
 
+    result["expires_at"] = time.time() + int(result.get("expires_in", 3600))
     TOKEN_PATH.write_bytes(_encrypt_token(result))
     logger.info("✅ New OneDrive token saved and encrypted.")
-    return result["access_token"]
+    return {"access_token": result["access_token"], "expires_at": result["expires_at"]}
+
+def _background_refresh():
+    global _token, _refresh_in_progress
+    try:
+        token = _acquire_token()
+        with _token_lock:
+            _token = token
+    except Exception as e:
+        logger.error(f"❌ Background OneDrive token refresh failed: {e}")
+    finally:
+        _refresh_in_progress = False
+
+def get_onedrive_token():
+    """
+    Returns a valid OneDrive access token, from memory whenever possible.
+
+    Inside the refresh-ahead window the current token is returned while a single
+    background refresh runs. Only a token that is about to expire makes the caller
+    wait, and concurrent callers share that one refresh.
+    """
+    global _token, _refresh_in_progress
+    token = _token
+    seconds_left = _seconds_left(token)
+    if seconds_left > REFRESH_AHEAD_SECONDS:
+        return token["access_token"]
+
+    with _token_lock:
+        if _token is None:
+            _token = _load_token_file()
+        seconds_left = _seconds_left(_token)
+
+        if seconds_left <= EXPIRY_SKEW_SECONDS:
+            _token = _acquire_token()
+        elif seconds_left <= REFRESH_AHEAD_SECONDS and not _refresh_in_progress:
+            _refresh_in_progress = True
+            threading.Thread(target=_background_refresh, name="onedrive-token-refresh", daemon=True).start()
+        return _token["access_token"]
+
+def load_onedrive_credentials():
+    """Kept for older callers; same as get_onedrive_token()."""
+    return get_onedrive_token()
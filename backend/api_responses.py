@@ -0,0 +1,132 @@
+# kitchen_dashboard/backend/api_responses.py
+
+import functools
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+from flask import Blueprint, current_app, request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson  # Optional: several times faster than the json module
+except ImportError:
+    orjson = None
+
+GZIP_MIN_SIZE = 500  # bytes; smaller bodies are not worth compressing
+GZIP_LEVEL = 6
+MAX_CACHED_BODIES = 128  # Serialized payloads kept per worker, by ETag
+
+api_responses = Blueprint('api_responses', __name__)
+
+_bodies = OrderedDict()  # ETag -> {'identity': bytes, 'gzip': bytes or None}
+_bodies_lock = threading.Lock()
+
+
+class CompactJSONProvider(DefaultJSONProvider):
+    """
+    Compact, unsorted JSON, also in debug mode. Uses orjson when it is installed;
+    dates and dataclasses are still converted the way Flask does it.
+    """
+    compact = True
+    sort_keys = False
+    ensure_ascii = False
+
+    if orjson is not None:
+        OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+        def dumps(self, obj, **kwargs):
+            if set(kwargs) - {'separators'}:
+                return super().dumps(obj, **kwargs)
+            return orjson.dumps(obj, default=self.default, option=self.OPTIONS).decode()
+
+
+def _etag(version):
+    key = f"{request.full_path}|{version!r}".encode()
+    return hashlib.sha1(key).hexdigest()[:20]
+
+
+def _cached_body(etag):
+    with _bodies_lock:
+        body = _bodies.get(etag)
+        if body is not None:
+            _bodies.move_to_end(etag)
+        return body
+
+
+def _cache_body(etag, data):
+    with _bodies_lock:
+        _bodies[etag] = {'identity': data, 'gzip': None}
+        while len(_bodies) > MAX_CACHED_BODIES:
+            _bodies.popitem(last=False)
+
+
+def versioned(version):
+    """
+    Lets a JSON view answer from its payload version instead of rebuilding it.
+    version() identifies the data the view would return (e.g. a shared cache
+    version), or returns None when it cannot tell. A client that already has that
+    version gets a 304; any other client gets the body serialized for it before.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            current = version()
+            if current is None:
+                return view(*args, **kwargs)
+            etag = _etag(current)
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                body = _cached_body(etag)
+                if body is None:
+                    response = current_app.make_response(view(*args, **kwargs))
+                    if response.status_code != 200 or not response.is_json:
+                        return response
+                    _cache_body(etag, response.get_data())
+                else:
+                    response = current_app.response_class(body['identity'], mimetype='application/json')
+            response.set_etag(etag, weak=True)
+            return response
+        return wrapper
+    return decorator
+
+
+def _gzip(response):
+    etag, _ = response.get_etag()
+    body = _cached_body(etag) if etag else None
+    if body is not None and body['gzip'] is not None:
+        data = body['gzip']
+    else:
+        data = gzip.compress(response.get_data(), compresslevel=GZIP_LEVEL)
+        if body is not None:
+            body['gzip'] = data
+    response.set_data(data)
+    response.headers['Content-Encoding'] = 'gzip'
+
+
+@api_responses.after_app_request
+def _finish_api_response(response):
+    """
+    Every JSON response under /api/ gets an ETag (a hash of the body unless the view
+    is versioned) and is answered with a 304 when the client has it already, then
+    gzip-compressed when the client accepts it.
+    """
+    if not request.path.startswith('/api/') or response.direct_passthrough or response.is_streamed:
+        return response
+    if response.status_code == 304:
+        response.vary.add('Accept-Encoding')
+        return response
+    if not response.is_json or 'Content-Encoding' in response.headers:
+        return response
+
+    if request.method in ('GET', 'HEAD') and response.status_code == 200:
+        if response.get_etag()[0] is None:
+            response.add_etag(weak=True)
+        response.make_conditional(request)
+    if response.status_code == 200 and 'gzip' in request.accept_encodings \
+            and response.content_length and response.content_length >= GZIP_MIN_SIZE:
+        _gzip(response)
+    response.vary.add('Accept-Encoding')
+    return response
@@ -1,21 +1,29 @@
-import os, sys
+import os, sys, time
+BOOT_STARTED = time.perf_counter()  # Before any import, for the boot timings on /api/ready
+
 from encrypted_env_loader import load_encrypted_env
 load_encrypted_env()
 
 from pathlib import Path
 ROOT_DIR = Path(__file__).resolve().parent.parent
 sys.path.append(str(ROOT_DIR))
-from flask import Flask, jsonify
-from calendar_widget import fetch_events, start_polling
-from weather import get_weather
-from onedrive_widget import get_next_image
-from widget_profiles import widget_api
+from log_setup import setup_logging
+setup_logging()  # Before the widget imports, so their start-up messages are captured too
+from flask import Flask, jsonify, request
+from calendar_widget import calendar_api, events_version, get_cached_events, start_polling
+from weather import get_weather, load_persisted_weather, payload_version, start_weather_polling
+from onedrive_widget import onedrive_api, get_next_image, load_persisted_images, start_photo_polling
+from widget_profiles import widget_api, profile_store
+from event_stream import stream_api
+from dashboard import dashboard_api
+from monitoring import monitoring_api
+from profiling import profiling_api
+from static_assets import static_assets_api
+from api_responses import CompactJSONProvider, api_responses, versioned
+from leader import elect
+from startup import startup_api, mark_imported, record_first_response, warm_up
 from flask import render_template
 
-app = Flask(__name__)
-app.register_blueprint(widget_api)
-app.config['JSONIFY_PRETTYPRINT_REGULAR'] = True
-
 BACKEND_DIR = Path(__file__).resolve().parent
 PROJECT_ROOT = BACKEND_DIR.parent # This is kitchen_dashboard/
 
@@ -27,6 +35,18 @@ app = Flask(__name__,
             static_folder=str(STATIC_FOLDER_PATH),
             template_folder=str(TEMPLATE_FOLDER_PATH),
             static_url_path='/static') # This is the URL path for static files, usually '/static'
+app.json = CompactJSONProvider(app)
+app.register_blueprint(widget_api)
+app.register_blueprint(calendar_api)
+app.register_blueprint(onedrive_api)
+app.register_blueprint(stream_api)
+app.register_blueprint(dashboard_api)
+app.register_blueprint(startup_api)
+app.register_blueprint(monitoring_api)
+app.register_blueprint(profiling_api)
+app.register_blueprint(static_assets_api)
+app.register_blueprint(api_responses)
+app.after_request(record_first_response)
 
 @app.route('/')
 def home():
@@ -34,19 +54,41 @@ def home():
     return 'Welcome to the Kitchen Dashboard!'
 
 @app.route("/api/calendar")
+@versioned(lambda: events_version(request.args.get("profile"), request.args.get("view")))
 def get_calendar():
-    events = fetch_events()
-    return jsonify(events)
+    # ?view=1M|3W|2W|1W|rolling overrides the profile's configured calendar view
+    return jsonify(get_cached_events(request.args.get("profile"), request.args.get("view")))
 
 @app.route('/api/weather')
+@versioned(payload_version)
 def api_weather():
     weather_data = get_weather()  # Fetch local weather info
     return jsonify(weather_data)
 
 @app.route("/api/onedrive/photo")
 def serve_onedrive_photo():
-    return get_next_image()
+    return get_next_image(request.args.get("profile", "default"))
 
-if __name__ == "__main__":
+def start_refreshers():
     start_polling()
-    app.run(debug=True, host="0.0.0.0", port=5050)
+    start_photo_polling()
+    start_weather_polling()
+
+mark_imported(BOOT_STARTED)
+
+# Only one worker (the leader) runs the upstream pollers; the rest serve from the
+# shared cache and take over if the leader exits. When run directly the debug
+# reloader forks a child (WERKZEUG_RUN_MAIN) which is the one serving requests.
+if __name__ != "__main__" or os.environ.get("WERKZEUG_RUN_MAIN") == "true" or os.getenv("FLASK_ENV") != "development":
+    # Persisted snapshots are loaded in the background; /api/ready reports when they are in
+    warm_up({
+        "profiles": profile_store.all,
+        "calendar": get_cached_events,
+        "weather": load_persisted_weather,
+        "photos": load_persisted_images,
+    })
+    elect(start_refreshers)
+
+if __name__ == "__main__":
+    # The debug reloader imports the whole app twice, so it is only used in development
+    app.run(debug=os.getenv("FLASK_ENV") == "development", host="0.0.0.0", port=5050)
@@ -1,22 +1,205 @@
 import json
 import os
+import sqlite3
+import threading
 from config import LOG_PATH
 
-CACHE_FILE = os.path.join(LOG_PATH, 'calendar_cache.json')
+# Synced events live in SQLite, indexed per calendar on start time, so every view
+# window (and every gunicorn worker) is answered with a range query.
+EVENT_STORE_FILE = os.path.join(LOG_PATH, 'calendar_events.db')
 
-def save_cached_events(events):
+# Bump when the tables change; older stores are dropped and refilled by a full sync
+SCHEMA_VERSION = 2
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    calendar_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    start_ts REAL NOT NULL,
+    end_ts REAL NOT NULL,
+    master_id TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (calendar_id, id)
+);
+CREATE INDEX IF NOT EXISTS events_by_start ON events (calendar_id, start_ts);
+CREATE TABLE IF NOT EXISTS calendars (
+    calendar_id TEXT PRIMARY KEY,
+    max_duration REAL NOT NULL DEFAULT 0,
+    revision INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS recurring (
+    calendar_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (calendar_id, id)
+);
+CREATE TABLE IF NOT EXISTS instance_exceptions (
+    calendar_id TEXT NOT NULL,
+    master_id TEXT NOT NULL,
+    instance_id TEXT NOT NULL,
+    PRIMARY KEY (calendar_id, master_id, instance_id)
+);
+"""
+
+
+class EventStore:
+    """
+    Calendar events keyed by (calendar, event id) with their start/end as epoch seconds.
+
+    Overlap queries walk the (calendar_id, start_ts) index from window start minus
+    the calendar's longest event to window end, so they never scan the whole table
+    and come back already ordered by start.
+
+    Recurring series are kept as their masters (RRULE/EXDATE lines) plus the ids of
+    instances that were edited or cancelled; edited instances are ordinary events.
+    Each calendar's revision goes up on every write, for callers memoizing expansions.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            if conn.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+                conn.executescript('DROP TABLE IF EXISTS events; DROP TABLE IF EXISTS calendars; '
+                                   'DROP TABLE IF EXISTS recurring; DROP TABLE IF EXISTS instance_exceptions;')
+                conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def calendar_ids(self):
+        return [row[0] for row in self._conn().execute('SELECT calendar_id FROM calendars')]
+
+    def events(self, calendar_id):
+        """Every stored event of a calendar, as id -> event."""
+        rows = self._conn().execute('SELECT id, data FROM events WHERE calendar_id = ?', (calendar_id,))
+        return {event_id: json.loads(data) for event_id, data in rows}
+
+    def masters(self, calendar_id):
+        """Every stored recurring master of a calendar, as id -> master."""
+        rows = self._conn().execute('SELECT id, data FROM recurring WHERE calendar_id = ?', (calendar_id,))
+        return {master_id: json.loads(data) for master_id, data in rows}
+
+    def recurring(self, calendar_id):
+        """(master, set of excepted instance ids) for each recurring series of a calendar."""
+        conn = self._conn()
+        exceptions = {}
+        for master_id, instance_id in conn.execute(
+                'SELECT master_id, instance_id FROM instance_exceptions WHERE calendar_id = ?', (calendar_id,)):
+            exceptions.setdefault(master_id, set()).add(instance_id)
+        rows = conn.execute('SELECT id, data FROM recurring WHERE calendar_id = ?', (calendar_id,))
+        return [(json.loads(data), exceptions.get(master_id, set())) for master_id, data in rows]
+
+    def revision(self, calendar_id):
+        row = self._conn().execute('SELECT revision FROM calendars WHERE calendar_id = ?', (calendar_id,)).fetchone()
+        return row[0] if row else None
+
+    def apply(self, calendar_id, upserts=(), deletes=(), masters=(), master_deletes=(), exceptions=(), reset=False):
+        """
+        Writes one calendar's changes in a single transaction.
+
+        upserts is a list of (event, start_ts, end_ts); deletes a list of event ids;
+        masters a list of recurring masters; master_deletes a list of master ids
+        (their edited instances and exceptions go too); exceptions a list of
+        (master_id, instance_id). reset empties the calendar first (full sync).
+        """
+        conn = self._conn()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('INSERT OR IGNORE INTO calendars (calendar_id) VALUES (?)', (calendar_id,))
+            if reset:
+                for table in ('events', 'recurring', 'instance_exceptions'):
+                    conn.execute(f'DELETE FROM {table} WHERE calendar_id = ?', (calendar_id,))
+            for master_id in master_deletes:
+                conn.execute('DELETE FROM recurring WHERE calendar_id = ? AND id = ?', (calendar_id, master_id))
+                conn.execute('DELETE FROM events WHERE calendar_id = ? AND master_id = ?', (calendar_id, master_id))
+                conn.execute('DELETE FROM instance_exceptions WHERE calendar_id = ? AND master_id = ?',
+                             (calendar_id, master_id))
+            conn.executemany('DELETE FROM events WHERE calendar_id = ? AND id = ?',
+                             [(calendar_id, event_id) for event_id in deletes])
+            conn.executemany(
+                'INSERT OR REPLACE INTO events (calendar_id, id, start_ts, end_ts, master_id, data) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                [(calendar_id, event['id'], start_ts, end_ts, event.get('recurring_event_id'), json.dumps(event))
+                 for event, start_ts, end_ts in upserts])
+            conn.executemany('INSERT OR REPLACE INTO recurring (calendar_id, id, data) VALUES (?, ?, ?)',
+                             [(calendar_id, master['id'], json.dumps(master)) for master in masters])
+            conn.executemany(
+                'INSERT OR IGNORE INTO instance_exceptions (calendar_id, master_id, instance_id) VALUES (?, ?, ?)',
+                [(calendar_id, master_id, instance_id) for master_id, instance_id in exceptions])
+            conn.execute(
+                'UPDATE calendars SET revision = revision + 1, max_duration = '
+                '(SELECT COALESCE(MAX(end_ts - start_ts), 0) FROM events WHERE calendar_id = ?) '
+                'WHERE calendar_id = ?', (calendar_id, calendar_id))
+
+    def drop_calendar(self, calendar_id):
+        """Removes a calendar and its events. Returns how many events and series went with it."""
+        conn = self._conn()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            removed = conn.execute('DELETE FROM events WHERE calendar_id = ?', (calendar_id,)).rowcount
+            removed += conn.execute('DELETE FROM recurring WHERE calendar_id = ?', (calendar_id,)).rowcount
+            conn.execute('DELETE FROM instance_exceptions WHERE calendar_id = ?', (calendar_id,))
+            conn.execute('DELETE FROM calendars WHERE calendar_id = ?', (calendar_id,))
+        return removed
+
+    def query(self, calendar_id, start_ts, end_ts):
+        """(start_ts, event) for a calendar's events overlapping [start_ts, end_ts), ordered by start."""
+        conn = self._conn()
+        row = conn.execute('SELECT max_duration FROM calendars WHERE calendar_id = ?', (calendar_id,)).fetchone()
+        if row is None:
+            return []
+        rows = conn.execute(
+            'SELECT start_ts, data FROM events WHERE calendar_id = ? AND start_ts >= ? AND start_ts < ? '
+            'AND end_ts > ? ORDER BY start_ts',
+            (calendar_id, start_ts - row[0], end_ts, start_ts))
+        return [(ts, json.loads(data)) for ts, data in rows]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = EventStore(EVENT_STORE_FILE)
+    return _store
+
+
+def set_store_path(path):
+    """Points the process at a different event store (tests, benchmarks)."""
+    global _store
+    with _store_lock:
+        _store = EventStore(path)
+    return _store
+
+
+# Incremental sync bookkeeping (nextSyncToken, last full sync, watch channel)
+SYNC_STATE_FILE = os.path.join(LOG_PATH, 'calendar_sync_state.json')
+
+def save_sync_state(state):
     try:
-        with open(CACHE_FILE, 'w') as f:
-            json.dump(events, f)
+        os.makedirs(LOG_PATH, exist_ok=True)
+        tmp_file = SYNC_STATE_FILE + '.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_file, SYNC_STATE_FILE)
     except Exception as e:
-        print(f"Cache write failed: {e}")
+        print(f"Sync state write failed: {e}")
 
-def load_cached_events():
-    if not os.path.exists(CACHE_FILE):
-        return []
+def load_sync_state():
+    if not os.path.exists(SYNC_STATE_FILE):
+        return {}
     try:
-        with open(CACHE_FILE, 'r') as f:
+        with open(SYNC_STATE_FILE, 'r') as f:
             return json.load(f)
     except Exception as e:
-        print(f"Cache read failed: {e}")
-        return []
+        print(f"Sync state read failed: {e}")
+        return {}
@@ -0,0 +1,360 @@
+# kitchen_dashboard/backend/calendar_sync.py
+
+import heapq
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+
+from calendar_cache import get_store, load_sync_state, save_sync_state
+from config import log_error
+from recurrence import expand
+from register_webhook import WEBHOOK_URL, register_channel, stop_channel
+from utils.metrics import cache_lookup, upstream_call, upstream_error
+
+SYNC_HORIZON_DAYS = 60            # How far ahead a full sync reaches
+SYNC_LOOKBACK_DAYS = 31           # How far back it reaches, so month and week views starting in the past are covered
+FULL_SYNC_INTERVAL = 24 * 3600    # Re-anchor the full sync window once a day
+CHANNEL_RENEW_MARGIN = 3600       # Renew the watch channel this many seconds before it expires
+BATCH_LIMIT = 50                  # Calls per Google batch request
+EXPANSION_MEMO_SIZE = 64          # (calendar, revision, window) expansions kept in memory
+
+# Per-calendar sync tokens and watch channel state, loaded lazily so a restart
+# resumes the delta feeds. The events themselves live in the calendar_cache store.
+_state = None
+_sync_lock = threading.Lock()
+_expansions = OrderedDict()
+_expansions_lock = threading.Lock()
+
+
+def _load():
+    global _state
+    if _state is None:
+        _state = load_sync_state()
+        _state.setdefault('calendars', {})
+
+
+def format_event(event, calendar_id='primary', color=None, source=None):
+    return {
+        'summary': event.get('summary', 'No Title'),
+        'start': event['start'].get('dateTime', event['start'].get('date')),
+        'end': event['end'].get('dateTime', event['end'].get('date')),
+        'id': event['id'],
+        'calendar_id': calendar_id,
+        'color': color,
+        'source': source or calendar_id,
+    }
+
+
+def format_master(event, calendar_id='primary', color=None, source=None):
+    """A recurring series as stored: Google's start/end plus its RRULE/RDATE/EXDATE lines."""
+    return {
+        'id': event['id'],
+        'summary': event.get('summary', 'No Title'),
+        'start': event['start'],
+        'end': event['end'],
+        'recurrence': event['recurrence'],
+        'calendar_id': calendar_id,
+        'color': color,
+        'source': source or calendar_id,
+    }
+
+
+def _parse_time(value):
+    """
+    Parses an RFC3339 dateTime into an aware datetime. An all-day date becomes
+    midnight in the kiosk's local time zone, the zone its view windows are in.
+    """
+    if len(value) == 10:
+        return datetime.combine(date.fromisoformat(value), datetime.min.time()).astimezone()
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def _list_params(calendar_id, sync_token):
+    if sync_token:
+        return {'calendarId': calendar_id, 'singleEvents': False, 'syncToken': sync_token}
+    now_utc = datetime.now(timezone.utc)
+    return {
+        'calendarId': calendar_id,
+        'timeMin': (now_utc - timedelta(days=SYNC_LOOKBACK_DAYS)).isoformat(),
+        'timeMax': (now_utc + timedelta(days=SYNC_HORIZON_DAYS)).isoformat(),
+        # Recurring series arrive once, as masters, and are expanded locally per view
+        'singleEvents': False,
+    }
+
+
+def _execute_batch(service, requests):
+    """
+    Sends {request_id: HttpRequest} to Google as batch HTTP calls of up to BATCH_LIMIT.
+    Returns {request_id: (response, exception)}.
+    """
+    results = {}
+
+    def collect(request_id, response, exception):
+        if exception is not None:
+            upstream_error('calendar')
+        results[request_id] = (response, exception)
+
+    ids = list(requests)
+    for start in range(0, len(ids), BATCH_LIMIT):
+        batch = service.new_batch_http_request(callback=collect)
+        for request_id in ids[start:start + BATCH_LIMIT]:
+            batch.add(requests[request_id], request_id=request_id)
+        with upstream_call('calendar'):
+            batch.execute()
+    return results
+
+
+def _fetch_changes(service, jobs, need_meta):
+    """
+    Runs the events().list calls of every calendar together: each round is one
+    batch request holding the next page of every calendar that still has one.
+    Fills in each job's items / next_token / error, and returns calendarList
+    metadata for the calendars in need_meta.
+    """
+    from googleapiclient.errors import HttpError  # Deferred with the rest of the Google client
+
+    meta = {}
+    pending = list(jobs)
+    first_round = True
+    while pending:
+        requests = {f"events-{i}": service.events().list(**jobs[cal_id]['params'])
+                    for i, cal_id in enumerate(pending)}
+        if first_round:
+            requests.update({f"meta-{i}": service.calendarList().get(calendarId=cal_id)
+                             for i, cal_id in enumerate(need_meta)})
+        results = _execute_batch(service, requests)
+
+        if first_round:
+            for i, cal_id in enumerate(need_meta):
+                response, _ = results.get(f"meta-{i}", (None, None))
+                meta[cal_id] = response or {}
+            first_round = False
+
+        next_round = []
+        for i, cal_id in enumerate(pending):
+            job = jobs[cal_id]
+            response, error = results.get(f"events-{i}", (None, RuntimeError("no response in batch")))
+            if error is not None:
+                if job['token'] and isinstance(error, HttpError) and error.resp.status == 410:
+                    print(f"⚠️ Sync token for calendar {cal_id} expired, running a full sync.")
+                    job.update(token=None, params=_list_params(cal_id, None), items=[])
+                    next_round.append(cal_id)
+                else:
+                    job['error'] = error
+                continue
+            job['items'].extend(response.get('items', []))
+            if response.get('nextPageToken'):
+                job['params'] = {**job['params'], 'pageToken': response['nextPageToken']}
+                next_round.append(cal_id)
+            else:
+                job['next_token'] = response.get('nextSyncToken')
+        pending = next_round
+    return meta
+
+
+def sync_calendars(service, calendars):
+    """
+    Brings the cached events of every configured calendar up to date with Google.
+
+    Each calendar uses its stored nextSyncToken to pull only changed or deleted
+    events, or falls back to a full sync of the next SYNC_HORIZON_DAYS when there is
+    no token, the token was invalidated (HTTP 410), or its last full sync is more
+    than a day old. All calendars are fetched together in Google batch requests, so
+    the sync takes about as long as a single calendar's.
+
+    Args:
+        calendars (list): [{'id', optional 'color', optional 'name'}]. Calendars not
+            listed are dropped from the cache.
+
+    Returns:
+        int: Number of events added, updated or removed.
+    """
+    with _sync_lock:
+        _load()
+        store = get_store()
+        stored = set(store.calendar_ids())
+        now = time.time()
+        config = {cal['id']: cal for cal in calendars}
+        jobs = {}
+        for cal_id in config:
+            state = _state['calendars'].setdefault(cal_id, {})
+            token = state.get('sync_token')
+            if now - state.get('full_sync_at', 0) > FULL_SYNC_INTERVAL or cal_id not in stored:
+                token = None
+            jobs[cal_id] = {'token': token, 'params': _list_params(cal_id, token),
+                            'items': [], 'next_token': None, 'error': None}
+        need_meta = [cal_id for cal_id, job in jobs.items()
+                     if not job['token'] or 'summary' not in _state['calendars'][cal_id]]
+
+        meta = _fetch_changes(service, jobs, need_meta)
+        errors = [job['error'] for job in jobs.values() if job['error'] is not None]
+        if errors and len(errors) == len(jobs):
+            raise errors[0]
+
+        changes = 0
+        for cal_id in stored - set(config):
+            changes += store.drop_calendar(cal_id)
+            _state['calendars'].pop(cal_id, None)
+
+        state_changed = False
+        for cal_id, job in jobs.items():
+            if job['error'] is not None:
+                log_error(f"Calendar {cal_id} sync failed: {job['error']}")
+                continue
+            state = _state['calendars'][cal_id]
+            if cal_id in meta:
+                state['summary'] = meta[cal_id].get('summary')
+                state['color'] = meta[cal_id].get('backgroundColor')
+            color = config[cal_id].get('color') or state.get('color')
+            source = config[cal_id].get('name') or state.get('summary')
+
+            events, masters = store.events(cal_id), store.masters(cal_id)
+            full = not job['token']
+            upserts, deletes, new_masters, master_deletes, exceptions = {}, set(), {}, set(), set()
+            for item in job['items']:
+                item_id, master_id = item['id'], item.get('recurringEventId')
+                if item.get('status') == 'cancelled':
+                    upserts.pop(item_id, None)
+                    new_masters.pop(item_id, None)
+                    if master_id:
+                        exceptions.add((master_id, item_id))  # One occurrence of a series was deleted
+                    if item_id in events:
+                        deletes.add(item_id)
+                    if item_id in masters:
+                        master_deletes.add(item_id)
+                    continue
+                if 'recurrence' in item:
+                    new_masters[item_id] = format_master(item, cal_id, color, source)
+                    continue
+                try:
+                    formatted = format_event(item, cal_id, color, source)
+                    span = (_parse_time(formatted['start']).timestamp(), _parse_time(formatted['end']).timestamp())
+                except (KeyError, ValueError) as e:
+                    log_error(f"Skipping malformed event {item.get('id')} in {cal_id}: {e}")
+                    continue
+                if master_id:
+                    # An edited occurrence replaces the one the series would generate
+                    formatted['recurring_event_id'] = master_id
+                    exceptions.add((master_id, item_id))
+                deletes.discard(item_id)
+                upserts[item_id] = (formatted, *span)
+
+            if full:
+                state['full_sync_at'] = now
+                calendar_changes = (
+                    sum(events.get(i) != e for i, (e, _, _) in upserts.items()) + len(set(events) - set(upserts))
+                    + sum(masters.get(i) != m for i, m in new_masters.items()) + len(set(masters) - set(new_masters)))
+                store.apply(cal_id, list(upserts.values()), masters=list(new_masters.values()),
+                            exceptions=list(exceptions), reset=True)
+            else:
+                upserts = {i: u for i, u in upserts.items() if events.get(i) != u[0]}
+                new_masters = {i: m for i, m in new_masters.items() if masters.get(i) != m}
+                calendar_changes = len(upserts) + len(deletes) + len(new_masters) + len(master_deletes)
+                calendar_changes += sum(1 for item in job['items']
+                                        if item.get('status') == 'cancelled' and item.get('recurringEventId'))
+                if calendar_changes or cal_id not in stored:
+                    store.apply(cal_id, list(upserts.values()), list(deletes), list(new_masters.values()),
+                                list(master_deletes), list(exceptions))
+            changes += calendar_changes
+
+            if job['next_token'] != state.get('sync_token') or not job['token']:
+                state['sync_token'] = job['next_token']
+                state_changed = True
+            print(f"🔄 Calendar {cal_id} {'delta' if job['token'] else 'full'} sync: "
+                  f"{len(job['items'])} items, {calendar_changes} changes.")
+
+        if state_changed:
+            save_sync_state(_state)
+        return changes
+
+
+def _expanded(store, calendar_id, start_ts, end_ts):
+    """
+    Occurrences of a calendar's recurring series overlapping [start_ts, end_ts) as
+    (start_ts, event), ordered by start. Expansions are memoized per calendar
+    revision over whole UTC days, so rolling windows and repeat views reuse them.
+    """
+    revision = store.revision(calendar_id)
+    day_min = math.floor(start_ts / 86400) * 86400
+    day_max = math.ceil(end_ts / 86400) * 86400
+    key = (store.path, calendar_id, revision, day_min, day_max)
+    with _expansions_lock:
+        occurrences = _expansions.get(key)
+        if occurrences is not None:
+            _expansions.move_to_end(key)
+    cache_lookup('calendar_expansions', occurrences is not None)
+
+    if occurrences is None:
+        occurrences = []
+        window = (datetime.fromtimestamp(day_min, timezone.utc), datetime.fromtimestamp(day_max, timezone.utc))
+        for master, exceptions in store.recurring(calendar_id):
+            try:
+                occurrences.extend(expand(master, *window, exceptions))
+            except (KeyError, ValueError, TypeError) as e:
+                log_error(f"Skipping recurring event {master.get('id')} in {calendar_id}: {e}")
+        occurrences.sort(key=lambda occurrence: occurrence[0])
+        with _expansions_lock:
+            _expansions[key] = occurrences
+            while len(_expansions) > EXPANSION_MEMO_SIZE:
+                _expansions.popitem(last=False)
+
+    return [(start, event) for start, end, event in occurrences if start < end_ts and end > start_ts]
+
+
+def events_in_window(time_min, time_max, calendar_ids=None):
+    """
+    Returns stored events overlapping [time_min, time_max), sorted by start, with
+    recurring series expanded into their occurrences. Each calendar's one-off
+    events come from an index range query already in start order, and all of them
+    are combined with the expansions in a k-way heap merge.
+    calendar_ids limits the result to some calendars.
+    """
+    store = get_store()
+    ids = store.calendar_ids() if calendar_ids is None else calendar_ids
+    start_ts, end_ts = time_min.timestamp(), time_max.timestamp()
+    sources = []
+    for cal_id in ids:
+        sources.append(store.query(cal_id, start_ts, end_ts))
+        sources.append(_expanded(store, cal_id, start_ts, end_ts))
+    merged = heapq.merge(*sources, key=lambda pair: pair[0])
+    return [event for _, event in merged]
+
+
+def ensure_watch_channel(service, calendar_id='primary'):
+    """
+    Makes sure a push channel is open and not about to expire. A replacement is
+    registered CHANNEL_RENEW_MARGIN seconds before the old one lapses, then the
+    old one is stopped. Does nothing unless CALENDAR_WEBHOOK_URL is configured.
+    """
+    if not WEBHOOK_URL:
+        return None
+
+    with _sync_lock:
+        _load()
+        channel = _state.get('channel')
+    if channel and channel['expiration'] / 1000 - time.time() > CHANNEL_RENEW_MARGIN:
+        return channel
+
+    new_channel = register_channel(service, calendar_id=calendar_id)
+    print(f"🔔 Calendar watch channel registered: {new_channel['id']}")
+    if channel:
+        try:
+            stop_channel(service, channel)
+        except Exception as e:
+            log_error(f"Stopping old calendar channel {channel['id']} failed: {e}")
+
+    with _sync_lock:
+        _state['channel'] = new_channel
+        save_sync_state(_state)
+    return new_channel
+
+
+def is_known_channel(channel_id, channel_token):
+    """
+    Checks a notification's channel headers against the registered channel. Reads
+    the state file, since the leader worker may have renewed the channel since.
+    """
+    channel = load_sync_state().get('channel')
+    return bool(channel) and channel['id'] == channel_id and channel['token'] == channel_token
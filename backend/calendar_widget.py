@@ -1,82 +1,288 @@
-import datetime
 import threading
 import time
-import os
-from googleapiclient.discovery import build
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from flask import Blueprint, request
 
-from calendar_cache import save_cached_events, load_cached_events
-from config import LOG_PATH, log_error
-from auth.credentials import load_master_credentials
+from calendar_sync import sync_calendars, events_in_window, ensure_watch_channel, is_known_channel
+from register_webhook import WEBHOOK_URL
+from config import log_error
+from scheduler import get_scheduler
+from event_stream import publish
+from shared_cache import get_cache
+from leader import is_leader
+from widget_profiles import get_profile, profile_store
+from utils.metrics import register_snapshot
+from utils.resilience import CircuitOpenError, get_breaker
 
 # --- Configuration for Calendar API ---
 # These could also come from environment variables via os.getenv() if preferred
 CALENDAR_SCOPES = ['https://www.googleapis.com/auth/calendar.readonly']
 CALENDAR_TOKEN_FILENAME = 'token_calendar.json' # Will be stored in auth/secrets/
 # Assumes 'google_client_secret.json' is used by default by build_google_service
-# Global variable for the service to cache it, or initialize it on first call
-calendar_service_instance = None
 
-CACHE_FILE = os.path.join(LOG_PATH, 'calendar_cache.json')
-POLL_INTERVAL = 300  # seconds
+# Calendars shown by a profile without a "calendars" list in its calendar widget settings.
+# Entries look like {"id": "family@group.calendar.google.com", "name": "Family", "color": "#33b679"};
+# name and color fall back to the calendar's own title and color in Google.
+DEFAULT_CALENDARS = [{"id": "primary"}]
+
+# Calendar views offered by the settings UI. 1W/2W/3W start on this week's Monday and
+# 1M on the first of the month (kiosk local time); rolling runs from now.
+VIEWS = ("1M", "3W", "2W", "1W", "rolling")
+DEFAULT_VIEW = "rolling"
+ROLLING_DAYS = 7
+
+POLL_INTERVAL = 300  # seconds, safety net alongside push notifications
+CHANNEL_CHECK_INTERVAL = 600  # seconds between watch channel expiry checks
+SYNC_REQUEST_CHECK_INTERVAL = 5  # seconds between the leader's checks for webhook pings taken by other workers
+STALE_AFTER = 3 * POLL_INTERVAL  # seconds without a successful sync before events are flagged stale
+
+calendar_api = Blueprint("calendar_widget", __name__)
+
+# Events are read straight from the calendar_cache store by every worker; the leader
+# records when it last synced under this shared key.
+SHARED_KEY = "calendar"
+SYNC_REQUEST_KEY = "calendar_sync_requested"
+_updated_at = None
+_polling_lock = threading.Lock()
+_polling_started = False
+_handled_sync_request = 0
+
+def _synced_at():
+    entry = get_cache().get_entry(SHARED_KEY)
+    return entry["updated_at"] if entry else None
+
+register_snapshot("calendar", _synced_at)
 
 def get_calendar_service():
+    """Returns the shared Calendar client; built once and kept authenticated by google_utils."""
     try:
-        creds = load_master_credentials_joeltimm()
-        return build('calendar', 'v3', credentials=creds)
+        # Deferred: the Google client libraries are the slowest import in the app
+        from utils.google_utils import build_google_service
+        return build_google_service('calendar', 'v3', CALENDAR_SCOPES, CALENDAR_TOKEN_FILENAME)
     except Exception as e:
         log_error(f"Calendar service init failed: {e}")
         return None
 
+def calendar_set(profile):
+    """The calendars a profile's calendar widget shows."""
+    return get_profile(profile).get("calendar", {}).get("calendars") or DEFAULT_CALENDARS
+
+
+def all_calendars():
+    """Every calendar some profile shows, once each. The first profile to configure one sets its name and color."""
+    calendars = {}
+    for profile in dict.fromkeys(["default", *profile_store.all()]):
+        for calendar in calendar_set(profile):
+            calendars.setdefault(calendar["id"], calendar)
+    return list(calendars.values())
+
+
 def fetch_events():
-    """Fetches upcoming events from the primary Google Calendar."""
+    """
+    Syncs every configured Google Calendar (incrementally when possible, all in
+    one batch request) and returns the events for the next 7 days.
+    """
     service = get_calendar_service()
     if not service:
         return {"error": "Failed to connect to Google Calendar service."}
 
     try:
-        now_utc = datetime.now(timezone.utc)
-        time_min = now_utc.isoformat()
-        # Fetch events for the next 7 days, for example
-        time_max = (now_utc + timedelta(days=7)).isoformat()
-
-        print(f"Fetching events from {time_min} to {time_max}")
-        events_result = service.events().list(
-            calendarId='primary',  # Use 'primary' for the user's main calendar
-            timeMin=time_min,
-            timeMax=time_max,
-            maxResults=10,        # Adjust as needed
-            singleEvents=True,
-            orderBy='startTime'
-        ).execute()
-
-        events = events_result.get('items', [])
-        formatted_events = []
-        if not events:
-            print("No upcoming events found.")
-            return {"events": [], "message": "No upcoming events."}
-
-        for event in events:
-            start = event['start'].get('dateTime', event['start'].get('date'))
-            formatted_events.append({
-                'summary': event.get('summary', 'No Title'),
-                'start': start,
-                'end': event['end'].get('dateTime', event['end'].get('date')),
-                'id': event['id']
-            })
-        print(f"Fetched {len(formatted_events)} events.")
-        return {"events": formatted_events}
+        changes = get_breaker("calendar").call(sync_calendars, service, all_calendars())
+        return {"events": upcoming_events(), "changes": changes}
 
+    except CircuitOpenError as e:
+        return {"error": str(e)}
     except Exception as e:
         print(f"🔴 An error occurred fetching calendar events: {e}")
         # Consider more specific error handling or re-raising
         return {"error": f"An error occurred: {str(e)}"}
 
+def view_window(view, now=None):
+    """Start and end (aware datetimes) of a calendar view."""
+    now = now or datetime.now().astimezone()
+    if view == "rolling":
+        return now, now + timedelta(days=ROLLING_DAYS)
+    if view == "1M":
+        start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        end = (start + timedelta(days=32)).replace(day=1)
+        return start, end
+    start = (now - timedelta(days=now.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+    return start, start + timedelta(weeks=int(view[0]))
+
+
+def profile_view(profile):
+    """The view a profile's calendar widget is set to."""
+    view = get_profile(profile).get("calendar", {}).get("view") if profile else None
+    return view if view in VIEWS else DEFAULT_VIEW
+
+
+def upcoming_events(calendar_ids=None, view=DEFAULT_VIEW):
+    """Returns the synced events in a view's window, from the local event store."""
+    return events_in_window(*view_window(view), calendar_ids)
+
+def refresh_events():
+    """
+    Syncs events from Google into the event store. On failure the stored events
+    stay as they were so the kiosk keeps showing data.
+    """
+    global _updated_at
+    result = fetch_events()
+    if "events" not in result:
+        log_error(f"Calendar refresh failed: {result.get('error')}")
+        return False
+
+    _updated_at = datetime.now(timezone.utc).isoformat()
+    get_cache().put(SHARED_KEY, {"updated_at": _updated_at})
+    if result["changes"]:
+        for profile in dict.fromkeys(["default", *profile_store.all()]):
+            publish("calendar", {"profile": profile, **get_cached_events(profile)})
+    return True
+
+
+def renew_watch_channel():
+    """Keeps the Google push channel alive so changes reach the webhook below."""
+    service = get_calendar_service()
+    if not service:
+        return
+    try:
+        ensure_watch_channel(service)
+    except Exception as e:
+        log_error(f"Calendar watch channel renewal failed: {e}")
+
+
+def trigger_sync():
+    """
+    Runs a delta sync on the scheduler as soon as possible. Bursts of pings collapse into one job.
+    A worker that is not the leader leaves a request in the shared cache instead.
+    """
+    if not is_leader():
+        get_cache().put(SYNC_REQUEST_KEY, datetime.now(timezone.utc).isoformat())
+        return
+    get_scheduler().add_job(refresh_events, id="calendar_push_sync", replace_existing=True)
+
+
+def check_sync_requests():
+    """Leader job: syncs when another worker has received a webhook ping since the last check."""
+    global _handled_sync_request
+    version = _sync_request_version()
+    if version != _handled_sync_request:
+        _handled_sync_request = version
+        trigger_sync()
+
+
+def _sync_request_version():
+    entry = get_cache().get_entry(SYNC_REQUEST_KEY)
+    return entry["version"] if entry else 0
+
+
+@calendar_api.route("/api/calendar/webhook", methods=["POST"])
+def calendar_webhook():
+    """Receives Google Calendar push notifications and kicks off a delta sync."""
+    channel_id = request.headers.get("X-Goog-Channel-ID")
+    channel_token = request.headers.get("X-Goog-Channel-Token")
+    if not is_known_channel(channel_id, channel_token):
+        return "", 403
+
+    # 'sync' is the handshake sent when a channel opens; anything else means a change
+    if request.headers.get("X-Goog-Resource-State") != "sync":
+        trigger_sync()
+    return "", 204
+
+
+def get_cached_events(profile=None, view=None):
+    """
+    Returns the events of a calendar view (the profile's configured one unless
+    given), limited to the profile's calendars when there is a profile. Answered
+    with range queries on the local event store; never calls Google. "stale" is
+    set when the last successful sync is older than STALE_AFTER.
+    """
+    if view not in VIEWS:
+        view = profile_view(profile)
+    calendar_ids = [calendar["id"] for calendar in calendar_set(profile)] if profile else None
+    start, end = view_window(view)
+    try:
+        shared = get_cache().get(SHARED_KEY) or {}
+    except Exception as e:
+        log_error(f"Shared calendar cache read failed: {e}")
+        shared = {}
+    updated_at = shared.get("updated_at", _updated_at)
+    return {
+        "events": events_in_window(start, end, calendar_ids),
+        "view": view,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "updated_at": updated_at,
+        "stale": _is_stale(updated_at),
+    }
+
+
+def _is_stale(updated_at):
+    return updated_at is None or (datetime.now(timezone.utc) - datetime.fromisoformat(updated_at)).total_seconds() > STALE_AFTER
+
+
+def events_version(profile=None, view=None):
+    """
+    Identifies what get_cached_events(profile, view) returns right now, or None when
+    there has been no sync yet. Built only from what every worker sees the same way
+    (the shared cache version and the profile's settings), so an ETag means the same
+    content whichever worker answers. Rolling views move with the clock, so their
+    version also changes every minute.
+    """
+    entry = get_cache().get_entry(SHARED_KEY)
+    if entry is None:
+        return None
+    if view not in VIEWS:
+        view = profile_view(profile)
+    calendars = calendar_set(profile) if profile else None
+    window = int(time.time() // 60) if view == "rolling" else view_window(view)[0].isoformat()
+    return entry["version"], calendars, view, window, _is_stale(entry["value"].get("updated_at"))
+
+
 def start_polling():
-    # TODO: Implement actual background polling using APScheduler if needed
-    # For now, this is called once at startup in your app.py
-    print("Calendar polling placeholder initiated. (Actual polling not yet implemented here)")
-    # You might want to fetch initial events here if not relying on an immediate API call
-    # fetch_events() # Or call this from app.py after starting
+    """
+    Schedules a refresh of the event store every POLL_INTERVAL seconds. The first
+    refresh runs straight away in the background. Only the leader worker calls
+    this. Safe to call more than once.
+    """
+    global _polling_started, _handled_sync_request
+    with _polling_lock:
+        if _polling_started:
+            return
+        _polling_started = True
+    _handled_sync_request = _sync_request_version()  # The first poll below covers older pings
+
+    get_scheduler().add_job(
+        refresh_events,
+        "interval",
+        seconds=POLL_INTERVAL,
+        id="calendar_poll",
+        next_run_time=datetime.now(timezone.utc),
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True,
+    )
+    if WEBHOOK_URL:
+        get_scheduler().add_job(
+            check_sync_requests,
+            "interval",
+            seconds=SYNC_REQUEST_CHECK_INTERVAL,
+            id="calendar_sync_requests",
+            max_instances=1,
+            coalesce=True,
+            replace_existing=True,
+        )
+        get_scheduler().add_job(
+            renew_watch_channel,
+            "interval",
+            seconds=CHANNEL_CHECK_INTERVAL,
+            id="calendar_channel_renew",
+            next_run_time=datetime.now(timezone.utc),
+            max_instances=1,
+            coalesce=True,
+            replace_existing=True,
+        )
+    print(f"📅 Calendar polling started (every {POLL_INTERVAL}s, {len(upcoming_events())} cached events).")
 
 if __name__ == '__main__':
     # Test fetching events directly (requires auth setup)
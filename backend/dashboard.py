@@ -0,0 +1,108 @@
+# kitchen_dashboard/backend/dashboard.py
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from flask import Blueprint, jsonify, request
+
+from calendar_widget import get_cached_events
+from onedrive_widget import next_image_url
+from weather import get_weather
+from widget_profiles import get_profile
+
+DEFAULT_DEADLINE = 3.0  # seconds
+# Per-widget deadlines, measured from the start of the request
+PROVIDER_DEADLINES = {
+    "calendar": 2.0,
+    "weather": 3.0,
+    "photos": 5.0,
+}
+
+dashboard_api = Blueprint("dashboard", __name__)
+
+# (widget, profile, view) -> provider call still running. A request joins that call instead of
+# starting another, so an upstream that hangs ties up one thread per widget, not one per poll.
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def _calendar(profile, settings):
+    return get_cached_events(profile, settings.get("view"))
+
+
+def _weather(profile, settings):
+    data = get_weather(settings.get("location"))
+    if "error" in data:
+        raise RuntimeError(data["error"])
+    return data
+
+
+def _photos(profile, settings):
+    image_url = next_image_url(profile)
+    if image_url is None:
+        raise LookupError("No images found")
+    return {"image_url": image_url}
+
+
+# widget name in widget_profiles.json -> provider(profile, widget settings)
+PROVIDERS = {
+    "calendar": _calendar,
+    "weather": _weather,
+    "photos": _photos,
+}
+
+
+def _forget(key, future):
+    with _inflight_lock:
+        if _inflight.get(key) is future:
+            del _inflight[key]
+
+
+def _start(executor, name, profile, widget):
+    """Starts a widget's provider, or returns the call already running for it."""
+    key = (name, profile, widget.get("view"))
+    with _inflight_lock:
+        future = _inflight.get(key)
+        if future is not None:
+            return future
+        future = _inflight[key] = executor.submit(PROVIDERS[name], profile, widget)
+    future.add_done_callback(lambda done: _forget(key, done))
+    return future
+
+
+def build_dashboard(profile, calendar_view=None):
+    """
+    Runs the providers of every widget the profile enables, concurrently, and
+    collects their results. calendar_view overrides the profile's calendar view
+    (a kiosk's ?view=). A provider that fails or misses its deadline is
+    reported on its own widget and does not hold up the others. Each request gets
+    its own threads, so providers left hanging by earlier requests never queue it.
+    """
+    settings = get_profile(profile)
+    started = time.monotonic()
+    enabled = [name for name, widget in settings.items() if name in PROVIDERS and widget.get("enabled")]
+    executor = ThreadPoolExecutor(max_workers=max(1, len(enabled)), thread_name_prefix="dashboard")
+    widget_settings = {name: settings[name] for name in enabled}
+    if calendar_view and "calendar" in widget_settings:
+        widget_settings["calendar"] = {**widget_settings["calendar"], "view": calendar_view}
+    futures = {name: _start(executor, name, profile, widget) for name, widget in widget_settings.items()}
+    executor.shutdown(wait=False)
+
+    widgets = {}
+    for name, future in futures.items():
+        deadline = started + PROVIDER_DEADLINES.get(name, DEFAULT_DEADLINE)
+        try:
+            widgets[name] = {"ok": True, "data": future.result(timeout=max(0, deadline - time.monotonic()))}
+        except TimeoutError:
+            widgets[name] = {"ok": False, "error": "timeout"}
+        except Exception as e:
+            widgets[name] = {"ok": False, "error": str(e)}
+
+    return {"profile": profile, "settings": settings, "widgets": widgets}
+
+
+@dashboard_api.route("/api/dashboard")
+def get_dashboard():
+    """Everything a kiosk needs for first paint, in one round trip."""
+    return jsonify(build_dashboard(request.args.get("profile", "default"), request.args.get("view")))
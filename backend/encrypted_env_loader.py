@@ -9,7 +9,7 @@ def load_encrypted_env():
         raise RuntimeError("DOTENV_ENCRYPTION_KEY not set")
     #Find the file in the project root folder
     ROOT_DIR = Path(__file__).resolve().parent.parent
-    encrypted_path = ROOT_DIR / ".env.encrypted"
+    encrypted_path = Path(os.getenv("DOTENV_ENCRYPTED_PATH", ROOT_DIR / ".env.encrypted"))
 
     if not encrypted_path.exists():
         raise FileNotFoundError(f"No .env.encrypted found at {encrypted_path}")
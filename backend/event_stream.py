@@ -0,0 +1,195 @@
+# kitchen_dashboard/backend/event_stream.py
+
+import json
+import os
+import secrets
+import threading
+import time
+from collections import Counter, deque
+
+from flask import Blueprint, Response, request, stream_with_context
+
+from config import log_error
+from shared_cache import get_cache
+
+HEARTBEAT_INTERVAL = 15  # seconds between keep-alive comments on an idle stream
+HISTORY_SIZE = 256       # events kept for Last-Event-ID resume
+RETRY_MS = 5000          # reconnect delay suggested to EventSource clients
+RELAY_INTERVAL = 0.5     # seconds between checks for events published by other workers
+SUBSCRIBERS_PREFIX = "stream_subscribers:"
+
+stream_api = Blueprint("event_stream", __name__)
+
+
+class EventBus:
+    """
+    In-process publish/subscribe for dashboard updates.
+
+    Event ids look like "<boot>-<n>". The boot part is unique to the process, so a
+    client resuming with an id from an earlier process, or from another worker
+    started in the same second, is told to resync instead of silently missing events.
+    """
+
+    def __init__(self, history_size=HISTORY_SIZE):
+        self.boot_id = f"{os.getpid()}.{secrets.token_hex(4)}"  # No '-': ids split on it
+        self._history = deque(maxlen=history_size)
+        self._last_seq = 0
+        self._subscribers = Counter()  # profile (or None) -> open streams
+        self._cond = threading.Condition()
+
+    @property
+    def subscribers(self):
+        return sum(self._subscribers.values())
+
+    def subscribed_profiles(self):
+        with self._cond:
+            return {profile: count for profile, count in self._subscribers.items() if count}
+
+    def publish(self, event_type, data):
+        """Records an event and wakes every open stream. Returns the event id."""
+        with self._cond:
+            self._last_seq += 1
+            self._history.append((self._last_seq, event_type, data))
+            self._cond.notify_all()
+            return f"{self.boot_id}-{self._last_seq}"
+
+    def resume_point(self, last_event_id):
+        """
+        Turns a Last-Event-ID header into a sequence number to continue from.
+        Returns None when the missed events are no longer available.
+        """
+        if not last_event_id:
+            return self._last_seq
+        boot_id, _, seq = last_event_id.partition("-")
+        if boot_id != self.boot_id or not seq.isdigit():
+            return None
+        seq = int(seq)
+        with self._cond:
+            oldest = self._history[0][0] if self._history else self._last_seq + 1
+            if seq > self._last_seq or seq < oldest - 1:
+                return None
+        return seq
+
+    def wait_for_events(self, after_seq, timeout):
+        """Blocks until events newer than after_seq exist (or timeout) and returns them."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._last_seq > after_seq, timeout)
+            return [event for event in self._history if event[0] > after_seq]
+
+    def subscribe(self, profile=None):
+        with self._cond:
+            self._subscribers[profile] += 1
+
+    def unsubscribe(self, profile=None):
+        with self._cond:
+            self._subscribers[profile] -= 1
+
+
+bus = EventBus()
+_relay_started = False
+_relay_lock = threading.Lock()
+
+
+def publish(event_type, data):
+    """
+    Pushes a typed update (calendar, weather, photo, profile, ...) to connected kiosks,
+    on this worker directly and on the others through the shared cache.
+    """
+    event_id = bus.publish(event_type, data)
+    try:
+        get_cache().append_event(event_type, data)
+    except Exception as e:
+        log_error(f"Sharing {event_type} event with other workers failed: {e}")
+    return event_id
+
+
+def _relay():
+    """Replays events published by other workers onto this worker's bus."""
+    cache = get_cache()
+    last_seq = cache.last_event_seq()
+    while True:
+        time.sleep(RELAY_INTERVAL)
+        try:
+            for seq, event_type, data in cache.events_since(last_seq):
+                bus.publish(event_type, data)
+                last_seq = seq
+        except Exception as e:
+            log_error(f"Event relay failed: {e}")
+
+
+def _start_relay():
+    global _relay_started
+    with _relay_lock:
+        if _relay_started:
+            return
+        _relay_started = True
+    threading.Thread(target=_relay, name="event-relay", daemon=True).start()
+
+
+def _share_subscribers():
+    """Records which profiles have open streams on this worker, for the leader's slideshow tick."""
+    try:
+        get_cache().put(f"{SUBSCRIBERS_PREFIX}{os.getpid()}", bus.subscribed_profiles())
+    except Exception as e:
+        log_error(f"Sharing stream subscribers failed: {e}")
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def subscribed_profiles():
+    """Profiles with an open stream on any live worker. None stands for unfiltered streams."""
+    profiles = set(bus.subscribed_profiles())
+    for key, counts in get_cache().items(SUBSCRIBERS_PREFIX):
+        if counts and _alive(int(key[len(SUBSCRIBERS_PREFIX):])):
+            profiles.update(None if p == "null" else p for p in counts)
+    return profiles
+
+
+def _format(event_id, event_type, data):
+    return f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data)}\n\n"
+
+
+@stream_api.route("/api/stream")
+def stream():
+    """
+    Server-Sent Events feed of widget updates. Events that belong to another
+    profile (photo, profile) are filtered out when ?profile= is given.
+    """
+    profile = request.args.get("profile")
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("lastEventId")
+
+    def generate():
+        _start_relay()
+        bus.subscribe(profile)
+        _share_subscribers()
+        try:
+            yield f"retry: {RETRY_MS}\n\n"
+            seq = bus.resume_point(last_event_id)
+            if seq is None:
+                # Too far behind (or from an earlier run): client should refetch everything
+                seq = bus.resume_point(None)
+                yield _format(f"{bus.boot_id}-{seq}", "resync", {})
+            while True:
+                events = bus.wait_for_events(seq, HEARTBEAT_INTERVAL)
+                if not events:
+                    yield ": heartbeat\n\n"
+                    continue
+                for event_seq, event_type, data in events:
+                    seq = event_seq
+                    if profile and isinstance(data, dict) and data.get("profile") not in (None, profile):
+                        continue
+                    yield _format(f"{bus.boot_id}-{event_seq}", event_type, data)
+        finally:
+            bus.unsubscribe(profile)
+            _share_subscribers()
+
+    return Response(stream_with_context(generate()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
@@ -0,0 +1,66 @@
+# kitchen_dashboard/backend/leader.py
+
+import fcntl
+import logging
+import os
+import threading
+from pathlib import Path
+
+from config import LOG_PATH
+
+logger = logging.getLogger(__name__)
+
+# Whoever holds an flock on this file runs the pollers. The kernel drops the lock
+# when that process exits, so a standby worker takes over on its next attempt.
+LEADER_LOCK_PATH = Path(os.getenv('LEADER_LOCK_PATH', LOG_PATH / 'leader.lock'))
+RETRY_INTERVAL = 30  # seconds between takeover attempts by standby workers
+
+_lock_file = None
+_state_lock = threading.Lock()
+
+
+def is_leader():
+    return _lock_file is not None
+
+
+def try_acquire():
+    """Tries once to become leader without blocking. Returns True if this process leads."""
+    global _lock_file
+    with _state_lock:
+        if _lock_file is not None:
+            return True
+        LEADER_LOCK_PATH.parent.mkdir(parents=True, exist_ok=True)
+        lock_file = open(LEADER_LOCK_PATH, 'a+')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(str(os.getpid()))
+        lock_file.flush()
+        _lock_file = lock_file
+        return True
+
+
+def elect(on_elected):
+    """
+    Runs on_elected() in this process once it becomes leader: right away if the
+    lock is free, otherwise from a standby thread that keeps retrying.
+    """
+    if try_acquire():
+        logger.info(f"👑 Worker {os.getpid()} is the poller leader.")
+        on_elected()
+        return
+
+    def standby():
+        stop = threading.Event()
+        while not stop.wait(RETRY_INTERVAL):
+            if try_acquire():
+                logger.info(f"👑 Worker {os.getpid()} took over as poller leader.")
+                on_elected()
+                return
+
+    logger.info(f"👀 Worker {os.getpid()} is a reader; another worker runs the pollers.")
+    threading.Thread(target=standby, name='leader-standby', daemon=True).start()
@@ -0,0 +1,176 @@
+# kitchen_dashboard/backend/log_setup.py
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+from collections import deque
+from datetime import datetime, timezone
+
+from config import LOG_PATH
+from leader import is_leader
+from shared_cache import get_cache
+
+# error.log is rotated by size so the SD card never fills up
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', 3))
+LOG_FLUSH_INTERVAL = float(os.getenv('LOG_FLUSH_INTERVAL', 5))  # seconds errors are batched before writing
+LOG_BUFFER_RECORDS = 100  # ...or until this many are waiting
+RECENT_ERRORS = 200  # Errors kept in the shared cache for /api/logs/errors
+
+FILE_FORMAT = logging.Formatter('[%(asctime)s] [%(levelname)s] %(message)s', '%Y-%m-%d %H:%M:%S')
+CONSOLE_FORMAT = logging.Formatter(logging.BASIC_FORMAT)
+
+_listener = None
+_queue_handler = None
+_flusher = None
+_flusher_stop = threading.Event()
+_setup_lock = threading.Lock()
+
+
+class LeaderRotatingFileHandler(logging.handlers.WatchedFileHandler):
+    """
+    Every worker appends to the same file and reopens it after a rotation; only the
+    leader rotates, so two workers never rename the backups over each other.
+    """
+
+    def __init__(self, filename, max_bytes, backup_count):
+        super().__init__(filename, encoding='utf-8', delay=True)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+
+    def emit(self, record):
+        if self.max_bytes and is_leader():
+            try:
+                if os.path.getsize(self.baseFilename) + len(self.format(record)) + 1 > self.max_bytes:
+                    self._rotate()
+            except FileNotFoundError:
+                pass
+        super().emit(record)  # Reopens the file if it was rotated away
+
+    def _rotate(self):
+        for n in range(self.backup_count - 1, 0, -1):
+            source = f"{self.baseFilename}.{n}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.baseFilename}.{n + 1}")
+        if self.backup_count:
+            os.replace(self.baseFilename, f"{self.baseFilename}.1")
+        else:
+            os.remove(self.baseFilename)
+
+
+class RecentErrors(logging.Handler):
+    """
+    Keeps the last few error records of every worker in the shared cache's
+    append-only errors table, for /api/logs/errors and the daily status email.
+    Records are buffered in memory and appended in one transaction per flush().
+    """
+
+    def __init__(self, capacity=RECENT_ERRORS, cache=None):
+        super().__init__(level=logging.ERROR)
+        self.capacity = capacity
+        self.cache = cache
+        self.pending = deque(maxlen=capacity)
+        self.setFormatter(logging.Formatter('%(message)s'))
+
+    def _cache(self):
+        return self.cache or get_cache()
+
+    def emit(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'pid': record.process,
+            'message': self.format(record),
+        }
+        with self.lock:
+            self.pending.append(entry)
+
+    def flush(self):
+        with self.lock:
+            entries, self.pending = list(self.pending), deque(maxlen=self.capacity)
+        if entries:
+            try:
+                self._cache().append_errors(entries, self.capacity)
+            except Exception as e:
+                print(f"⚠️ Could not store {len(entries)} recent errors: {e}")
+
+    def recent(self, limit=None):
+        """The newest errors of every worker, plus this worker's not yet flushed ones."""
+        limit = min(limit or self.capacity, self.capacity)
+        with self.lock:
+            pending = list(self.pending)
+        return (self._cache().recent_errors(limit) + pending)[-limit:]
+
+
+recent_errors = RecentErrors()
+
+
+def setup_logging(log_path=LOG_PATH, max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT):
+    """
+    Routes every logger through a queue to one background thread, which prints
+    everything from INFO up to the console and buffers errors. A flusher thread
+    appends the buffered errors to a size-rotated error.log and the shared
+    recent-errors table every LOG_FLUSH_INTERVAL seconds (at once for CRITICAL),
+    so the SD card sees one write per batch. Request threads only enqueue the
+    record. Safe to call more than once.
+    """
+    global _listener, _queue_handler, _flusher
+    with _setup_lock:
+        if _listener is not None:
+            return
+        os.makedirs(log_path, exist_ok=True)
+        file_handler = LeaderRotatingFileHandler(os.path.join(log_path, 'error.log'), max_bytes, backup_count)
+        file_handler.setLevel(logging.ERROR)
+        file_handler.setFormatter(FILE_FORMAT)
+        buffered_file = logging.handlers.MemoryHandler(LOG_BUFFER_RECORDS, flushLevel=logging.CRITICAL,
+                                                       target=file_handler, flushOnClose=True)
+        buffered_file.setLevel(logging.ERROR)
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(CONSOLE_FORMAT)
+
+        log_queue = queue.SimpleQueue()
+        _queue_handler = logging.handlers.QueueHandler(log_queue)
+        _listener = logging.handlers.QueueListener(log_queue, buffered_file, recent_errors, console_handler,
+                                                   respect_handler_level=True)
+        _listener.start()
+        _flusher_stop.clear()
+        _flusher = threading.Thread(target=_flush_periodically, args=(buffered_file, recent_errors),
+                                    name='log-flusher', daemon=True)
+        _flusher.start()
+
+        root = logging.getLogger()
+        root.setLevel(logging.INFO)
+        root.addHandler(_queue_handler)
+    atexit.register(shutdown_logging)
+
+
+def _flush_periodically(*handlers):
+    while True:
+        stopping = _flusher_stop.wait(LOG_FLUSH_INTERVAL)
+        for handler in handlers:
+            handler.flush()
+        if stopping:
+            return
+
+
+def shutdown_logging():
+    """Writes out whatever is still queued or buffered and detaches the handlers."""
+    global _listener, _queue_handler, _flusher
+    with _setup_lock:
+        if _listener is None:
+            return
+        root = logging.getLogger()
+        root.removeHandler(_queue_handler)
+        _listener.stop()
+        _flusher_stop.set()  # One last flush, still off the calling thread
+        _flusher.join()
+        for handler in _listener.handlers:
+            target = getattr(handler, 'target', None)  # close() drops a MemoryHandler's target
+            handler.close()
+            if target is not None:
+                target.close()
+        _listener = _queue_handler = _flusher = None
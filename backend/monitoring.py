@@ -0,0 +1,39 @@
+# kitchen_dashboard/backend/monitoring.py
+
+import os
+import time
+
+from flask import Blueprint, Response, g, jsonify, request
+
+from log_setup import recent_errors
+from utils.metrics import REQUEST_LATENCY, REQUESTS, render
+
+monitoring_api = Blueprint("monitoring", __name__)
+
+
+@monitoring_api.before_app_request
+def _start_timer():
+    g.request_started = time.perf_counter()
+
+
+@monitoring_api.after_app_request
+def _record_request(response):
+    """Observes every response under its route template, so /api/onedrive/photo/<key> is one series."""
+    started = g.pop("request_started", None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else "<unmatched>"
+        REQUEST_LATENCY.observe(time.perf_counter() - started, route, request.method)
+        REQUESTS.inc(route, request.method, str(response.status_code))
+    return response
+
+
+@monitoring_api.route("/api/logs/errors")
+def errors():
+    """The most recent errors logged by any worker (?limit=N), newest last."""
+    return jsonify({"pid": os.getpid(), "errors": recent_errors.recent(request.args.get("limit", type=int))})
+
+
+@monitoring_api.route("/metrics")
+def metrics():
+    """Request, upstream and cache metrics of this worker, in the Prometheus text format."""
+    return Response(render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
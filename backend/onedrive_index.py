@@ -0,0 +1,241 @@
+# kitchen_dashboard/backend/onedrive_index.py
+
+import fcntl
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from utils import http_client
+from utils.metrics import upstream_call, upstream_error
+from utils.resilience import TIMEOUTS
+
+logger = logging.getLogger(__name__)
+
+# Local index of the photo folder: item metadata keyed by OneDrive item id,
+# plus the Graph deltaLink that lets the next refresh fetch only what changed.
+PHOTO_CACHE_DIR = Path(os.getenv("PHOTO_CACHE_DIR", Path(__file__).resolve().parent / "../static_data/onedrive_images"))
+INDEX_PATH = PHOTO_CACHE_DIR / "image_index.json"
+
+GRAPH_BASE_URL = os.getenv("GRAPH_BASE_URL", "https://graph.microsoft.com/v1.0")  # Overridden by the benchmarks
+GRAPH_DELTA_ENDPOINT = GRAPH_BASE_URL + "/me/drive/root:/{}:/delta"
+GRAPH_BATCH_ENDPOINT = GRAPH_BASE_URL + "/$batch"
+GRAPH_BATCH_LIMIT = 20  # Graph accepts at most 20 requests per $batch
+REQUEST_TIMEOUT = TIMEOUTS["onedrive"]  # seconds
+
+# Pre-signed @microsoft.graph.downloadUrl links last about an hour; treat them
+# as stale well before that so a download never starts on a dying link.
+DOWNLOAD_URL_MAX_AGE = 45 * 60  # seconds
+
+_index = None
+_index_stamp = None  # (mtime, size, inode) of the file _index was read from
+_index_lock = threading.Lock()
+
+
+def _empty_index(folder):
+    return {"folder": folder, "delta_link": None, "items": {}}
+
+
+def _file_stamp():
+    try:
+        st = os.stat(INDEX_PATH)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _load(folder):
+    """
+    The index, read again whenever the file has changed since it was last read, so
+    workers other than the leader see each index the leader writes.
+    """
+    global _index, _index_stamp
+    stamp = _file_stamp()
+    if _index is None or stamp != _index_stamp:
+        _index_stamp = stamp
+        try:
+            with open(INDEX_PATH) as f:
+                _index = json.load(f)
+        except FileNotFoundError:
+            _index = _empty_index(folder)
+        except Exception as e:
+            logger.error(f"❌ OneDrive index unreadable, rebuilding: {e}")
+            _index = _empty_index(folder)
+    if _index.get("folder") != folder:
+        _index = _empty_index(folder)
+    return _index
+
+
+@contextmanager
+def _file_lock():
+    """Serializes index writes across every worker process."""
+    INDEX_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with open(INDEX_PATH.with_suffix(".lock"), "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _save(index):
+    """Writes the index atomically. Callers hold _index_lock and _file_lock()."""
+    global _index, _index_stamp
+    fd, tmp_path = tempfile.mkstemp(dir=INDEX_PATH.parent, prefix=INDEX_PATH.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, INDEX_PATH)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    _index = index
+    _index_stamp = _file_stamp()
+
+
+def is_image(item):
+    return "image" in item or item.get("file", {}).get("mimeType", "").startswith("image/")
+
+
+def item_record(item):
+    """The metadata we keep for one photo."""
+    hashes = item.get("file", {}).get("hashes", {})
+    image = item.get("image", {})
+    return {
+        "id": item["id"],
+        "name": item.get("name"),
+        "eTag": item.get("eTag"),
+        "cTag": item.get("cTag"),
+        "size": item.get("size"),
+        "width": image.get("width"),
+        "height": image.get("height"),
+        "hash": hashes.get("quickXorHash") or hashes.get("sha1Hash"),
+        "download_url": item.get("@microsoft.graph.downloadUrl"),
+        "url_fetched_at": time.time(),
+    }
+
+
+def download_url_is_fresh(record, max_age=DOWNLOAD_URL_MAX_AGE):
+    return bool(record.get("download_url")) and time.time() - record.get("url_fetched_at", 0) < max_age
+
+
+def sync_index(token, folder):
+    """
+    Brings the local index up to date with a OneDrive folder.
+
+    The first run walks the whole folder through the Graph delta query, following
+    every @odata.nextLink page. Later runs resume from the stored deltaLink and only
+    receive added, changed or deleted items.
+
+    Returns:
+        tuple: (list of photo records, set of ids whose content changed or was removed),
+               or None if Graph could not be reached (the index is left untouched).
+    """
+    headers = {"Authorization": f"Bearer {token}"}
+    with _index_lock:
+        index = _load(folder)
+        items = dict(index["items"])
+        url = index["delta_link"] or GRAPH_DELTA_ENDPOINT.format(folder)
+        changed = set()
+
+        while url:
+            with upstream_call("onedrive"):
+                response = http_client.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+            if response.status_code != 200:
+                upstream_error("onedrive")
+            if response.status_code == 410 and index["delta_link"]:
+                # deltaLink no longer valid: Graph wants a full resync
+                logger.warning("⚠️ OneDrive delta token expired, re-indexing folder.")
+                changed |= set(items)
+                index = _empty_index(folder)
+                items = {}
+                url = GRAPH_DELTA_ENDPOINT.format(folder)
+                continue
+            if response.status_code != 200:
+                logger.error(f"❌ OneDrive API failed: {response.text}")
+                return None
+
+            data = response.json()
+            for item in data.get("value", []):
+                previous = items.get(item["id"])
+                if "deleted" in item or not is_image(item):
+                    if items.pop(item["id"], None) is not None:
+                        changed.add(item["id"])
+                    continue
+                record = item_record(item)
+                # cTag only moves when the file content changes, not on renames
+                if previous and previous.get("cTag") != record["cTag"]:
+                    changed.add(item["id"])
+                items[item["id"]] = record
+
+            url = data.get("@odata.nextLink")
+            if not url:
+                index["delta_link"] = data.get("@odata.deltaLink")
+
+        index["items"] = items
+        with _file_lock():
+            _save(index)
+        logger.info(f"🗂️ OneDrive index synced: {len(items)} photos, {len(changed)} changed/removed.")
+        return list(items.values()), changed
+
+
+def load_index_records(folder):
+    """Photo records from the local index, without calling Graph."""
+    with _index_lock:
+        return list(_load(folder)["items"].values())
+
+
+def index_record(folder, item_id):
+    """One photo's record as last written to the index, or None."""
+    with _index_lock:
+        return _load(folder)["items"].get(item_id)
+
+
+def refresh_download_urls(token, item_ids):
+    """
+    Re-resolves download URLs for the given items through Graph $batch, 20 items
+    per round trip, and updates their records in place.
+
+    Returns:
+        dict: item id -> new download URL, for the items Graph answered.
+    """
+    headers = {"Authorization": f"Bearer {token}"}
+    item_ids = list(dict.fromkeys(item_ids))
+    resolved = {}
+
+    for start in range(0, len(item_ids), GRAPH_BATCH_LIMIT):
+        chunk = item_ids[start:start + GRAPH_BATCH_LIMIT]
+        body = {"requests": [
+            {"id": str(n), "method": "GET",
+             "url": f"/me/drive/items/{item_id}?select=id,@microsoft.graph.downloadUrl"}
+            for n, item_id in enumerate(chunk)
+        ]}
+        with upstream_call("onedrive"):
+            response = http_client.post(GRAPH_BATCH_ENDPOINT, headers=headers, json=body, timeout=REQUEST_TIMEOUT)
+        if response.status_code != 200:
+            upstream_error("onedrive")
+            logger.error(f"❌ OneDrive batch URL refresh failed: {response.text}")
+            continue
+        for answer in response.json().get("responses", []):
+            url = answer.get("body", {}).get("@microsoft.graph.downloadUrl")
+            if answer.get("status") == 200 and url:
+                resolved[chunk[int(answer["id"])]] = url
+
+    now = time.time()
+    with _index_lock, _file_lock():
+        # Merged into the index as it is on disk now, so a newer sync is never overwritten
+        index = _load(_index["folder"]) if _index else None
+        items = index["items"] if index else {}
+        for item_id, url in resolved.items():
+            record = items.get(item_id)
+            if record is not None:
+                record["download_url"] = url
+                record["url_fetched_at"] = now
+        if resolved and index:
+            _save(index)
+    logger.info(f"🔗 Refreshed {len(resolved)}/{len(item_ids)} OneDrive download URLs.")
+    return resolved
@@ -1,71 +1,382 @@
 # kitchen_dashboard/backend/onedrive_widget.py
 
+import hashlib
 import os
-import time
 import random
-import json
+import time
 import logging
-from pathlib import Path
-from flask import jsonify
-
-from auth.onedrive_credentials import get_onedrive_token
+import threading
+from urllib.parse import urlencode
+from flask import Blueprint, jsonify, request, send_file
+from requests import HTTPError
 
-import requests
+from photo_queue import SlideshowQueue
+from scheduler import get_scheduler
+from event_stream import publish, subscribed_profiles
+from leader import is_leader
+from shared_cache import get_cache
+from onedrive_index import (GRAPH_BATCH_LIMIT, DOWNLOAD_URL_MAX_AGE, download_url_is_fresh, index_record,
+                            load_index_records, refresh_download_urls, sync_index)
+from photo_renditions import discard, get_rendition, mimetype_for, original_path
+from widget_profiles import get_profile
+from utils.metrics import register_snapshot
+from utils.resilience import CircuitOpenError, get_breaker
 
 logger = logging.getLogger(__name__)
 
-# Cache path
-CACHE_PATH = Path(__file__).resolve().parent / "../static_data/onedrive_images/image_cache.json"
-
 # Folder ID or name on OneDrive
 ONEDRIVE_FOLDER_NAME = "Space Background photos"
 
-GRAPH_API_ENDPOINT = "https://graph.microsoft.com/v1.0/me/drive/root:/{}:/children"
+# Rendition size used when a profile has no photos widget configured
+DEFAULT_PHOTO_SIZE = (500, 500)
+RENDITION_MAX_AGE = 30 * 24 * 3600  # Safe because photo_url() changes whenever the rendition would
+
+PREFETCH_FORMAT = "webp"  # What the kiosk's Chromium asks for
+INDEX_REFRESH_INTERVAL = 900  # seconds between delta refreshes of the folder index
+URL_REFRESH_INTERVAL = 600  # seconds between background download-URL refreshes
+URL_LOOKAHEAD = 20  # Upcoming photos per profile whose download URLs are kept alive
+URL_REQUEST_CHECK_INTERVAL = 2  # seconds between the leader's checks for URLs other workers need
+URL_REQUEST_WAIT = 10  # seconds a worker waits for the leader to resolve a URL it asked for
+URL_POLL_INTERVAL = 0.25  # seconds between a waiting worker's looks at the index
+PHOTO_ADVANCE_INTERVAL = int(os.getenv("PHOTO_ADVANCE_INTERVAL", "60"))  # seconds per photo on streamed kiosks
+
+onedrive_api = Blueprint("onedrive_widget", __name__)
+
+# In-memory image set (item id -> photo record) and one slideshow queue per profile.
+# The leader bumps SHARED_KEY after each index sync; other workers then reload the index from disk.
+SHARED_KEY = "onedrive_index"
+URL_REQUEST_KEY = "onedrive_url_requests"
+_images = None
+_images_version = None
+_queues = {}
+_state_lock = threading.Lock()
+
+def _indexed_at():
+    entry = get_cache().get_entry(SHARED_KEY)
+    return entry["updated_at"] if entry else None
+
+register_snapshot("photos", _indexed_at)
+
+def get_onedrive_token():
+    """Current Graph access token. msal and cryptography are only imported on first use."""
+    from auth.onedrive_credentials import get_onedrive_token as current_token
+    return current_token()
+
+
+def _sync():
+    return sync_index(get_onedrive_token(), ONEDRIVE_FOLDER_NAME)
+
 
 def fetch_onedrive_images():
     """
-    Retrieves image file metadata from the OneDrive folder and caches them.
+    Refreshes the local index of the OneDrive photo folder (paged, delta-based)
+    and returns its photo records. While OneDrive is unreachable the last
+    indexed records are returned as they are.
     """
-    token = get_onedrive_token()
-    headers = {"Authorization": f"Bearer {token}"}
-    folder_url = GRAPH_API_ENDPOINT.format(ONEDRIVE_FOLDER_NAME)
-
-    response = requests.get(folder_url, headers=headers)
-    if response.status_code != 200:
-        logger.error(f"❌ OneDrive API failed: {response.text}")
+    try:
+        result = get_breaker("onedrive").call(_sync, is_failure=lambda result: result is None)
+    except CircuitOpenError:
+        return load_index_records(ONEDRIVE_FOLDER_NAME) or []
+    if result is None:
         return []
 
-    items = response.json().get("value", [])
-    image_links = []
+    records, changed = result
+    for item_id in changed:
+        discard(item_id)  # Edited or removed: old renditions are stale
+    _set_images(records)
+    get_cache().put(SHARED_KEY, {"count": len(records), "changed": len(changed)})
+    return records
 
-    for item in items:
-        if "image" in item.get("file", {}):  # Ensures it's an image
-            image_links.append(item["@microsoft.graph.downloadUrl"])
 
-    # Cache it
-    CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
-    with open(CACHE_PATH, "w") as f:
-        json.dump(image_links, f)
+def load_cached_images():
+    """
+    Photo records from the local index. The leader indexes the folder if it has
+    never been synced; other workers wait for the leader to do it.
+    """
+    records = load_index_records(ONEDRIVE_FOLDER_NAME)
+    if records or not is_leader():
+        return records or []
+    return fetch_onedrive_images()
 
-    return image_links
 
+def photo_size(profile):
+    """Width and height of the photos widget in a profile."""
+    photos = get_profile(profile).get("photos", {})
+    return photos.get("width", DEFAULT_PHOTO_SIZE[0]), photos.get("height", DEFAULT_PHOTO_SIZE[1])
 
-def load_cached_images():
-    if not CACHE_PATH.exists():
-        return fetch_onedrive_images()
 
-    with open(CACHE_PATH) as f:
-        return json.load(f)
+def photo_url(key, profile):
+    """
+    The rendition URL of a photo for a profile. It carries the photo's cTag and the
+    widget size, so an edited photo or a resized widget gets a new URL rather than
+    the copy the browser cached.
+    """
+    width, height = photo_size(profile)
+    ctag = (get_images().get(key) or {}).get("cTag") or ""
+    version = f"{hashlib.sha1(ctag.encode()).hexdigest()[:10]}-{width}x{height}"
+    return f"/api/onedrive/photo/{key}?{urlencode({'profile': profile, 'v': version})}"
+
+
+def _set_images(records):
+    """Swaps in a new image set and lets every slideshow queue pick up the change."""
+    global _images
+    images = {record["id"]: record for record in records}
+    with _state_lock:
+        _images = images
+        queues = list(_queues.values())
+    for queue in queues:
+        queue.update(list(images))
+
+
+def get_images():
+    """
+    Returns the in-memory image set, loading it from the local index until it has
+    photos and again whenever the leader has synced a change.
+    """
+    global _images_version
+    entry = get_cache().get_entry(SHARED_KEY)
+    version = entry["version"] if entry else None
+    if not _images or version != _images_version:
+        _images_version = version
+        _set_images(load_cached_images())
+    return _images
+
+
+def load_persisted_images():
+    """Boot warm-up: loads the image set from the local index only, never calling Graph."""
+    global _images_version
+    records = load_index_records(ONEDRIVE_FOLDER_NAME)
+    if records:
+        entry = get_cache().get_entry(SHARED_KEY)
+        _images_version = entry["version"] if entry else None
+        _set_images(records)
+
+
+def _stale_keys(keys, max_age=DOWNLOAD_URL_MAX_AGE):
+    """Keys that still need downloading but whose download URL is (nearly) expired."""
+    images = _images or {}
+    return [key for key in dict.fromkeys(keys)
+            if key in images and not original_path(key).exists()
+            and not download_url_is_fresh(images[key], max_age)]
+
+
+def refresh_photo_urls(keys):
+    """Re-resolves download URLs for the given photos in Graph $batch calls."""
+    if not keys:
+        return {}
+    try:
+        resolved = get_breaker("onedrive").call(
+            lambda: refresh_download_urls(get_onedrive_token(), keys), is_failure=lambda resolved: not resolved)
+    except CircuitOpenError:
+        return {}
+    images = _images or {}
+    now = time.time()
+    for key, url in resolved.items():
+        if key in images:
+            images[key].update(download_url=url, url_fetched_at=now)
+    return resolved
+
+
+def request_photo_urls(keys):
+    """Asks the leader to re-resolve download URLs. Only the leader calls Graph or writes the index."""
+    get_cache().update(URL_REQUEST_KEY, lambda requested: list(dict.fromkeys(requested + keys)), default=[])
+
 
+def resolve_url_requests():
+    """Leader job: resolves the download URLs other workers have asked for."""
+    if not get_cache().get(URL_REQUEST_KEY):
+        return
+    requested = []
+
+    def take(keys):
+        requested.extend(keys)
+        return []
+
+    get_cache().update(URL_REQUEST_KEY, take, default=[])
+    refresh_photo_urls(requested)
+
+
+def _wait_for_leader_url(key, keys):
+    """Queues stale keys for the leader and waits until the index it writes has a live URL for key."""
+    request_photo_urls(keys)
+    deadline = time.monotonic() + URL_REQUEST_WAIT
+    while time.monotonic() < deadline:
+        record = index_record(ONEDRIVE_FOLDER_NAME, key)
+        if record is not None and download_url_is_fresh(record):
+            _images[key].update(download_url=record["download_url"], url_fetched_at=record["url_fetched_at"])
+            return
+        time.sleep(URL_POLL_INTERVAL)
+    raise TimeoutError(f"No download URL for {key} from the leader after {URL_REQUEST_WAIT}s")
+
+
+def resolve_download_url(key, profile):
+    """
+    Returns a live download URL for a photo. A stale link is re-resolved in the same
+    $batch as any other stale links coming up in the profile's slideshow; on other
+    workers than the leader the batch is handed to the leader.
+    """
+    record = _images[key]
+    if not download_url_is_fresh(record):
+        queue = _queues.get(profile)
+        upcoming = queue.upcoming(GRAPH_BATCH_LIMIT) if queue else []
+        keys = ([key] + _stale_keys(upcoming))[:GRAPH_BATCH_LIMIT]
+        if is_leader():
+            refresh_photo_urls(keys)
+        else:
+            _wait_for_leader_url(key, keys)
+    return record["download_url"]
 
-_last_served = 0
 
-def get_next_image():
+def render_photo(key, profile, fmt):
     """
-    Returns a random image from the cached list.
+    Builds (or reuses) the rendition of a photo for a profile's photo widget. Photos
+    that still need downloading fail fast while the OneDrive breaker is open.
     """
-    images = load_cached_images()
+    width, height = photo_size(profile)
+    if original_path(key).exists():
+        return get_rendition(key, lambda: resolve_download_url(key, profile), width, height, fmt)
+    try:
+        return get_breaker("onedrive").call(
+            get_rendition, key, lambda: resolve_download_url(key, profile), width, height, fmt)
+    except HTTPError as e:
+        # The link died before we expected it to; resolve a new one and retry once
+        logger.warning(f"⚠️ Download link for {key} failed ({e}), re-resolving.")
+        _images[key]["url_fetched_at"] = 0
+        return get_rendition(key, lambda: resolve_download_url(key, profile), width, height, fmt)
+
+
+def refresh_upcoming_urls():
+    """
+    Background job: renews the download URLs of each profile's next photos
+    before they lapse, so prefetching never starts on a dead link.
+    """
+    with _state_lock:
+        queues = list(_queues.values())
+    keys = [key for queue in queues for key in queue.upcoming(URL_LOOKAHEAD)]
+    # Anything that would expire before the next run is refreshed now
+    refresh_photo_urls(_stale_keys(keys, DOWNLOAD_URL_MAX_AGE - URL_REFRESH_INTERVAL))
+
+
+def get_slideshow(profile):
+    """Returns the profile's slideshow queue, creating it on first use."""
+    images = get_images()
+    with _state_lock:
+        queue = _queues.get(profile)
+        if queue is None:
+            queue = _queues[profile] = SlideshowQueue(
+                lambda key: render_photo(key, profile, PREFETCH_FORMAT))
+            queue.update(list(images))
+    return queue
+
+
+def next_image_url(profile):
+    """Advances the profile's slideshow and returns the rendition URL, or None without photos."""
+    images = get_images()
     if not images:
+        return None
+    if get_breaker("onedrive").is_open():
+        # Offline: show a photo that is already on disk, leaving the shuffle bag
+        # (and its prefetches, which would only fail) alone until OneDrive is back
+        cached = [key for key in images if original_path(key).exists()]
+        if cached:
+            return photo_url(random.choice(cached), profile)
+    return photo_url(get_slideshow(profile).next(), profile)
+
+
+def get_next_image(profile="default"):
+    """
+    Returns the profile's next slideshow image as a URL to a rendition sized for
+    its photo widget. No photo repeats until the whole set has been shown.
+    """
+    image_url = next_image_url(profile)
+    if image_url is None:
         return jsonify({"error": "No images found"}), 404
+    return jsonify({"image_url": image_url}), 200
 
-    return jsonify({"image_url": random.choice(images)})
\ No newline at end of file
+
+def advance_slideshows():
+    """
+    Leader job: pushes the next photo to every profile with a kiosk on /api/stream,
+    whichever worker that kiosk is connected to.
+    """
+    streamed = subscribed_profiles()
+    if not streamed:
+        return
+    with _state_lock:
+        profiles = set(_queues)
+    profiles.update(profile for profile in streamed if profile)
+    for profile in sorted(profiles):
+        image_url = next_image_url(profile)
+        if image_url:
+            publish("photo", {"profile": profile, "image_url": image_url})
+
+
+@onedrive_api.route("/api/onedrive/photo/<key>")
+def serve_photo_rendition(key):
+    """
+    Serves a resized, EXIF-rotated copy of a cached OneDrive photo. WebP is sent to
+    browsers that accept it, JPEG otherwise (or when ?format=jpeg is given).
+    """
+    if key not in get_images():
+        return jsonify({"error": "Unknown image"}), 404
+
+    fmt = request.args.get("format")
+    if fmt not in ("webp", "jpeg"):
+        fmt = "webp" if request.accept_mimetypes["image/webp"] else "jpeg"
+
+    try:
+        path = render_photo(key, request.args.get("profile", "default"), fmt)
+    except CircuitOpenError:
+        return jsonify({"error": "Image unavailable offline"}), 503
+    except Exception as e:
+        logger.error(f"❌ Rendition failed for {key}: {e}")
+        return jsonify({"error": "Image unavailable"}), 502
+
+    response = send_file(path, mimetype=mimetype_for(fmt), max_age=RENDITION_MAX_AGE)
+    response.vary.add("Accept")
+    return response
+
+
+def start_photo_polling():
+    """
+    Schedules a delta refresh of the OneDrive folder index every INDEX_REFRESH_INTERVAL
+    seconds, a download-URL refresh for upcoming photos every URL_REFRESH_INTERVAL,
+    the check for URLs other workers asked for, and the streamed slideshow tick
+    every PHOTO_ADVANCE_INTERVAL.
+    """
+    get_scheduler().add_job(
+        fetch_onedrive_images,
+        "interval",
+        seconds=INDEX_REFRESH_INTERVAL,
+        id="onedrive_index_refresh",
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True,
+    )
+    get_scheduler().add_job(
+        refresh_upcoming_urls,
+        "interval",
+        seconds=URL_REFRESH_INTERVAL,
+        id="onedrive_url_refresh",
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True,
+    )
+    get_scheduler().add_job(
+        resolve_url_requests,
+        "interval",
+        seconds=URL_REQUEST_CHECK_INTERVAL,
+        id="onedrive_url_requests",
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True,
+    )
+    get_scheduler().add_job(
+        advance_slideshows,
+        "interval",
+        seconds=PHOTO_ADVANCE_INTERVAL,
+        id="onedrive_slideshow_advance",
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True,
+    )
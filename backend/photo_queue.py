@@ -0,0 +1,119 @@
+# kitchen_dashboard/backend/photo_queue.py
+
+import itertools
+import logging
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+PREFETCH_COUNT = 3    # Photos kept ready on disk ahead of the one being shown
+PREFETCH_WORKERS = 2  # Shared download/resize threads for all profiles
+
+_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="photo-prefetch")
+
+
+class ShuffleBag:
+    """
+    Random order that shows every item once before any item repeats.
+    The last item of one round is never the first of the next.
+    """
+
+    def __init__(self, items=(), rng=None):
+        self._rng = rng or random.Random()
+        self._items = []
+        self._upcoming = deque()
+        self._last = None
+        self.update(items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def update(self, items):
+        """Replaces the item set. Removed items drop out, new ones join the current round."""
+        items = list(dict.fromkeys(items))
+        current, known = set(items), set(self._items)
+        self._upcoming = deque(i for i in self._upcoming if i in current)
+        for item in items:
+            if item not in known:
+                self._upcoming.insert(self._rng.randint(0, len(self._upcoming)), item)
+        self._items = items
+
+    def _refill(self):
+        next_round = self._items[:]
+        self._rng.shuffle(next_round)
+        previous = self._upcoming[-1] if self._upcoming else self._last
+        if len(next_round) > 1 and next_round[0] == previous:
+            next_round[0], next_round[-1] = next_round[-1], next_round[0]
+        self._upcoming.extend(next_round)
+
+    def next(self):
+        if not self._items:
+            return None
+        if not self._upcoming:
+            self._refill()
+        self._last = self._upcoming.popleft()
+        return self._last
+
+    def peek(self, count):
+        """The next `count` items next() will return, without consuming them."""
+        while len(self._upcoming) < count and self._items:
+            self._refill()
+        return list(itertools.islice(self._upcoming, count))
+
+
+class SlideshowQueue:
+    """
+    Per-profile slideshow: a ShuffleBag of image keys plus background prefetching,
+    so the next few photos are already downloaded and resized when they are asked for.
+
+    Args:
+        prepare (callable): prepare(key) makes the photo ready locally (e.g. builds its rendition).
+    """
+
+    def __init__(self, prepare, prefetch_count=PREFETCH_COUNT):
+        self._bag = ShuffleBag()
+        self._prepare = prepare
+        self._prefetch_count = prefetch_count
+        self._pending = {}
+        self._ready = set()
+        # Re-entrant: a prefetch that finishes instantly runs _done inside _prefetch
+        self._lock = threading.RLock()
+
+    def update(self, keys):
+        with self._lock:
+            self._bag.update(keys)
+            self._ready &= set(keys)
+
+    def next(self):
+        """Returns the next image key (or None) and queues prefetches for the ones after it."""
+        with self._lock:
+            key = self._bag.next()
+            upcoming = self._bag.peek(self._prefetch_count)
+        if key is not None:
+            self._prefetch([key] + upcoming)
+        return key
+
+    def upcoming(self, count):
+        """The keys next() will hand out after the current one."""
+        with self._lock:
+            return self._bag.peek(count)
+
+    def _prefetch(self, keys):
+        with self._lock:
+            for key in keys:
+                if key in self._ready or key in self._pending:
+                    continue
+                future = _executor.submit(self._prepare, key)
+                self._pending[key] = future
+                future.add_done_callback(lambda f, key=key: self._done(key, f))
+
+    def _done(self, key, future):
+        with self._lock:
+            self._pending.pop(key, None)
+            if future.exception() is None:
+                self._ready.add(key)
+            else:
+                logger.warning(f"⚠️ Photo prefetch failed for {key}: {future.exception()}")
@@ -0,0 +1,123 @@
+# kitchen_dashboard/backend/photo_renditions.py
+
+import logging
+import os
+import threading
+from pathlib import Path
+
+from utils import http_client
+from utils.metrics import cache_lookup, upstream_call
+from utils.resilience import TIMEOUTS
+
+logger = logging.getLogger(__name__)
+
+# Downloaded originals and resized renditions live next to the image cache
+PHOTO_DIR = Path(os.getenv("PHOTO_CACHE_DIR", Path(__file__).resolve().parent / "../static_data/onedrive_images"))
+ORIGINALS_DIR = PHOTO_DIR / "originals"
+RENDITIONS_DIR = PHOTO_DIR / "renditions"
+
+DOWNLOAD_TIMEOUT = TIMEOUTS["onedrive"]  # seconds without data before a download gives up
+MAX_DIMENSION = 2048   # Upper bound for requested widget sizes
+
+# format name -> (Pillow format, mimetype, save options)
+FORMATS = {
+    "webp": ("WEBP", "image/webp", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", "image/jpeg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _lock_for(name):
+    with _locks_guard:
+        return _locks.setdefault(name, threading.Lock())
+
+
+def original_path(key):
+    return ORIGINALS_DIR / key
+
+
+def rendition_path(key, width, height, fmt):
+    return RENDITIONS_DIR / f"{key}_{width}x{height}.{fmt}"
+
+
+def _part_path(path):
+    """Where path is written before being renamed into place; unique per file and process."""
+    return path.with_name(f"{path.name}.{os.getpid()}.part")
+
+
+def download_original(key, url):
+    """
+    Downloads a photo once and keeps it on disk under its key.
+    Concurrent callers for the same key wait for the first download.
+
+    `url` may be a callable returning the URL, so short-lived download links
+    are only resolved when the original really has to be fetched.
+    """
+    path = original_path(key)
+    if path.exists():
+        return path
+
+    with _lock_for(f"original:{key}"):
+        if path.exists():
+            return path
+        ORIGINALS_DIR.mkdir(parents=True, exist_ok=True)
+        if callable(url):
+            url = url()
+        tmp_path = _part_path(path)
+        with upstream_call("onedrive"), open(tmp_path, "wb") as f:
+            http_client.download(url, f, timeout=DOWNLOAD_TIMEOUT)
+        os.replace(tmp_path, path)
+        logger.info(f"⬇️ Downloaded original photo {key}")
+        return path
+
+
+def get_rendition(key, url, width, height, fmt="jpeg"):
+    """
+    Returns the path of a width x height rendition of a photo, creating it on first use.
+
+    The original is rotated according to its EXIF orientation and cropped to fill
+    the box the same way the widget's `object-fit: cover` would.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported rendition format: {fmt}")
+    width = max(1, min(int(width), MAX_DIMENSION))
+    height = max(1, min(int(height), MAX_DIMENSION))
+
+    path = rendition_path(key, width, height, fmt)
+    cached = path.exists()
+    cache_lookup("photo_renditions", cached)
+    if cached:
+        return path
+
+    source = download_original(key, url)
+    with _lock_for(f"rendition:{path.name}"):
+        if path.exists():
+            return path
+        RENDITIONS_DIR.mkdir(parents=True, exist_ok=True)
+        pil_format, _, options = FORMATS[fmt]
+        from PIL import Image, ImageOps  # Deferred to keep Pillow off the boot path
+        with Image.open(source) as img:
+            # Let the JPEG decoder downscale while decoding; much cheaper on a Pi.
+            # Square request so a 90° EXIF rotation still leaves enough pixels.
+            img.draft("RGB", (max(width, height), max(width, height)))
+            img = ImageOps.exif_transpose(img)
+            img = ImageOps.fit(img.convert("RGB"), (width, height), Image.LANCZOS)
+            tmp_path = _part_path(path)
+            img.save(tmp_path, pil_format, **options)
+        os.replace(tmp_path, path)
+        return path
+
+
+def discard(key):
+    """Deletes a photo's original and renditions, e.g. after it was edited or removed."""
+    for path in [original_path(key), *RENDITIONS_DIR.glob(f"{key}_*")]:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def mimetype_for(fmt):
+    return FORMATS[fmt][1]
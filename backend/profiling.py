@@ -0,0 +1,240 @@
+# kitchen_dashboard/backend/profiling.py
+
+import cProfile
+import json
+import logging
+import os
+import pstats
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from flask import Blueprint, Response, abort, jsonify, request
+
+from config import LOG_PATH
+
+logger = logging.getLogger(__name__)
+
+# Off unless PROFILING=1. When armed, a sampler thread records the stacks of requests in
+# flight and keeps them only for requests slower than PROFILE_SLOW_MS; a request sent with
+# the debug header is kept whatever its duration, and profiled with cProfile if no other
+# request is (from Python 3.12 cProfile is process-wide and only one can run at a time).
+PROFILING = os.getenv('PROFILING', '').lower() in ('1', 'true', 'on')
+PROFILE_SLOW_MS = int(os.getenv('PROFILE_SLOW_MS', '500'))
+PROFILE_SAMPLE_MS = int(os.getenv('PROFILE_SAMPLE_MS', '10'))
+PROFILE_MAX_CAPTURES = int(os.getenv('PROFILE_MAX_CAPTURES', '50'))  # Older captures are deleted
+PROFILE_DIR = LOG_PATH / 'profiles'
+DEBUG_HEADER = 'X-Debug-Profile'
+EXCLUDED_PATHS = ('/api/stream',)  # Open for hours by design
+TOP_FUNCTIONS = 40  # Rows kept from a cProfile capture
+
+profiling_api = Blueprint('profiling', __name__)
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', '?')}.{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def _stack(frame):
+    """A frame's call stack in collapsed ("folded") form, outermost call first."""
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class _Capture:
+    def __init__(self, method, path, forced):
+        self.method = method
+        self.path = path
+        self.forced = forced
+        self.started = time.perf_counter()
+        self.started_at = datetime.now(timezone.utc)
+        self.stacks = {}
+        self.profile = None
+
+
+class RequestProfiler:
+    """
+    Captures slow or flagged requests into capture_dir, keeping at most max_captures.
+    The sampler thread only runs while requests are in flight, and also writes the
+    captures so request threads never touch the disk.
+    """
+
+    def __init__(self, capture_dir=PROFILE_DIR, slow_ms=PROFILE_SLOW_MS, sample_ms=PROFILE_SAMPLE_MS,
+                 max_captures=PROFILE_MAX_CAPTURES):
+        self.capture_dir = Path(capture_dir)
+        self.slow_ms = slow_ms
+        self.sample_ms = sample_ms
+        self.max_captures = max_captures
+        self._inflight = {}  # thread ident -> _Capture
+        self._pending = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._cprofile_lock = threading.Lock()  # Held by the one request cProfile is running for
+        self._wakeup = threading.Event()
+        threading.Thread(target=self._run, name='request-profiler', daemon=True).start()
+
+    def begin(self, method, path, forced=False):
+        capture = _Capture(method, path, forced)
+        if forced and self._cprofile_lock.acquire(blocking=False):
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+                capture.profile = profile
+            except ValueError:  # Another profiler (e.g. a debugger) holds sys.monitoring
+                self._cprofile_lock.release()
+        with self._lock:
+            self._inflight[threading.get_ident()] = capture
+        self._wakeup.set()
+
+    def _stop_profile(self, capture):
+        if capture.profile is not None:
+            capture.profile.disable()
+            self._cprofile_lock.release()
+
+    def end(self, route, status):
+        """Finishes the current thread's capture and queues it for writing if it is kept."""
+        with self._lock:
+            capture = self._inflight.pop(threading.get_ident(), None)
+        if capture is None:
+            return None
+        self._stop_profile(capture)
+        duration_ms = (time.perf_counter() - capture.started) * 1000
+        if not capture.forced and duration_ms < self.slow_ms:
+            return None
+        self._pending.put((capture, route, status, duration_ms))
+        self._wakeup.set()
+        return capture
+
+    def discard(self):
+        """Drops the current thread's capture, if end() never ran (the request raised)."""
+        with self._lock:
+            capture = self._inflight.pop(threading.get_ident(), None)
+        if capture is not None:
+            self._stop_profile(capture)
+
+    def _sample(self):
+        frames = sys._current_frames()
+        with self._lock:
+            captures = [(ident, c) for ident, c in self._inflight.items() if c.profile is None]
+        for ident, capture in captures:
+            frame = frames.get(ident)
+            if frame is not None:
+                stack = _stack(frame)
+                capture.stacks[stack] = capture.stacks.get(stack, 0) + 1
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            time.sleep(self.sample_ms / 1000)
+            self._sample()
+            while not self._pending.empty():
+                try:
+                    self._write(*self._pending.get())
+                except Exception as e:
+                    logger.warning(f"⚠️ Saving request profile failed: {e}")
+            with self._lock:
+                if not self._inflight and self._pending.empty():
+                    self._wakeup.clear()
+
+    def _write(self, capture, route, status, duration_ms):
+        record = {
+            'id': f"{capture.started_at.strftime('%Y%m%dT%H%M%S%fZ')}-{os.getpid()}",
+            'started_at': capture.started_at.isoformat(),
+            'method': capture.method,
+            'path': capture.path,
+            'route': route,
+            'status': status,
+            'duration_ms': round(duration_ms, 1),
+            'reason': 'header' if capture.forced else 'slow',
+        }
+        if capture.profile is not None:
+            stats = pstats.Stats(capture.profile)
+            rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_FUNCTIONS]
+            record['functions'] = [
+                {'function': f"{file}:{line}({name})", 'calls': calls, 'tottime': round(tottime, 6),
+                 'cumtime': round(cumtime, 6)}
+                for (file, line, name), (_, calls, tottime, cumtime, _) in rows
+            ]
+        else:
+            record['sample_ms'] = self.sample_ms
+            record['samples'] = sum(capture.stacks.values())
+            record['stacks'] = capture.stacks
+
+        self.capture_dir.mkdir(parents=True, exist_ok=True)
+        path = self.capture_dir / f"{record['id']}.json"
+        tmp_path = path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(record))
+        os.replace(tmp_path, path)
+        for old in sorted(self.capture_dir.glob('*.json'))[:-self.max_captures]:
+            old.unlink(missing_ok=True)
+
+    def captures(self):
+        """Saved captures without their stacks, newest first."""
+        summaries = []
+        for path in sorted(self.capture_dir.glob('*.json'), reverse=True):
+            try:
+                record = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            record.pop('stacks', None)
+            record.pop('functions', None)
+            summaries.append(record)
+        return summaries
+
+    def load(self, capture_id):
+        path = self.capture_dir / f"{capture_id}.json"
+        if path.parent != self.capture_dir or not path.exists():
+            return None
+        return json.loads(path.read_text())
+
+
+profiler = RequestProfiler() if PROFILING else None
+
+
+@profiling_api.before_app_request
+def _begin_profile():
+    if profiler is None or request.path in EXCLUDED_PATHS:
+        return
+    profiler.begin(request.method, request.full_path.rstrip('?'), forced=DEBUG_HEADER in request.headers)
+
+
+@profiling_api.after_app_request
+def _end_profile(response):
+    if profiler is not None:
+        profiler.end(request.url_rule.rule if request.url_rule else None, response.status_code)
+    return response
+
+
+@profiling_api.teardown_app_request
+def _discard_profile(exc):
+    if profiler is not None:
+        profiler.discard()
+
+
+@profiling_api.route('/api/admin/profiles')
+def list_profiles():
+    """Recent captures of this worker's slow or flagged requests."""
+    if profiler is None:
+        return jsonify({'enabled': False, 'captures': []})
+    return jsonify({'enabled': True, 'slow_ms': profiler.slow_ms, 'captures': profiler.captures()})
+
+
+@profiling_api.route('/api/admin/profiles/<capture_id>')
+def get_profile_capture(capture_id):
+    """
+    One capture as JSON. Sampled captures are also available as folded stacks
+    (?format=folded) for flamegraph.pl or speedscope.
+    """
+    record = profiler.load(capture_id) if profiler is not None else None
+    if record is None:
+        abort(404)
+    if request.args.get('format') == 'folded' and 'stacks' in record:
+        folded = ''.join(f"{stack} {count}\n" for stack, count in sorted(record['stacks'].items()))
+        return Response(folded, mimetype='text/plain')
+    return jsonify(record)
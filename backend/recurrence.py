@@ -0,0 +1,74 @@
+# kitchen_dashboard/backend/recurrence.py
+
+from datetime import date, datetime, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from dateutil.rrule import rrulestr
+
+
+def _parse_start(value):
+    """A master's start or end (Google's {'dateTime', 'timeZone'} or {'date'}) as a datetime."""
+    if 'date' in value:
+        # All-day series are expanded as naive midnights in the kiosk's local time,
+        # like Google's floating dates
+        return datetime.combine(date.fromisoformat(value['date']), datetime.min.time())
+    start = datetime.fromisoformat(value['dateTime'].replace('Z', '+00:00'))
+    try:
+        # Expand in the series' own zone so the wall-clock time survives DST changes
+        return start.astimezone(ZoneInfo(value['timeZone'])) if value.get('timeZone') else start
+    except ZoneInfoNotFoundError:
+        return start
+
+
+def _bound(moment, all_day):
+    """A window bound comparable with the series' occurrences: naive local time for all-day ones."""
+    return moment.astimezone().replace(tzinfo=None) if all_day else moment
+
+
+def _timestamp(moment):
+    return moment.timestamp()  # Naive (all-day) moments are local time
+
+
+def expand(master, time_min, time_max, exceptions=frozenset()):
+    """
+    Occurrences of a recurring master overlapping [time_min, time_max) as
+    (start_ts, end_ts, event), ordered by start, in the same flat shape as the
+    instances Google returns for singleEvents=True.
+
+    Args:
+        master (dict): Stored master with 'id', 'start', 'end' (Google format) and
+            'recurrence' (RRULE/RDATE/EXDATE lines), plus display fields.
+        exceptions (set): Instance ids that were moved, edited or cancelled; their
+            replacements, if any, are stored as ordinary events.
+    """
+    dtstart = _parse_start(master['start'])
+    duration = _parse_start(master['end']) - dtstart
+    all_day = 'date' in master['start']
+    rules = rrulestr('\n'.join(master['recurrence']), dtstart=dtstart, forceset=True)
+
+    after = _bound(time_min, all_day) - duration
+    before = _bound(time_max, all_day)
+    occurrences = []
+    for start in rules.between(after, before, inc=True):
+        end = start + duration
+        if end <= _bound(time_min, all_day) or start >= before:
+            continue
+        if all_day:
+            instance_id = f"{master['id']}_{start:%Y%m%d}"
+            start_value, end_value = start.date().isoformat(), end.date().isoformat()
+        else:
+            instance_id = f"{master['id']}_{start.astimezone(timezone.utc):%Y%m%dT%H%M%SZ}"
+            start_value, end_value = start.isoformat(), end.isoformat()
+        if instance_id in exceptions:
+            continue
+        occurrences.append((_timestamp(start), _timestamp(end), {
+            'summary': master.get('summary', 'No Title'),
+            'start': start_value,
+            'end': end_value,
+            'id': instance_id,
+            'calendar_id': master.get('calendar_id', 'primary'),
+            'color': master.get('color'),
+            'source': master.get('source'),
+            'recurring_event_id': master['id'],
+        }))
+    return occurrences
@@ -1,27 +1,54 @@
+import os
 import uuid
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
+import secrets
 from pathlib import Path
 
-load_dotenv()
+# Public HTTPS address Google will POST change notifications to
+# (e.g. 'https://kitchen-dashboard.loca.lt/api/calendar/webhook' via LocalTunnel)
+WEBHOOK_URL = os.getenv('CALENDAR_WEBHOOK_URL')
+WEBHOOK_TTL = int(os.getenv('CALENDAR_WEBHOOK_TTL', '86400'))  # seconds, 86400-1day
 
-SCOPES = ['https://www.googleapis.com/auth/calendar']
-WEBHOOK_URL = 'https://kitchen-dashboard.loca.lt'  # LocalTunnel URL
 
-creds_path = Path(__file__).resolve().parents[1] / "auth" / "master_token_joeltimm.json"
-creds = Credentials.from_authorized_user_file(str(creds_path), SCOPES)
+def register_channel(service, address=WEBHOOK_URL, ttl=WEBHOOK_TTL, calendar_id='primary'):
+    """
+    Opens a push-notification channel for a calendar's events.
 
-service = build('calendar', 'v3', credentials=creds)
-
-watch_request = {
-    'id': str(uuid.uuid4()),  # Unique identifier for the channel
-    'type': 'web_hook',
-    'address': WEBHOOK_URL,
-    'params': {
-        'ttl': '3600'  # Optional: how long (in seconds) this channel should last 3600-1hr
+    Returns:
+        dict: Channel state to persist (id, token, resourceId, expiration in ms since epoch).
+    """
+    watch_request = {
+        'id': str(uuid.uuid4()),  # Unique identifier for the channel
+        'type': 'web_hook',
+        'address': address,
+        'token': secrets.token_urlsafe(16),  # Echoed back as X-Goog-Channel-Token
+        'params': {
+            'ttl': str(ttl)
+        }
+    }
+    response = service.events().watch(calendarId=calendar_id, body=watch_request).execute()
+    return {
+        'id': response['id'],
+        'token': watch_request['token'],
+        'resourceId': response['resourceId'],
+        'expiration': int(response.get('expiration', 0)),
+        'calendarId': calendar_id,
     }
-}
 
-response = service.events().watch(calendarId='primary', body=watch_request).execute()
-print("🔔 Webhook channel registered!")
-print(response)
+
+def stop_channel(service, channel):
+    """Stops a previously registered channel so Google stops pinging it."""
+    service.channels().stop(body={'id': channel['id'], 'resourceId': channel['resourceId']}).execute()
+
+
+if __name__ == '__main__':
+    from google.oauth2.credentials import Credentials
+    from googleapiclient.discovery import build
+
+    SCOPES = ['https://www.googleapis.com/auth/calendar']
+    creds_path = Path(__file__).resolve().parents[1] / "auth" / "master_token_joeltimm.json"
+    creds = Credentials.from_authorized_user_file(str(creds_path), SCOPES)
+    service = build('calendar', 'v3', credentials=creds)
+
+    response = register_channel(service, address=WEBHOOK_URL or 'https://kitchen-dashboard.loca.lt')
+    print("🔔 Webhook channel registered!")
+    print(response)
@@ -0,0 +1,33 @@
+# kitchen_dashboard/backend/scheduler.py
+
+import logging
+import threading
+
+from apscheduler.schedulers.background import BackgroundScheduler
+
+logger = logging.getLogger(__name__)
+
+_scheduler = None
+_lock = threading.Lock()
+
+
+def get_scheduler():
+    """
+    Returns the process-wide background scheduler, starting it on first use.
+    All widget pollers register their jobs here.
+    """
+    global _scheduler
+    with _lock:
+        if _scheduler is None:
+            _scheduler = BackgroundScheduler(daemon=True)
+            _scheduler.start()
+            logger.info("⏱️ Background scheduler started.")
+        return _scheduler
+
+
+def shutdown_scheduler():
+    global _scheduler
+    with _lock:
+        if _scheduler is not None:
+            _scheduler.shutdown(wait=False)
+            _scheduler = None
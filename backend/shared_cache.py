@@ -0,0 +1,179 @@
+# kitchen_dashboard/backend/shared_cache.py
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from config import LOG_PATH
+from utils.metrics import cache_lookup
+
+# One SQLite file (WAL mode) shared by every gunicorn worker on the box
+SHARED_CACHE_PATH = Path(os.getenv('SHARED_CACHE_PATH', LOG_PATH / 'shared_cache.db'))
+EVENT_RETENTION = 1000  # Relayed dashboard events kept in the events table
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    pid INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS errors (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    data TEXT NOT NULL
+);
+"""
+
+
+class SharedCache:
+    """
+    Cross-process key/value store for widget snapshots.
+
+    Values are JSON documents with a per-key version that goes up on every put.
+    Readers keep the parsed value of the last version they saw, so a read is one
+    indexed lookup of the version and JSON is only parsed again after a write.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._local = threading.local()
+        self._memo = {}
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def put(self, key, value):
+        """Stores a value and returns its new version."""
+        row = self._conn().execute(
+            """INSERT INTO kv (key, value, version, updated_at) VALUES (?, ?, 1, ?)
+               ON CONFLICT(key) DO UPDATE SET value = excluded.value, version = kv.version + 1,
+                                              updated_at = excluded.updated_at
+               RETURNING version""",
+            (key, json.dumps(value), time.time()),
+        ).fetchone()
+        return row[0]
+
+    def update(self, key, change, default=None):
+        """
+        Replaces a value with change(current value or default) in one write
+        transaction, so concurrent updates from other workers are never lost.
+        Returns the new value.
+        """
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT value FROM kv WHERE key = ?', (key,)).fetchone()
+            value = change(json.loads(row[0]) if row else default)
+            self.put(key, value)
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+        return value
+
+    def get_entry(self, key):
+        """Returns {'value', 'version', 'updated_at'} for a key, or None."""
+        conn = self._conn()
+        row = conn.execute('SELECT version, updated_at FROM kv WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        memo = self._memo.get(key)
+        if memo is not None and memo['version'] == row[0]:
+            cache_lookup('shared', True)
+            return memo
+        cache_lookup('shared', False)
+        row = conn.execute('SELECT value, version, updated_at FROM kv WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        memo = {'value': json.loads(row[0]), 'version': row[1], 'updated_at': row[2]}
+        self._memo[key] = memo
+        return memo
+
+    def get(self, key, default=None):
+        entry = self.get_entry(key)
+        return entry['value'] if entry else default
+
+    def items(self, prefix):
+        """(key, value) pairs for every key starting with prefix."""
+        rows = self._conn().execute('SELECT key FROM kv WHERE key LIKE ?', (prefix + '%',)).fetchall()
+        return [(key, self.get(key)) for (key,) in rows]
+
+    def delete_prefix(self, prefix):
+        self._conn().execute('DELETE FROM kv WHERE key LIKE ?', (prefix + '%',))
+        self._memo = {k: v for k, v in self._memo.items() if not k.startswith(prefix)}
+
+    def append_event(self, event_type, data):
+        conn = self._conn()
+        seq = conn.execute('INSERT INTO events (pid, type, data) VALUES (?, ?, ?)',
+                           (os.getpid(), event_type, json.dumps(data))).lastrowid
+        conn.execute('DELETE FROM events WHERE seq <= ?', (seq - EVENT_RETENTION,))
+        return seq
+
+    def append_errors(self, entries, retention):
+        """Appends logged errors in one transaction, keeping the last retention of them."""
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            seq = None
+            for entry in entries:
+                seq = conn.execute('INSERT INTO errors (data) VALUES (?)', (json.dumps(entry),)).lastrowid
+            if seq is not None:
+                conn.execute('DELETE FROM errors WHERE seq <= ?', (seq - retention,))
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def recent_errors(self, limit):
+        """The last limit errors appended by any process, oldest first."""
+        rows = self._conn().execute('SELECT data FROM errors ORDER BY seq DESC LIMIT ?', (limit,)).fetchall()
+        return [json.loads(data) for (data,) in reversed(rows)]
+
+    def last_event_seq(self):
+        row = self._conn().execute('SELECT MAX(seq) FROM events').fetchone()
+        return row[0] or 0
+
+    def events_since(self, seq):
+        """Events appended by other processes after seq, as (seq, type, data)."""
+        rows = self._conn().execute(
+            'SELECT seq, type, data FROM events WHERE seq > ? AND pid != ? ORDER BY seq',
+            (seq, os.getpid()),
+        ).fetchall()
+        return [(s, t, json.loads(d)) for s, t, d in rows]
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SharedCache(SHARED_CACHE_PATH)
+        return _cache
+
+
+def set_cache_path(path):
+    """Points the process at a different cache file (tests, benchmarks)."""
+    global _cache
+    with _cache_lock:
+        _cache = SharedCache(path)
+        return _cache
@@ -0,0 +1,141 @@
+# kitchen_dashboard/backend/static_assets.py
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+from pathlib import Path
+
+from flask import Blueprint, abort, request, send_file
+from werkzeug.security import safe_join
+
+try:
+    import brotli  # Optional: without it only gzip variants are built
+except ImportError:
+    brotli = None
+
+STATIC_DIR = Path(__file__).resolve().parent.parent / 'frontend' / 'static'
+DIST_DIR = STATIC_DIR / 'dist'  # Build output, not checked in
+VENDOR_DIR = STATIC_DIR / 'vendor'
+VENDOR_LIBS = ('gridstack.min.js', 'interact.min.js')  # Pinned in vendor/README.md
+MANIFEST_NAME = 'manifest.json'
+
+ASSET_SUFFIXES = ('.js', '.css', '.svg', '.png', '.jpg', '.webp', '.ico', '.woff2')
+COMPRESSIBLE_SUFFIXES = ('.js', '.css', '.svg')
+HASH_LENGTH = 12
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600  # A fingerprinted file never changes under its name
+
+static_assets_api = Blueprint('static_assets', __name__)
+
+_manifest = None
+
+
+def missing_vendor_libraries(vendor_dir=None):
+    """Names of VENDOR_LIBS that are not in vendor_dir; the kiosk then needs the CDN."""
+    vendor_dir = vendor_dir or VENDOR_DIR
+    return [name for name in VENDOR_LIBS if not (vendor_dir / name).is_file()]
+
+
+def _warn_missing_vendor_libraries():
+    missing = missing_vendor_libraries()
+    if missing:
+        print(f"⚠️ Missing from {VENDOR_DIR}: {', '.join(missing)}. Kiosks fall back to the CDN "
+              f"until the pinned files in vendor/README.md are added.")
+
+
+def _compressed_variants(path, data):
+    """Writes .gz (and .br) next to an asset when they come out smaller than the original."""
+    variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', brotli.compress(data, quality=11)))
+    for suffix, compressed in variants:
+        if len(compressed) < len(data):
+            path.with_name(path.name + suffix).write_bytes(compressed)
+
+
+def build_assets(static_dir=STATIC_DIR, dist_dir=DIST_DIR):
+    """
+    Copies every static asset into dist_dir under a content-hashed name, e.g.
+    js/dashboard.js -> dist/js/dashboard.3f9a0c1b2d4e.js, with precompressed
+    variants, and writes the manifest that url_for('static', ...) resolves through.
+    """
+    if dist_dir.exists():
+        shutil.rmtree(dist_dir)
+    manifest = {}
+    for source in sorted(static_dir.rglob('*')):
+        if not source.is_file() or dist_dir in source.parents or source.suffix not in ASSET_SUFFIXES:
+            continue
+        data = source.read_bytes()
+        digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+        relative = source.relative_to(static_dir)
+        target = dist_dir / relative.with_name(f"{source.stem}.{digest}{source.suffix}")
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(data)
+        if source.suffix in COMPRESSIBLE_SUFFIXES:
+            _compressed_variants(target, data)
+        manifest[relative.as_posix()] = target.relative_to(static_dir).as_posix()
+
+    (dist_dir / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    return manifest
+
+
+def load_manifest():
+    """
+    The asset manifest from the last build, read once. Empty in development or
+    without a build, so url_for falls back to the plain files.
+    """
+    global _manifest
+    if _manifest is None:
+        path = DIST_DIR / MANIFEST_NAME
+        if os.getenv('FLASK_ENV') == 'development' or not path.exists():
+            _manifest = {}
+        else:
+            _manifest = json.loads(path.read_text())
+    return _manifest
+
+
+@static_assets_api.record_once
+def _check_vendor_libraries(state):
+    _warn_missing_vendor_libraries()
+
+
+@static_assets_api.app_url_defaults
+def _fingerprinted_url(endpoint, values):
+    if endpoint == 'static' and 'filename' in values:
+        values['filename'] = load_manifest().get(values['filename'], values['filename'])
+
+
+@static_assets_api.route('/static/dist/<path:filename>')
+def serve_asset(filename):
+    """
+    Serves a fingerprinted asset, precompressed when the browser accepts it, with
+    headers that let the kiosk cache it for good without revalidating.
+    """
+    path = safe_join(str(DIST_DIR), filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    encoding = None
+    for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if candidate in request.accept_encodings and os.path.isfile(path + suffix):
+            encoding = candidate
+            path += suffix
+            break
+
+    response = send_file(path, mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+                         max_age=IMMUTABLE_MAX_AGE)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+if __name__ == '__main__':
+    _warn_missing_vendor_libraries()
+    built = build_assets()
+    print(f"🧱 Built {len(built)} static assets into {DIST_DIR}"
+          f"{'' if brotli else ' (gzip only: install Brotli for .br variants)'}.")
@@ -1,38 +1,256 @@
+# kitchen_dashboard/backend/weather.py
+
+import abc
 import os
 import json
-import requests
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from auth.credentials import load_master_credentials
-import config
-config.LOG_PATH
-config.log_error("Something went wrong")
+import time
+import logging
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
 
-# Google Weather API or Maps API (using weather)
-API_URL = 'https://maps.googleapis.com/maps/api/weather/data'  # Replace with actual API endpoint
+from config import log_error
+from event_stream import publish
+from leader import is_leader
+from scheduler import get_scheduler
+from shared_cache import get_cache
+from utils import http_client
+from utils.metrics import cache_lookup, register_snapshot, upstream_call
+from utils.resilience import TIMEOUTS, CircuitOpenError, get_breaker
 
-# Scopes required by the Google API
-SCOPES = ['https://www.googleapis.com/auth/cloud-platform']
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+WEATHER_PROVIDER = os.getenv('WEATHER_PROVIDER', 'openweather')  # 'openweather' or 'file'
+WEATHER_TTL = int(os.getenv('WEATHER_TTL', '900'))  # seconds a reading counts as fresh
+STUB_WEATHER_FILE = Path(os.getenv('WEATHER_STUB_FILE',
+                                   Path(__file__).resolve().parent / 'static_data' / 'weather_stub.json'))
+REFRESH_CHECK_INTERVAL = 60  # seconds between the leader's sweeps for stale locations
+WEATHER_FAILURE_TTL = int(os.getenv('WEATHER_FAILURE_TTL', '60'))  # seconds a failed cold fetch is not retried on request
+
+
+class WeatherProvider(abc.ABC):
+    """A source of current conditions. fetch() returns {'temperature', 'condition'} or raises."""
+    name = 'base'
+
+    @abc.abstractmethod
+    def fetch(self, location):
+        ...
 
-def get_weather(CITY):
-    """
-    Fetch weather data using Google API.
-    """
-    creds = load_master_credentials()
-    headers = {
-        'Authorization': f'Bearer {creds.token}'
-    }
 
-    # You can replace this with actual weather API endpoint logic, e.g., OpenWeather or Google Weather
-    params = {'q': city, 'appid': 'YOUR_API_KEY'}  # Example for OpenWeather
-    response = requests.get(API_URL, headers=headers, params=params)
+class OpenWeatherProvider(WeatherProvider):
+    name = 'openweather'
+    API_URL = os.getenv('WEATHER_API_URL', 'https://api.openweathermap.org/data/2.5/weather')
+    TIMEOUT = TIMEOUTS['weather']  # seconds
 
-    if response.status_code == 200:
+    def __init__(self, api_key=None, units='metric'):
+        self.api_key = api_key or os.getenv('WEATHER_API_KEY')
+        self.units = units
+
+    def fetch(self, location):
+        params = {'q': location, 'appid': self.api_key, 'units': self.units}
+        response = http_client.get(self.API_URL, params=params, timeout=self.TIMEOUT)
+        response.raise_for_status()
         weather_data = response.json()
         return {
             'temperature': weather_data['main']['temp'],
             'condition': weather_data['weather'][0]['description']
         }
-    else:
-        return {"error": "Failed to retrieve weather data."}
+
+
+class FileWeatherProvider(WeatherProvider):
+    """
+    Reads canned readings from a local JSON file, for offline development and tests.
+    The file holds either one reading or a mapping of location -> reading.
+    """
+    name = 'file'
+
+    def __init__(self, path=STUB_WEATHER_FILE):
+        self.path = Path(path)
+
+    def fetch(self, location):
+        data = json.loads(self.path.read_text())
+        reading = data if 'temperature' in data else data[location]
+        return {'temperature': reading['temperature'], 'condition': reading['condition']}
+
+
+PROVIDERS = {cls.name: cls for cls in (OpenWeatherProvider, FileWeatherProvider)}
+
+_provider = None
+# Readings live in the shared cache as 'weather:<location>' -> {'data': reading, 'fetched_at': epoch seconds}
+# so every worker serves the leader's copy. 'weather_locations' lists what kiosks have asked for.
+CACHE_PREFIX = 'weather:'
+LOCATIONS_KEY = 'weather_locations'
+_refreshing = set()
+_cache_lock = threading.Lock()
+_first_fetch_locks = {}
+_failed_at = {}  # location -> time of its last failed fetch
+
+
+def get_provider():
+    global _provider
+    if _provider is None:
+        _provider = PROVIDERS[WEATHER_PROVIDER]()
+    return _provider
+
+
+def set_provider(provider):
+    """Swaps the weather source (e.g. FileWeatherProvider in tests) and clears the cache."""
+    global _provider
+    with _cache_lock:
+        _provider = provider
+        _failed_at.clear()
+        get_cache().delete_prefix(CACHE_PREFIX)
+
+
+def _fetch(location):
+    with upstream_call('weather'):
+        return get_provider().fetch(location)
+
+
+def _refresh(location):
+    """
+    Fetches one reading from the provider and stores it. Returns the cache entry, or
+    None when the call failed or was skipped because the weather breaker is open.
+    """
+    try:
+        data = get_breaker('weather').call(_fetch, location)
+    except Exception as e:
+        if not isinstance(e, CircuitOpenError):
+            log_error(f"Weather refresh for {location} failed: {e}")
+        with _cache_lock:
+            _failed_at[location] = time.time()
+        return None
+    finally:
+        with _cache_lock:
+            _refreshing.discard(location)
+    with _cache_lock:
+        _failed_at.pop(location, None)
+
+    entry = {'data': data, 'fetched_at': time.time()}
+    previous = _cached(location)
+    get_cache().put(CACHE_PREFIX + location, entry)
+    if previous is None or previous['data'] != data:
+        publish('weather', _payload(location, entry))
+    return entry
+
+
+def _failed_recently(location):
+    with _cache_lock:
+        failed_at = _failed_at.get(location)
+    return failed_at is not None and time.time() - failed_at < WEATHER_FAILURE_TTL
+
+
+def _cached(location):
+    return get_cache().get(CACHE_PREFIX + location)
+
+
+def _remember_location(location):
+    """Adds a location to the list the leader keeps fresh."""
+    if location in get_cache().get(LOCATIONS_KEY, []):
+        return
+    get_cache().update(LOCATIONS_KEY, lambda locations: list(dict.fromkeys(locations + [location])), default=[])
+
+
+def _oldest_reading():
+    return min((entry['fetched_at'] for _, entry in get_cache().items(CACHE_PREFIX) if entry), default=None)
+
+
+register_snapshot('weather', _oldest_reading)
+
+
+def load_persisted_weather():
+    """Boot warm-up: reads every stored reading once so first requests are memo hits."""
+    return get_cache().items(CACHE_PREFIX)
+
+
+def refresh_stale_locations():
+    """Leader job: refreshes every requested location that is missing or past WEATHER_TTL."""
+    for location in get_cache().get(LOCATIONS_KEY, []):
+        entry = _cached(location)
+        if entry is not None and time.time() - entry['fetched_at'] < WEATHER_TTL:
+            continue
+        with _cache_lock:
+            if location in _refreshing:
+                continue
+            _refreshing.add(location)
+        _refresh(location)
+
+
+def start_weather_polling():
+    """Schedules the leader's weather sweep, starting with the default city."""
+    if os.getenv('CITY'):
+        _remember_location(os.getenv('CITY'))
+    get_scheduler().add_job(
+        refresh_stale_locations,
+        "interval",
+        seconds=REFRESH_CHECK_INTERVAL,
+        id="weather_refresh",
+        next_run_time=datetime.now(timezone.utc),
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True,
+    )
+    print(f"🌤️ Weather refresh started (every {REFRESH_CHECK_INTERVAL}s, TTL {WEATHER_TTL}s).")
+
+
+def _payload(location, entry):
+    return {
+        **entry['data'],
+        'location': location,
+        'updated_at': datetime.fromtimestamp(entry['fetched_at'], timezone.utc).isoformat(),
+        'stale': time.time() - entry['fetched_at'] >= WEATHER_TTL,
+    }
+
+
+def payload_version(location=None):
+    """
+    The shared cache version of a location's reading while it is fresh, else None:
+    missing and stale readings always go through get_weather() so a refresh starts.
+    """
+    cached = get_cache().get_entry(CACHE_PREFIX + (location or os.getenv('CITY')))
+    if cached is None or cached['value'] is None:
+        return None
+    if time.time() - cached['value']['fetched_at'] >= WEATHER_TTL:
+        return None
+    return cached['version']
+
+
+def get_weather(location=None):
+    """
+    Returns current weather for a location (defaults to the CITY env var).
+
+    Fresh readings come straight from the shared cache. Once a reading is older
+    than WEATHER_TTL it is still returned, flagged stale, while one background
+    refresh fetches a new one. Only the leader worker calls upstream: on the
+    others a cold location is queued for the leader and reported as not ready. A
+    cold location whose fetch failed is not retried on request for WEATHER_FAILURE_TTL;
+    the leader's sweep keeps trying it in the background.
+    """
+    location = location or os.getenv('CITY')
+    entry = _cached(location)
+    leader = is_leader()
+    stale = entry is not None and time.time() - entry['fetched_at'] >= WEATHER_TTL
+    with _cache_lock:
+        start_refresh = leader and stale and location not in _refreshing and not get_breaker('weather').is_open()
+        if start_refresh:
+            _refreshing.add(location)
+
+    cache_lookup('weather', 'miss' if entry is None else 'stale' if stale else 'hit')
+    if entry is None:
+        _remember_location(location)
+        if not leader:
+            return {"error": "Weather data not ready yet."}
+        # Cold cache: concurrent first requests share a single upstream call
+        with _cache_lock:
+            first_fetch_lock = _first_fetch_locks.setdefault(location, threading.Lock())
+        with first_fetch_lock:
+            entry = _cached(location)
+            if entry is None and not _failed_recently(location):
+                entry = _refresh(location)
+        if entry is None:
+            return {"error": "Failed to retrieve weather data."}
+    elif start_refresh:
+        threading.Thread(target=_refresh, args=(location,), name='weather-refresh', daemon=True).start()
+
+    return _payload(location, entry)
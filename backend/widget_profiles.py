@@ -1,20 +1,120 @@
 from flask import Blueprint, request, jsonify
+from contextlib import contextmanager
 from pathlib import Path
+import fcntl
 import json
+import os
+import tempfile
+import threading
+import time
+
+from event_stream import publish
 
 widget_api = Blueprint("widget_profiles", __name__)
 PROFILE_FILE = Path(__file__).parent / "static_data" / "widget_profiles.json"
 
+DEFAULT_PROFILE = "default"  # Used by kiosks that do not name a profile
+# Widgets of a profile that is not in the file, when the file has no default profile either
+DEFAULT_WIDGETS = {name: {"enabled": True} for name in ("clock", "calendar", "weather", "photos")}
+
 if not PROFILE_FILE.exists():
     PROFILE_FILE.write_text(json.dumps({}))
 
 
+class ProfileStore:
+    """
+    Widget profiles parsed once and kept in memory.
+
+    The cache is checked against the file's mtime/size/inode at most once per
+    `check_interval` seconds, so edits by another worker (or by hand) are picked up.
+    Saves re-read the file and write a temp file that is renamed into place, all
+    under an flock shared by every process, so concurrent saves never lose updates
+    or leave a truncated file behind.
+    """
+
+    def __init__(self, path, check_interval=1.0):
+        self.path = Path(path)
+        self.lock_path = self.path.with_suffix(".lock")
+        self.check_interval = check_interval
+        self.version = 0
+        self._profiles = {}
+        self._stamp = None
+        self._checked_at = 0
+        self._lock = threading.Lock()
+
+    def _file_stamp(self):
+        st = os.stat(self.path)
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _reload_if_changed(self):
+        stamp = self._file_stamp()
+        if stamp != self._stamp:
+            self._profiles = json.loads(self.path.read_text())
+            self._stamp = stamp
+            self.version += 1
+
+    def all(self):
+        """All profiles. The returned dict is shared: treat it as read-only."""
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            with self._lock:
+                self._reload_if_changed()
+                self._checked_at = now
+        return self._profiles
+
+    def get(self, profile):
+        return self.all().get(profile, {})
+
+    @contextmanager
+    def _write_lock(self):
+        with self._lock, open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def save(self, profile, settings):
+        """Stores one profile's settings atomically. Returns the new store version."""
+        with self._write_lock():
+            profiles = json.loads(self.path.read_text())
+            profiles[profile] = settings
+            fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=self.path.name, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(profiles, f, indent=2)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            self._profiles = profiles
+            self._stamp = self._file_stamp()
+            self._checked_at = time.monotonic()
+            self.version += 1
+            return self.version
+
+
+profile_store = ProfileStore(PROFILE_FILE)
+
+
+def get_profile(profile):
+    """
+    Returns the widget settings for a profile. A kiosk opened without a known
+    profile gets the "default" profile, or DEFAULT_WIDGETS if there is none.
+    """
+    profiles = profile_store.all()
+    if profile in profiles:
+        return profiles[profile]
+    return profiles.get(DEFAULT_PROFILE, DEFAULT_WIDGETS)
+
+
 @widget_api.route("/api/widgets/settings", methods=["GET"])
 def get_widget_settings():
     profile = request.args.get("profile", "default")
     try:
-        data = json.loads(PROFILE_FILE.read_text())
-        return jsonify(data.get(profile, {}))
+        return jsonify(get_profile(profile))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -25,9 +125,8 @@ def save_widget_settings():
     profile = body.get("profile", "default")
     settings = body.get("settings", {})  # Dict of widget configs
     try:
-        all_profiles = json.loads(PROFILE_FILE.read_text())
-        all_profiles[profile] = settings
-        PROFILE_FILE.write_text(json.dumps(all_profiles, indent=2))
+        profile_store.save(profile, settings)
+        publish("profile", {"profile": profile, "settings": settings})
         return jsonify({"status": "ok"})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -0,0 +1,332 @@
+# kitchen_dashboard/bench/fake_upstreams.py
+
+"""
+Local stand-ins for Google Calendar, Microsoft Graph and OpenWeather, used by
+run_bench.py. One threaded HTTP server answers all three (plus photo downloads),
+adds the configured latency, fails the configured share of calls and counts
+every call it receives.
+"""
+
+import io
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+# Per-upstream knobs. latency_ms/jitter_ms are added to every HTTP call, failure_rate
+# is the share of calls answered with 503, payload_bytes pads each event/item/reading.
+DEFAULT_SETTINGS = {
+    "calendar": {"latency_ms": 80, "jitter_ms": 20, "failure_rate": 0.0, "payload_bytes": 200,
+                 "events": 150, "recurring_share": 0.2, "changes_per_sync": 1, "page_size": 250},
+    "graph": {"latency_ms": 60, "jitter_ms": 20, "failure_rate": 0.0, "payload_bytes": 200,
+              "photos": 40, "page_size": 200},
+    "download": {"latency_ms": 30, "jitter_ms": 10, "failure_rate": 0.0, "photo_kb": 300},
+    "weather": {"latency_ms": 50, "jitter_ms": 10, "failure_rate": 0.0, "payload_bytes": 200},
+}
+
+GRAPH_PREFIX = "/graph/v1.0"
+GOOGLE_BATCH_PATH = "/batch/calendar/v3"
+
+_EVENTS_PATH = re.compile(r"^/calendar/v3/calendars/([^/]+)/events$")
+_CALENDAR_LIST_PATH = re.compile(r"^/calendar/v3/users/me/calendarList/([^/]+)$")
+_DELTA_PATH = re.compile(r"^" + re.escape(GRAPH_PREFIX) + r"/me/drive/root:/(.+):/delta$")
+_ITEM_PATH = re.compile(r"^/me/drive/items/([^/?]+)")
+
+
+def _fake_jpeg(size_kb):
+    """A noisy JPEG of roughly size_kb kilobytes, so renditions do real decoding work."""
+    from PIL import Image
+
+    side = max(64, int((size_kb * 1024 / 0.45) ** 0.5))  # noise compresses to ~0.45 bytes/pixel
+    buffer = io.BytesIO()
+    Image.effect_noise((side, side), 64).convert("RGB").save(buffer, "JPEG", quality=85)
+    return buffer.getvalue()
+
+
+class FakeUpstreams:
+    """
+    The fake upstream server. Call start() to serve on a free localhost port;
+    calls holds a Counter of '<upstream>.<call>' (and '<upstream>.failed').
+    """
+
+    def __init__(self, settings=None, seed=1):
+        self.settings = {name: dict(values) for name, values in DEFAULT_SETTINGS.items()}
+        for name, values in (settings or {}).items():
+            self.settings[name].update(values)
+        self.calls = Counter()
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._sync_round = Counter()  # calendar id -> incremental syncs served
+        self._photo = _fake_jpeg(self.settings["download"]["photo_kb"])
+        self._server = None
+
+    # --- Lifecycle ---
+
+    def start(self, host="127.0.0.1", port=0):
+        upstreams = self
+
+        class Handler(_Handler):
+            fake = upstreams
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="fake-upstreams", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self):
+        """Environment variables that point the dashboard at this server."""
+        return {
+            "GOOGLE_API_ROOT_URL": self.base_url + "/",
+            "GRAPH_BASE_URL": self.base_url + GRAPH_PREFIX,
+            "WEATHER_API_URL": self.base_url + "/data/2.5/weather",
+            "WEATHER_PROVIDER": "openweather",
+            "WEATHER_API_KEY": "bench",
+        }
+
+    def snapshot(self):
+        with self._lock:
+            return dict(sorted(self.calls.items()))
+
+    # --- Behaviour shared by direct and batched calls ---
+
+    def _count(self, name):
+        with self._lock:
+            self.calls[name] += 1
+
+    def _delay(self, upstream):
+        knobs = self.settings[upstream]
+        with self._lock:
+            jitter = self._random.uniform(-knobs["jitter_ms"], knobs["jitter_ms"])
+        time.sleep(max(0.0, knobs["latency_ms"] + jitter) / 1000)
+
+    def _fails(self, upstream):
+        with self._lock:
+            failed = self._random.random() < self.settings[upstream]["failure_rate"]
+            if failed:
+                self.calls[f"{upstream}.failed"] += 1
+        return failed
+
+    def _padding(self, upstream):
+        return "x" * self.settings[upstream]["payload_bytes"]
+
+    # --- Google Calendar ---
+
+    def _calendar_events(self, calendar_id, params):
+        """The events().list answer: full sync pages, or a few changes for a syncToken."""
+        knobs = self.settings["calendar"]
+        if "syncToken" in params:
+            with self._lock:
+                self._sync_round[calendar_id] += 1
+                round_ = self._sync_round[calendar_id]
+            changed = [self._event(calendar_id, n, f" (edit {round_})")
+                       for n in range(knobs["changes_per_sync"])]
+            return {"items": changed, "nextSyncToken": f"{calendar_id}-{round_}"}
+
+        events = [self._event(calendar_id, n) for n in range(knobs["events"])]
+        start = int(params.get("pageToken", 0))
+        page_size = int(params.get("maxResults", knobs["page_size"]))
+        page = {"items": events[start:start + page_size]}
+        if start + page_size < len(events):
+            page["nextPageToken"] = str(start + page_size)
+        else:
+            page["nextSyncToken"] = f"{calendar_id}-0"
+        return page
+
+    def _event(self, calendar_id, n, suffix=""):
+        """Event n of a calendar: spread over the next weeks, one in recurring_share a weekly series."""
+        knobs = self.settings["calendar"]
+        base = datetime.now(timezone.utc).replace(hour=7, minute=0, second=0, microsecond=0)
+        start = base + timedelta(days=(n * 7) % 60 - 10, hours=n % 12)
+        end = start + timedelta(hours=1)
+        event = {
+            "id": f"{calendar_id.split('@')[0]}evt{n}",
+            "status": "confirmed",
+            "summary": f"Event {n}{suffix}",
+            "description": self._padding("calendar"),
+            "start": {"dateTime": start.isoformat(), "timeZone": "UTC"},
+            "end": {"dateTime": end.isoformat(), "timeZone": "UTC"},
+        }
+        if knobs["recurring_share"] and n % max(1, round(1 / knobs["recurring_share"])) == 0:
+            event["recurrence"] = ["RRULE:FREQ=WEEKLY;COUNT=30"]
+        return event
+
+    def google(self, method, path, query):
+        """Answers one Calendar API call (direct or from a batch). Returns (status, body)."""
+        params = {key: values[-1] for key, values in parse_qs(query).items()}
+        match = _EVENTS_PATH.match(path)
+        if method == "GET" and match:
+            self._count("calendar.events_list")
+            return 200, self._calendar_events(unquote(match.group(1)), params)
+        match = _CALENDAR_LIST_PATH.match(path)
+        if method == "GET" and match:
+            self._count("calendar.calendar_list")
+            calendar_id = unquote(match.group(1))
+            return 200, {"id": calendar_id, "summary": calendar_id.split("@")[0].title(),
+                         "backgroundColor": "#33b679"}
+        return 404, {"error": {"code": 404, "message": f"Unknown path {path}"}}
+
+    def google_batch(self, content_type, body):
+        """Answers a multipart/mixed Google batch request with one part per sub-request."""
+        message = BytesParser(policy=HTTP).parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+        boundary = f"batch_{self._random.getrandbits(48):x}"
+        parts = []
+        for part in message.iter_parts():
+            request_line = part.get_payload().splitlines()[0]
+            method, target, _ = request_line.split(" ", 2)
+            url = urlsplit(target)
+            if self._fails("calendar"):
+                status, payload = 503, {"error": {"code": 503, "message": "Backend Error"}}
+            else:
+                status, payload = self.google(method, url.path, url.query)
+            content_id = part["Content-ID"].strip("<>")
+            parts.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                f"Content-Type: application/json; charset=UTF-8\r\n\r\n{json.dumps(payload)}\r\n"
+            )
+        return f"multipart/mixed; boundary={boundary}", ("".join(parts) + f"--{boundary}--\r\n").encode()
+
+    # --- Microsoft Graph ---
+
+    def _graph_item(self, n):
+        item_id = f"PHOTO{n:05d}"
+        return {
+            "id": item_id,
+            "name": f"photo_{n}.jpg",
+            "eTag": f"etag-{n}",
+            "cTag": f"ctag-{n}",
+            "size": len(self._photo),
+            "file": {"mimeType": "image/jpeg", "hashes": {"quickXorHash": f"hash{n}"}},
+            "image": {"width": 1024, "height": 768},
+            "description": self._padding("graph"),
+            "@microsoft.graph.downloadUrl": f"{self.base_url}/download/{item_id}",
+        }
+
+    def graph_delta(self, query):
+        """The delta query: every photo page by page, then nothing new on the deltaLink."""
+        self._count("graph.delta")
+        knobs = self.settings["graph"]
+        params = parse_qs(query)
+        base = self.base_url + GRAPH_PREFIX + "/me/drive/root:/bench:/delta"
+        if "token" in params:
+            return {"value": [], "@odata.deltaLink": f"{base}?token=latest"}
+        start = int(params.get("skip", ["0"])[0])
+        page = {"value": [self._graph_item(n)
+                          for n in range(start, min(start + knobs["page_size"], knobs["photos"]))]}
+        if start + knobs["page_size"] < knobs["photos"]:
+            page["@odata.nextLink"] = f"{base}?skip={start + knobs['page_size']}"
+        else:
+            page["@odata.deltaLink"] = f"{base}?token=latest"
+        return page
+
+    def graph_batch(self, body):
+        self._count("graph.batch")
+        responses = []
+        for request in json.loads(body).get("requests", []):
+            match = _ITEM_PATH.match(request["url"])
+            self._count("graph.batch_item")
+            responses.append({
+                "id": request["id"],
+                "status": 200,
+                "body": {"id": match.group(1),
+                         "@microsoft.graph.downloadUrl": f"{self.base_url}/download/{match.group(1)}"},
+            })
+        return {"responses": responses}
+
+    # --- OpenWeather ---
+
+    def weather(self, query):
+        self._count("weather.current")
+        city = parse_qs(query).get("q", ["?"])[0]
+        with self._lock:
+            temperature = round(self._random.uniform(-5, 30), 1)
+        return {"name": city, "main": {"temp": temperature},
+                "weather": [{"description": "scattered clouds"}], "padding": self._padding("weather")}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    fake = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type="application/json"):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _upstream(self, path):
+        if path.startswith(GRAPH_PREFIX):
+            return "graph"
+        if path.startswith("/download/"):
+            return "download"
+        if path.startswith("/data/"):
+            return "weather"
+        return "calendar"
+
+    def _handle(self, method):
+        url = urlsplit(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        upstream = self._upstream(url.path)
+        self.fake._delay(upstream)
+
+        if url.path == GOOGLE_BATCH_PATH and method == "POST":
+            self.fake._count("calendar.batch")
+            # Individual parts fail instead of the whole batch, as Google does
+            content_type, payload = self.fake.google_batch(self.headers["Content-Type"], body)
+            return self._send(200, payload, content_type)
+        if self.fake._fails(upstream):
+            return self._send(503, {"error": "injected failure"})
+
+        if upstream == "graph":
+            if _DELTA_PATH.match(url.path):
+                return self._send(200, self.fake.graph_delta(url.query))
+            if url.path == GRAPH_PREFIX + "/$batch" and method == "POST":
+                return self._send(200, self.fake.graph_batch(body))
+        elif upstream == "download":
+            self.fake._count("download.photo")
+            return self._send(200, self.fake._photo, "image/jpeg")
+        elif upstream == "weather":
+            return self._send(200, self.fake.weather(url.query))
+        else:
+            return self._send(*self.fake.google(method, url.path, url.query))
+        self._send(404, {"error": f"Unknown path {url.path}"})
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+
+if __name__ == "__main__":
+    upstreams = FakeUpstreams().start(port=8099)
+    print(f"🧪 Fake upstreams on {upstreams.base_url}")
+    for key, value in upstreams.env().items():
+        print(f"export {key}={value}")
+    threading.Event().wait()
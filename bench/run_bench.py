@@ -0,0 +1,418 @@
+# kitchen_dashboard/bench/run_bench.py
+
+"""
+Benchmarks the dashboard against local fake upstreams (see fake_upstreams.py).
+
+Starts the fakes, boots the app in a fresh process (serve_app.py) with its own
+empty data directories, measures cold start, then runs a number of kiosks that
+poll the dashboard endpoints concurrently. Latency percentiles per endpoint,
+upstream call counts, RSS and cold-start times are printed and saved as JSON
+under bench/results/, so two runs can be compared with --compare.
+
+    python bench/run_bench.py --kiosks 8 --duration 30
+    python bench/run_bench.py --set calendar.latency_ms=400 --set graph.failure_rate=0.1
+    python bench/run_bench.py --compare bench/results/<baseline>.json
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+import requests
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(BENCH_DIR))
+
+from fake_upstreams import DEFAULT_SETTINGS, FakeUpstreams  # noqa: E402
+
+RESULTS_DIR = BENCH_DIR / "results"
+RESULT_SCHEMA = 1
+PROFILES = ("kitchen", "living_room")
+VIEWS = ("rolling", "1W", "2W", "3W", "1M")
+READY_TIMEOUT = 60  # seconds to wait for /api/ready
+WARM_TIMEOUT = 60   # seconds to wait for the first calendar sync and photo index
+RSS_SAMPLE_INTERVAL = 0.5  # seconds
+
+
+# --- Process helpers ---
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _process_tree(pid):
+    """pid plus every descendant (gunicorn workers), read from /proc."""
+    pids, queue = [], [pid]
+    while queue:
+        current = queue.pop()
+        pids.append(current)
+        try:
+            children = Path(f"/proc/{current}/task/{current}/children").read_text().split()
+        except OSError:
+            children = []
+        queue.extend(int(child) for child in children)
+    return pids
+
+
+def rss_mb(pid):
+    """Resident and peak resident memory of a process tree, in MB (Linux only)."""
+    rss = peak = 0
+    for member in _process_tree(pid):
+        try:
+            status = Path(f"/proc/{member}/status").read_text()
+        except OSError:
+            continue
+        for line in status.splitlines():
+            if line.startswith("VmRSS:"):
+                rss += int(line.split()[1])
+            elif line.startswith("VmHWM:"):
+                peak += int(line.split()[1])
+    return round(rss / 1024, 1), round(peak / 1024, 1)
+
+
+def _git_revision():
+    def git(*args):
+        return subprocess.run(["git", *args], cwd=ROOT_DIR, capture_output=True, text=True).stdout.strip()
+    return {"commit": git("rev-parse", "--short", "HEAD") or "unknown",
+            "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def _app_env(upstreams, data_dir):
+    """Environment for the app process: fresh data directories and every upstream pointed at the fakes."""
+    from cryptography.fernet import Fernet
+
+    key = Fernet.generate_key()
+    encrypted_env = data_dir / ".env.encrypted"
+    encrypted_env.write_bytes(Fernet(key).encrypt(b"# benchmark: everything comes from the environment\n"))
+    return {
+        **os.environ,
+        **upstreams.env(),
+        "TZ": os.getenv("TZ", "UTC"),
+        "FLASK_ENV": "production",
+        "CITY": "Benchville",
+        "DOTENV_ENCRYPTION_KEY": key.decode(),
+        "DOTENV_ENCRYPTED_PATH": str(encrypted_env),
+        "DASHBOARD_LOG_PATH": str(data_dir / "logs"),
+        "PHOTO_CACHE_DIR": str(data_dir / "photos"),
+        "PYTHONUNBUFFERED": "1",
+    }
+
+
+def start_app(args, env, port, log_file):
+    if args.gunicorn_workers:
+        command = ["gunicorn", "--chdir", str(BENCH_DIR), "serve_app:app",
+                   f"--workers={args.gunicorn_workers}", "--threads=8", "--worker-class=gthread",
+                   f"--bind=127.0.0.1:{port}"]
+    else:
+        command = [sys.executable, str(BENCH_DIR / "serve_app.py"), "--port", str(port)]
+    return subprocess.Popen(command, cwd=ROOT_DIR, env=env, stdout=log_file, stderr=subprocess.STDOUT)
+
+
+# --- Measurements ---
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[rank]
+
+
+class Recorder:
+    """Latency samples, status codes and response sizes per endpoint, shared by the kiosk threads."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.bytes = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def add(self, endpoint, seconds, ok, size):
+        with self._lock:
+            self.samples[endpoint].append(seconds * 1000)
+            self.bytes[endpoint] += size
+            if not ok:
+                self.errors[endpoint] += 1
+
+    def summary(self, duration):
+        endpoints = {}
+        for endpoint, values in sorted(self.samples.items()):
+            values = sorted(values)
+            endpoints[endpoint] = {
+                "count": len(values),
+                "errors": self.errors[endpoint],
+                "rps": round(len(values) / duration, 2),
+                "mean_ms": round(sum(values) / len(values), 2),
+                "p50_ms": round(percentile(values, 50), 2),
+                "p95_ms": round(percentile(values, 95), 2),
+                "p99_ms": round(percentile(values, 99), 2),
+                "max_ms": round(values[-1], 2),
+                "mean_bytes": round(self.bytes[endpoint] / len(values)),
+            }
+        return endpoints
+
+
+def timed_get(session, recorder, base_url, endpoint, path, timeout=30):
+    """GETs base_url + path and records it under endpoint. Returns the response or None."""
+    started = time.perf_counter()
+    try:
+        response = session.get(base_url + path, timeout=timeout)
+    except requests.RequestException:
+        recorder.add(endpoint, time.perf_counter() - started, False, 0)
+        return None
+    recorder.add(endpoint, time.perf_counter() - started, response.status_code < 400, len(response.content))
+    return response
+
+
+def kiosk(number, base_url, recorder, stop, think):
+    """
+    One kiosk browser: loads the page and its settings, then cycles through the
+    widget endpoints the frontend polls, fetching each photo it is handed.
+    """
+    session = requests.Session()
+    session.headers["Accept"] = "image/webp,*/*"
+    profile = PROFILES[number % len(PROFILES)]
+    views = itertools.cycle(VIEWS[number % len(VIEWS):] + VIEWS[:number % len(VIEWS)])
+
+    timed_get(session, recorder, base_url, "/", "/")
+    timed_get(session, recorder, base_url, "/api/widgets/settings", "/api/widgets/settings")
+    while not stop.is_set():
+        timed_get(session, recorder, base_url, "/api/dashboard", f"/api/dashboard?profile={profile}")
+        timed_get(session, recorder, base_url, "/api/calendar", f"/api/calendar?profile={profile}&view={next(views)}")
+        timed_get(session, recorder, base_url, "/api/weather", "/api/weather")
+        photo = timed_get(session, recorder, base_url, "/api/onedrive/photo", f"/api/onedrive/photo?profile={profile}")
+        if photo is not None and photo.ok:
+            timed_get(session, recorder, base_url, "/api/onedrive/photo/<key>", photo.json()["image_url"])
+        stop.wait(think)
+
+
+def wait_until(check, timeout, interval=0.02):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if check():
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(interval)
+    return False
+
+
+def cold_start(process, base_url, spawned):
+    """Seconds from spawn to /api/ready, to the first dashboard response and to warm widget data."""
+    if not wait_until(lambda: requests.get(base_url + "/api/ready", timeout=1).status_code == 200, READY_TIMEOUT):
+        raise RuntimeError(f"App not ready after {READY_TIMEOUT}s (exit code {process.poll()})")
+    ready_s = time.perf_counter() - spawned
+    app_timings = requests.get(base_url + "/api/ready", timeout=5).json()
+    requests.get(base_url + f"/api/dashboard?profile={PROFILES[0]}", timeout=30)
+    first_response_s = time.perf_counter() - spawned
+
+    def warm():
+        calendar = requests.get(base_url + "/api/calendar?view=1M", timeout=5).json()
+        photo = requests.get(base_url + f"/api/onedrive/photo?profile={PROFILES[0]}", timeout=5)
+        return calendar.get("events") and photo.status_code == 200
+    warmed = wait_until(warm, WARM_TIMEOUT, interval=0.1)
+    return {
+        "ready_s": round(ready_s, 3),
+        "first_response_s": round(first_response_s, 3),
+        "warm_s": round(time.perf_counter() - spawned, 3) if warmed else None,
+        "app_timings": app_timings,
+    }
+
+
+def run(args, upstreams):
+    data_dir = Path(tempfile.mkdtemp(prefix="dashboard-bench-"))
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    log_path = data_dir / "app.log"
+    with open(log_path, "w") as log_file:
+        spawned = time.perf_counter()
+        process = start_app(args, _app_env(upstreams, data_dir), port, log_file)
+        try:
+            startup = cold_start(process, base_url, spawned)
+            rss_ready = rss_mb(process.pid)[0]
+            calls_warm = upstreams.snapshot()
+
+            recorder, stop = Recorder(), threading.Event()
+            kiosks = [threading.Thread(target=kiosk, args=(n, base_url, recorder, stop, args.think_ms / 1000),
+                                       daemon=True) for n in range(args.kiosks)]
+            load_started = time.perf_counter()
+            for thread in kiosks:
+                thread.start()
+            rss_samples = []
+            while time.perf_counter() - load_started < args.duration:
+                rss_samples.append(rss_mb(process.pid)[0])
+                time.sleep(RSS_SAMPLE_INTERVAL)
+            stop.set()
+            for thread in kiosks:
+                thread.join(timeout=35)
+            duration = time.perf_counter() - load_started
+            rss_end, rss_peak = rss_mb(process.pid)
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    calls_end = upstreams.snapshot()
+    endpoints = recorder.summary(duration)
+    total = sum(e["count"] for e in endpoints.values())
+    result = {
+        "schema": RESULT_SCHEMA,
+        "label": args.label,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git": _git_revision(),
+        "python": platform.python_version(),
+        "config": {"kiosks": args.kiosks, "duration_s": args.duration, "think_ms": args.think_ms,
+                   "server": f"gunicorn x{args.gunicorn_workers}" if args.gunicorn_workers else "werkzeug",
+                   "upstreams": upstreams.settings},
+        "cold_start": startup,
+        "endpoints": endpoints,
+        "totals": {"requests": total, "errors": sum(e["errors"] for e in endpoints.values()),
+                   "rps": round(total / duration, 2)},
+        "upstream_calls": {
+            "until_warm": calls_warm,
+            "during_load": {k: v - calls_warm.get(k, 0) for k, v in calls_end.items() if v - calls_warm.get(k, 0)},
+        },
+        "rss_mb": {"ready": rss_ready, "max_sampled": max(rss_samples, default=rss_end),
+                   "end": rss_end, "peak": rss_peak},
+    }
+    if args.keep:
+        print(f"📁 App data and log kept in {data_dir}")
+    else:
+        shutil.rmtree(data_dir, ignore_errors=True)
+    return result
+
+
+# --- Reporting ---
+
+def print_report(result):
+    cold = result["cold_start"]
+    print(f"\n🚀 Cold start: ready {cold['ready_s']}s, first dashboard {cold['first_response_s']}s, "
+          f"warm {cold['warm_s']}s")
+    print(f"🧠 RSS: {result['rss_mb']['ready']} MB at ready, {result['rss_mb']['peak']} MB peak")
+    print(f"\n{'endpoint':<28}{'count':>7}{'err':>5}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'bytes':>9}")
+    for endpoint, stats in result["endpoints"].items():
+        print(f"{endpoint:<28}{stats['count']:>7}{stats['errors']:>5}{stats['p50_ms']:>9}"
+              f"{stats['p95_ms']:>9}{stats['p99_ms']:>9}{stats['mean_bytes']:>9}")
+    print(f"{'total':<28}{result['totals']['requests']:>7}{result['totals']['errors']:>5}"
+          f"   ({result['totals']['rps']} req/s)")
+    print("\n🔌 Upstream calls until warm:", json.dumps(result["upstream_calls"]["until_warm"]))
+    print("🔌 Upstream calls under load:", json.dumps(result["upstream_calls"]["during_load"]))
+
+
+def _change(new, old):
+    if old in (None, 0) or new is None:
+        return None
+    return (new - old) / old * 100
+
+
+def compare(result, baseline, threshold):
+    """Prints per-metric changes against a baseline result. Returns the regressions found."""
+    print(f"\n📊 Against {baseline['git']['commit']} ({baseline.get('label') or baseline['created_at']}):")
+    regressions = []
+
+    def line(name, new, old, higher_is_worse=True):
+        change = _change(new, old)
+        flag = ""
+        if change is not None and (change if higher_is_worse else -change) > threshold:
+            flag = "  ⚠️ regression"
+            regressions.append(name)
+        shown = "n/a" if change is None else f"{change:+.1f}%"
+        print(f"  {name:<44}{old!s:>10} -> {new!s:<10}{shown:>8}{flag}")
+
+    for endpoint, stats in result["endpoints"].items():
+        old = baseline["endpoints"].get(endpoint)
+        if old:
+            for key in ("p50_ms", "p95_ms", "p99_ms"):
+                line(f"{endpoint} {key}", stats[key], old[key])
+    line("throughput req/s", result["totals"]["rps"], baseline["totals"]["rps"], higher_is_worse=False)
+    for key in ("ready_s", "first_response_s", "warm_s"):
+        line(f"cold start {key}", result["cold_start"][key], baseline["cold_start"][key])
+    line("rss peak MB", result["rss_mb"]["peak"], baseline["rss_mb"]["peak"])
+    old_calls = baseline["upstream_calls"]["during_load"]
+    for name, count in sorted(result["upstream_calls"]["during_load"].items()):
+        line(f"upstream {name} (under load)", count, old_calls.get(name))
+    return regressions
+
+
+def _parse_settings(pairs):
+    """--set upstream.knob=value pairs -> {upstream: {knob: value}}."""
+    settings = defaultdict(dict)
+    for pair in pairs:
+        name, _, value = pair.partition("=")
+        upstream, _, knob = name.partition(".")
+        if upstream not in DEFAULT_SETTINGS or knob not in DEFAULT_SETTINGS[upstream]:
+            raise argparse.ArgumentTypeError(f"Unknown upstream setting: {name}")
+        settings[upstream][knob] = type(DEFAULT_SETTINGS[upstream][knob])(value)
+    return settings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--kiosks", type=int, default=8, help="concurrent kiosk clients")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of load after warm-up")
+    parser.add_argument("--think-ms", type=float, default=250, help="pause between a kiosk's polling rounds")
+    parser.add_argument("--latency-ms", type=float, help="latency of every fake upstream")
+    parser.add_argument("--failure-rate", type=float, help="share of failed calls on every fake upstream")
+    parser.add_argument("--set", action="append", default=[], metavar="UPSTREAM.KNOB=VALUE",
+                        help="per-upstream setting, e.g. calendar.events=500 (see fake_upstreams.DEFAULT_SETTINGS)")
+    parser.add_argument("--gunicorn-workers", type=int, default=0,
+                        help="serve with gunicorn and this many workers instead of werkzeug")
+    parser.add_argument("--label", default="", help="free-form note stored with the result")
+    parser.add_argument("--out", type=Path, help="result file (default: bench/results/<time>-<commit>.json)")
+    parser.add_argument("--compare", type=Path, help="earlier result to compare against")
+    parser.add_argument("--threshold", type=float, default=10, help="%% change that counts as a regression")
+    parser.add_argument("--keep", action="store_true", help="keep the app's data directory and log")
+    args = parser.parse_args(argv)
+
+    if args.gunicorn_workers and not shutil.which("gunicorn"):
+        parser.error("gunicorn is not installed")
+    try:
+        settings = _parse_settings(args.set)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+    for upstream in DEFAULT_SETTINGS:
+        if args.latency_ms is not None and "latency_ms" in DEFAULT_SETTINGS[upstream]:
+            settings[upstream].setdefault("latency_ms", args.latency_ms)
+        if args.failure_rate is not None:
+            settings[upstream].setdefault("failure_rate", args.failure_rate)
+
+    upstreams = FakeUpstreams(settings).start()
+    try:
+        result = run(args, upstreams)
+    finally:
+        upstreams.stop()
+
+    print_report(result)
+    out = args.out or RESULTS_DIR / f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{result['git']['commit']}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, indent=2) + "\n")
+    print(f"\n💾 Saved {out}")
+
+    if args.compare:
+        regressions = compare(result, json.loads(args.compare.read_text()), args.threshold)
+        if regressions:
+            print(f"\n⚠️ {len(regressions)} metric(s) regressed by more than {args.threshold}%.")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
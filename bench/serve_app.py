@@ -0,0 +1,50 @@
+# kitchen_dashboard/bench/serve_app.py
+
+"""
+The dashboard app as the benchmark runs it: backend/app.py unchanged, except that
+Google and Graph credentials are replaced with dummies the fake upstreams accept.
+
+    python bench/serve_app.py --port 5051                 # threaded werkzeug server
+    gunicorn --chdir bench serve_app:app --workers=2 ...   # as in the Dockerfile
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT_DIR / "backend"), str(ROOT_DIR)]
+
+# Patched before app.py is imported, so its first poll already uses them. This moves
+# part of the import time out of app.py's own boot timings; run_bench.py measures
+# cold start from process spawn instead.
+import calendar_widget
+import onedrive_widget
+
+_get_calendar_service = calendar_widget.get_calendar_service
+
+
+def _bench_calendar_service():
+    # google_utils stays a deferred import, as in production; only its credentials are swapped
+    import utils.google_utils as google_utils
+    from google.auth.credentials import AnonymousCredentials
+
+    google_utils.get_google_credentials = lambda *args, **kwargs: AnonymousCredentials()
+    return _get_calendar_service()
+
+
+calendar_widget.get_calendar_service = _bench_calendar_service
+onedrive_widget.get_onedrive_token = lambda: "bench-token"
+
+from app import app  # noqa: E402  (starts warm-up and the leader's pollers, like gunicorn would)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the dashboard against the fake upstreams.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "5051")))
+    args = parser.parse_args()
+
+    from werkzeug.serving import make_server
+    make_server(args.host, args.port, app, threaded=True).serve_forever()
@@ -1,29 +1,53 @@
-// Load data from backend API
+// Profile whose widgets this kiosk shows, e.g. /?profile=kitchen
+const PROFILE = new URLSearchParams(window.location.search).get('profile') || 'default';
+// Optional calendar view override (1M, 3W, 2W, 1W, rolling); otherwise the profile's setting
+const CALENDAR_VIEW = new URLSearchParams(window.location.search).get('view') || '';
+
+function renderCalendar(data) {
+  const calendarContainer = document.getElementById("calendar");
+  calendarContainer.innerHTML = "<ul>" + data.events.map(event =>
+    `<li title="${event.source || ''}"><span style="color: ${event.color || 'inherit'}">●</span> ${event.summary} at ${event.start}</li>`
+  ).join('') + "</ul>";
+}
+
+function renderWeather(data) {
+  const weatherContainer = document.getElementById("weather");
+  weatherContainer.innerHTML = `<p>${data.temperature}°C</p><p>${data.condition}</p>`;
+}
+
+function renderPhoto(data) {
+  const photosContainer = document.getElementById("photos");
+  photosContainer.innerHTML = `<img src="${data.image_url}" alt="photo" style="width: 100%; height: 100%; object-fit: cover;">`;
+}
+
+// Streamed calendar updates are in the profile's view; a kiosk with its own view refetches it
 function fetchCalendar() {
-  fetch('/api/calendar')
+  fetch(`/api/calendar?profile=${PROFILE}&view=${CALENDAR_VIEW}`)
     .then(response => response.json())
-    .then(data => {
-      const calendarContainer = document.getElementById("calendar");
-      calendarContainer.innerHTML = "<ul>" + data.map(event => `<li>${event.summary} at ${event.start.dateTime}</li>`).join('') + "</ul>";
-    });
+    .then(renderCalendar);
 }
 
-function fetchWeather() {
-  fetch('/api/weather')
+// First paint: every enabled widget in one round trip
+function fetchDashboard() {
+  fetch(`/api/dashboard?profile=${PROFILE}&view=${CALENDAR_VIEW}`)
     .then(response => response.json())
     .then(data => {
-      const weatherContainer = document.getElementById("weather");
-      weatherContainer.innerHTML = `<p>${data.temperature}°C</p><p>${data.condition}</p>`;
+      const renderers = { calendar: renderCalendar, weather: renderWeather, photos: renderPhoto };
+      Object.entries(data.widgets).forEach(([name, widget]) => {
+        if (widget.ok && renderers[name]) renderers[name](widget.data);
+      });
     });
 }
 
-function fetchPhotos() {
-  fetch('/api/photos')
-    .then(response => response.json())
-    .then(data => {
-      const photosContainer = document.getElementById("photos");
-      photosContainer.innerHTML = data.map(photo => `<img src="${photo.url}" alt="photo" style="width: 100%; height: 100%; object-fit: cover;">`).join('');
-    });
+// One long-lived connection replaces per-widget polling. EventSource reconnects
+// on its own and sends Last-Event-ID so missed updates are replayed.
+function connectStream() {
+  const source = new EventSource(`/api/stream?profile=${PROFILE}`);
+  source.addEventListener('calendar', e => CALENDAR_VIEW ? fetchCalendar() : renderCalendar(JSON.parse(e.data)));
+  source.addEventListener('weather', e => renderWeather(JSON.parse(e.data)));
+  source.addEventListener('photo', e => renderPhoto(JSON.parse(e.data)));
+  source.addEventListener('profile', () => window.location.reload());
+  source.addEventListener('resync', fetchDashboard);
 }
 
 function updateClock() {
@@ -63,9 +87,8 @@ function initClock() {
 }
 
 document.addEventListener('DOMContentLoaded', () => {
-  fetchCalendar();
-  fetchWeather();
-  fetchPhotos();
+  fetchDashboard();
+  connectStream();
   initDragAndResize();
-  intiClock();
+  initClock();
 });
@@ -9,7 +9,7 @@ export default function OneDrivePhotoWidget({ profile = "default" }) {
 
   const fetchImage = async () => {
     try {
-      const res = await fetch("/api/onedrive-image");
+      const res = await fetch(`/api/onedrive/photo?profile=${profile}`);
       const data = await res.json();
       if (data.image_url) setImageUrl(data.image_url);
     } catch {
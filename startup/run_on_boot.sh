@@ -3,8 +3,11 @@ cd /joel/kitchen_dashboard
 source venv/bin/activate
 python3 backend/app.py &
 
-# Wait for server
-sleep 10
+# Wait until the backend has loaded its cached widget data (up to 60s)
+for _ in $(seq 1 120); do
+    curl -sf http://localhost:5050/api/ready > /dev/null && break
+    sleep 0.5
+done
 
 # Launch Chromium in kiosk
 chromium-browser --noerrdialogs --kiosk http://localhost:5050
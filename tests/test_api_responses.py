@@ -0,0 +1,87 @@
+import gzip
+import json
+import os
+import sys
+import unittest
+from datetime import datetime, timezone
+from pathlib import Path
+from unittest.mock import patch
+
+from flask import Flask, jsonify
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT_DIR / "backend"), str(ROOT_DIR)]
+for var in ("TZ", "FLASK_ENV", "CITY"):
+    os.environ.setdefault(var, "test")
+
+import api_responses
+from api_responses import CompactJSONProvider, versioned
+
+
+class ApiResponsesTest(unittest.TestCase):
+
+    def setUp(self):
+        bodies = patch.object(api_responses, "_bodies", api_responses.OrderedDict())
+        bodies.start()
+        self.addCleanup(bodies.stop)
+        self.version = 1
+        self.builds = 0
+        app = Flask(__name__)
+        app.debug = True  # Must not turn pretty-printing back on
+        app.json = CompactJSONProvider(app)
+        app.register_blueprint(api_responses.api_responses)
+
+        @app.route("/api/events")
+        @versioned(lambda: self.version)
+        def events():
+            self.builds += 1
+            return jsonify({"events": [{"summary": f"Event {i}", "version": self.version} for i in range(50)]})
+
+        @app.route("/api/small")
+        def small():
+            return jsonify({"b": 1, "a": datetime(2026, 1, 2, tzinfo=timezone.utc)})
+
+        self.client = app.test_client()
+
+    def test_compact_unsorted_json(self):
+        response = self.client.get("/api/small")
+
+        self.assertEqual(response.get_data(as_text=True).strip(),
+                         '{"b":1,"a":"Fri, 02 Jan 2026 00:00:00 GMT"}')
+        self.assertNotIn("Content-Encoding", response.headers)
+
+    def test_versioned_view_answers_304_without_rebuilding(self):
+        first = self.client.get("/api/events")
+        again = self.client.get("/api/events", headers={"If-None-Match": first.headers["ETag"]})
+        other_kiosk = self.client.get("/api/events")
+
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.data, b"")
+        self.assertEqual(other_kiosk.data, first.data)
+        self.assertEqual(self.builds, 1)
+
+        self.version = 2
+        changed = self.client.get("/api/events", headers={"If-None-Match": first.headers["ETag"]})
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers["ETag"], first.headers["ETag"])
+        self.assertEqual(self.builds, 2)
+
+    def test_gzip_when_accepted(self):
+        response = self.client.get("/api/events", headers={"Accept-Encoding": "gzip"})
+        again = self.client.get("/api/events", headers={"Accept-Encoding": "gzip"})
+
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response.headers["Vary"])
+        self.assertEqual(json.loads(gzip.decompress(response.data))["events"][0]["version"], 1)
+        self.assertEqual(again.data, response.data)
+
+    def test_unversioned_json_revalidates_by_body_hash(self):
+        first = self.client.get("/api/small")
+
+        response = self.client.get("/api/small", headers={"If-None-Match": first.headers["ETag"]})
+
+        self.assertEqual(response.status_code, 304)
+
+
+if __name__ == '__main__':
+    unittest.main()
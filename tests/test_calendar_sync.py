@@ -0,0 +1,189 @@
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from googleapiclient.errors import HttpError
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT_DIR / "backend"), str(ROOT_DIR)]
+for var in ("TZ", "FLASK_ENV", "CITY"):
+    os.environ.setdefault(var, "test")
+
+import calendar_cache
+import calendar_sync
+
+
+def _event(event_id, start, end):
+    return {"id": event_id, "summary": event_id, "start": {"dateTime": start}, "end": {"dateTime": end}}
+
+
+class FakeGoogle:
+    """
+    Stands in for the Calendar service. Responses are queued per calendar; each
+    batch() call counts as one HTTP round trip.
+    """
+
+    def __init__(self):
+        self.pages = {}
+        self.list_calls = []
+        self.batches = 0
+        self.service = MagicMock()
+        self.service.events().list.side_effect = lambda **params: ("events", params)
+        self.service.calendarList().get.side_effect = lambda **params: ("meta", params)
+        self.service.new_batch_http_request.side_effect = self._new_batch
+
+    def _new_batch(self, callback):
+        batch = MagicMock()
+        added = []
+        batch.add.side_effect = lambda request, request_id: added.append((request_id, request))
+
+        def execute():
+            self.batches += 1
+            for request_id, (kind, params) in added:
+                if kind == "meta":
+                    callback(request_id, {"summary": f"{params['calendarId']} title", "backgroundColor": "#123456"}, None)
+                    continue
+                self.list_calls.append(params)
+                response = self.pages[params["calendarId"]].pop(0)
+                if isinstance(response, Exception):
+                    callback(request_id, None, response)
+                else:
+                    callback(request_id, response, None)
+        batch.execute.side_effect = execute
+        return batch
+
+
+class CalendarSyncTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.mkdtemp()
+        patches = [
+            patch.object(calendar_cache, "LOG_PATH", tmp_dir),
+            patch.object(calendar_cache, "SYNC_STATE_FILE", os.path.join(tmp_dir, "calendar_sync_state.json")),
+            patch.object(calendar_sync, "_state", None),
+            patch.object(calendar_sync, "log_error"),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+        self.store = calendar_cache.set_store_path(os.path.join(tmp_dir, "calendar_events.db"))
+        self.now = datetime.now(timezone.utc)
+        self.google = FakeGoogle()
+
+    def _at(self, hours):
+        return (self.now + timedelta(hours=hours)).isoformat()
+
+    def _window(self, calendar_ids=None):
+        return calendar_sync.events_in_window(self.now, self.now + timedelta(days=7), calendar_ids)
+
+    def test_full_sync_follows_pages_and_stores_token(self):
+        self.google.pages["primary"] = [
+            {"items": [_event("a", self._at(1), self._at(2))], "nextPageToken": "p2"},
+            {"items": [_event("b", self._at(1), self._at(2))], "nextSyncToken": "sync-1"},
+        ]
+
+        changes = calendar_sync.sync_calendars(self.google.service, [{"id": "primary"}])
+
+        self.assertEqual(changes, 2)
+        self.assertEqual(self.google.list_calls[1]["pageToken"], "p2")
+        self.assertEqual(calendar_cache.load_sync_state()["calendars"]["primary"]["sync_token"], "sync-1")
+        self.assertEqual(len(self.store.events("primary")), 2)
+
+    def test_delta_sync_merges_changes_and_deletions(self):
+        self.google.pages["primary"] = [
+            {"items": [_event("a", self._at(1), self._at(2)), _event("b", self._at(1), self._at(2))],
+             "nextSyncToken": "sync-1"},
+            {"items": [{"id": "a", "status": "cancelled"}, _event("c", self._at(1), self._at(2))],
+             "nextSyncToken": "sync-2"},
+        ]
+        calendar_sync.sync_calendars(self.google.service, [{"id": "primary"}])
+
+        changes = calendar_sync.sync_calendars(self.google.service, [{"id": "primary"}])
+
+        self.assertEqual(changes, 2)
+        self.assertEqual(self.google.list_calls[-1]["syncToken"], "sync-1")
+        self.assertEqual(sorted(e["id"] for e in self._window()), ["b", "c"])
+
+    def test_calendars_fetched_in_one_batch_and_merged_by_start(self):
+        self.google.pages["family"] = [{"items": [_event("dentist", self._at(3), self._at(4)),
+                                                  _event("dinner", self._at(1), self._at(2))],
+                                        "nextSyncToken": "f1"}]
+        self.google.pages["school"] = [{"items": [_event("recital", self._at(2), self._at(3))],
+                                        "nextSyncToken": "s1"}]
+
+        calendar_sync.sync_calendars(self.google.service, [{"id": "family", "color": "#ff0000", "name": "Family"},
+                                                           {"id": "school"}])
+
+        self.assertEqual(self.google.batches, 1)
+        events = self._window()
+        self.assertEqual([e["id"] for e in events], ["dinner", "recital", "dentist"])
+        self.assertEqual((events[0]["color"], events[0]["source"]), ("#ff0000", "Family"))
+        self.assertEqual((events[1]["color"], events[1]["source"]), ("#123456", "school title"))
+        self.assertEqual([e["id"] for e in self._window(["school"])], ["recital"])
+
+    def test_expired_token_resyncs_only_that_calendar(self):
+        self.google.pages["family"] = [
+            {"items": [_event("a", self._at(1), self._at(2))], "nextSyncToken": "f1"},
+            HttpError(MagicMock(status=410), b"gone"),
+            {"items": [_event("b", self._at(1), self._at(2))], "nextSyncToken": "f2"},
+        ]
+        self.google.pages["school"] = [
+            {"items": [_event("c", self._at(1), self._at(2))], "nextSyncToken": "s1"},
+            {"items": [], "nextSyncToken": "s1"},
+        ]
+        calendars = [{"id": "family"}, {"id": "school"}]
+        calendar_sync.sync_calendars(self.google.service, calendars)
+
+        calendar_sync.sync_calendars(self.google.service, calendars)
+
+        self.assertEqual(sorted(e["id"] for e in self._window()), ["b", "c"])
+        self.assertNotIn("syncToken", self.google.list_calls[-1])
+
+    def test_range_query_includes_events_that_started_before_the_window(self):
+        self.google.pages["primary"] = [{"items": [
+            _event("trip", self._at(-72), self._at(30)),
+            _event("past", self._at(-5), self._at(-4)),
+            _event("lunch", self._at(2), self._at(3)),
+            _event("far", self._at(24 * 20), self._at(24 * 20 + 1)),
+        ], "nextSyncToken": "s1"}]
+        calendar_sync.sync_calendars(self.google.service, [{"id": "primary"}])
+
+        self.assertEqual([e["id"] for e in self._window()], ["trip", "lunch"])
+        month = calendar_sync.events_in_window(self.now, self.now + timedelta(days=31))
+        self.assertEqual([e["id"] for e in month], ["trip", "lunch", "far"])
+
+    def test_recurring_series_expanded_locally_with_overrides(self):
+        start = (self.now + timedelta(days=1)).replace(hour=9, minute=0, second=0, microsecond=0)
+        occurrence = lambda day: f"series_{start + timedelta(days=day):%Y%m%dT%H%M%SZ}"
+        moved = start + timedelta(days=2, hours=3)
+        self.google.pages["primary"] = [{"items": [
+            {"id": "series", "summary": "Walk dog", "recurrence": ["RRULE:FREQ=DAILY;COUNT=5"],
+             "start": {"dateTime": start.isoformat()}, "end": {"dateTime": (start + timedelta(hours=1)).isoformat()}},
+            {"id": occurrence(1), "status": "cancelled", "recurringEventId": "series"},
+            {**_event(occurrence(2), moved.isoformat(), (moved + timedelta(hours=1)).isoformat()),
+             "recurringEventId": "series"},
+        ], "nextSyncToken": "s1"}]
+
+        calendar_sync.sync_calendars(self.google.service, [{"id": "primary"}])
+
+        self.assertFalse(self.google.list_calls[0]["singleEvents"])
+        events = self._window()
+        self.assertEqual([e["id"] for e in events],
+                         [occurrence(0), occurrence(2), occurrence(3), occurrence(4)])
+        self.assertEqual(events[1]["start"], moved.isoformat())
+
+        with patch.object(self.store, "recurring", wraps=self.store.recurring) as recurring:
+            self._window()
+        recurring.assert_not_called()  # Same window and revision: expansion is memoized
+
+    def test_unknown_channel_is_rejected(self):
+        self.assertFalse(calendar_sync.is_known_channel("missing", "token"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from unittest.mock import patch
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT_DIR / "backend"), str(ROOT_DIR)]
+for var in ("TZ", "FLASK_ENV", "CITY"):
+    os.environ.setdefault(var, "test")
+
+import calendar_cache
+import calendar_sync
+import calendar_widget
+from shared_cache import set_cache_path
+
+# A Wednesday afternoon
+NOW = datetime(2025, 3, 12, 15, 30, tzinfo=timezone.utc)
+
+
+class CalendarViewTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.mkdtemp()
+        set_cache_path(os.path.join(tmp_dir, "shared_cache.db"))
+        store = calendar_cache.set_store_path(os.path.join(tmp_dir, "calendar_events.db"))
+        events = []
+        for day in (-8, 1, 10, 18, 25):
+            start = NOW + timedelta(days=day)
+            event = {"id": f"day{day}", "summary": f"day{day}", "start": start.isoformat(),
+                     "end": (start + timedelta(hours=1)).isoformat(), "calendar_id": "primary"}
+            events.append((event, start.timestamp(), start.timestamp() + 3600))
+        store.apply("primary", events, [])
+
+    def test_view_windows(self):
+        self.assertEqual(calendar_widget.view_window("rolling", NOW), (NOW, NOW + timedelta(days=7)))
+        monday = datetime(2025, 3, 10, tzinfo=timezone.utc)
+        self.assertEqual(calendar_widget.view_window("2W", NOW), (monday, monday + timedelta(weeks=2)))
+        self.assertEqual(calendar_widget.view_window("1M", NOW),
+                         (datetime(2025, 3, 1, tzinfo=timezone.utc), datetime(2025, 4, 1, tzinfo=timezone.utc)))
+
+    def test_every_view_served_from_the_store(self):
+        expected = {
+            "rolling": ["day1"],
+            "1W": ["day1"],
+            "2W": ["day1", "day10"],
+            "3W": ["day1", "day10", "day18"],
+            "1M": ["day-8", "day1", "day10", "day18"],
+        }
+        view_window = calendar_widget.view_window
+        with patch.object(calendar_widget, "view_window", side_effect=lambda view: view_window(view, NOW)), \
+                patch.object(calendar_widget, "get_profile", return_value={}):
+            for view, ids in expected.items():
+                result = calendar_widget.get_cached_events("kitchen", view)
+                self.assertEqual([e["id"] for e in result["events"]], ids, view)
+                self.assertEqual(result["view"], view)
+
+    def test_events_version_depends_on_content_not_profile_reloads(self):
+        from shared_cache import get_cache
+        get_cache().put(calendar_widget.SHARED_KEY, {"updated_at": NOW.isoformat()})
+        profiles = {"kitchen": {"calendar": {"view": "1W", "calendars": [{"id": "primary"}]}}}
+        with patch.object(calendar_widget, "get_profile", side_effect=lambda name: profiles[name]):
+            version = calendar_widget.events_version("kitchen")
+            with patch.object(calendar_widget.profile_store, "version", 41):  # Another worker's reload count
+                self.assertEqual(calendar_widget.events_version("kitchen"), version)
+            profiles["kitchen"] = {"calendar": {"view": "1W", "calendars": [{"id": "primary"}, {"id": "family"}]}}
+            self.assertNotEqual(calendar_widget.events_version("kitchen"), version)
+
+
+
+class AllDayLocalTimeTest(unittest.TestCase):
+    """All-day events span the kiosk's local days, not UTC ones."""
+
+    def setUp(self):
+        tz = patch.dict(os.environ, {"TZ": "America/Chicago"})
+        tz.start()
+        time.tzset()
+        self.addCleanup(time.tzset)
+        self.addCleanup(tz.stop)
+        store = calendar_cache.set_store_path(os.path.join(tempfile.mkdtemp(), "calendar_events.db"))
+        events = []
+        for event_id, start, end in (("today", "2025-03-12", "2025-03-13"), ("next_monday", "2025-03-17", "2025-03-18")):
+            event = {"id": event_id, "summary": event_id, "start": start, "end": end, "calendar_id": "primary"}
+            events.append((event, calendar_sync._parse_time(start).timestamp(), calendar_sync._parse_time(end).timestamp()))
+        chores = calendar_sync.format_master({
+            "id": "chores", "start": {"date": "2025-03-12"}, "end": {"date": "2025-03-13"},
+            "recurrence": ["RRULE:FREQ=DAILY;COUNT=10"]})
+        store.apply("primary", events, masters=[chores])
+
+    def _ids(self, view, now):
+        return [e["id"] for e in calendar_sync.events_in_window(*calendar_widget.view_window(view, now))]
+
+    def test_all_day_event_stays_in_rolling_view_all_evening(self):
+        evening = datetime(2025, 3, 12, 19, 30).astimezone()  # 00:30 UTC the next day
+
+        self.assertEqual(self._ids("rolling", evening)[:2], ["today", "chores_20250312"])
+
+    def test_week_view_ends_at_local_midnight(self):
+        ids = self._ids("1W", datetime(2025, 3, 12, 12, 0).astimezone())
+
+        self.assertNotIn("next_monday", ids)
+        self.assertNotIn("chores_20250317", ids)
+        self.assertIn("chores_20250316", ids)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT_DIR / "backend"), str(ROOT_DIR)]
+for var in ("TZ", "FLASK_ENV", "CITY"):
+    os.environ.setdefault(var, "test")
+
+import dashboard
+from shared_cache import set_cache_path
+
+PROFILE = {
+    "clock":    {"enabled": True},
+    "calendar": {"enabled": True},
+    "weather":  {"enabled": True},
+    "photos":   {"enabled": False},
+}
+
+
+class DashboardTest(unittest.TestCase):
+
+    def setUp(self):
+        set_cache_path(Path(tempfile.mkdtemp()) / "shared_cache.db")
+        inflight = patch.object(dashboard, "_inflight", {})
+        inflight.start()
+        self.addCleanup(inflight.stop)
+
+    @patch("dashboard.get_profile", return_value=PROFILE)
+    def test_only_enabled_providers_run_concurrently(self, mock_get_profile):
+        calls = []
+
+        def slow(name):
+            def provider(profile, settings):
+                calls.append(name)
+                time.sleep(0.2)
+                return {"name": name}
+            return provider
+
+        providers = {"calendar": slow("calendar"), "weather": slow("weather"), "photos": slow("photos")}
+        with patch.dict(dashboard.PROVIDERS, providers):
+            started = time.monotonic()
+            result = dashboard.build_dashboard("kitchen")
+            elapsed = time.monotonic() - started
+
+        self.assertLess(elapsed, 0.35)  # Bounded by the slowest provider, not the sum
+        self.assertEqual(sorted(calls), ["calendar", "weather"])
+        self.assertEqual(result["widgets"]["calendar"], {"ok": True, "data": {"name": "calendar"}})
+        self.assertNotIn("photos", result["widgets"])
+        self.assertEqual(result["settings"], PROFILE)
+
+    @patch("dashboard.get_profile", return_value=PROFILE)
+    def test_kiosk_calendar_view_override(self, mock_get_profile):
+        with patch("dashboard.get_cached_events", side_effect=lambda profile, view: {"view": view}), \
+                patch.dict(dashboard.PROVIDERS, {"weather": lambda profile, settings: {}}):
+            overridden = dashboard.build_dashboard("kitchen", "1M")
+            default = dashboard.build_dashboard("kitchen")
+
+        self.assertEqual(overridden["widgets"]["calendar"]["data"], {"view": "1M"})
+        self.assertEqual(default["widgets"]["calendar"]["data"], {"view": None})
+        self.assertEqual(overridden["settings"], PROFILE)
+
+    @patch("dashboard.get_profile", return_value=PROFILE)
+    def test_failures_and_timeouts_reported_per_widget(self, mock_get_profile):
+        def hang(profile, settings):
+            time.sleep(0.5)
+
+        def fail(profile, settings):
+            raise RuntimeError("upstream down")
+
+        with patch.dict(dashboard.PROVIDERS, {"calendar": hang, "weather": fail}), \
+                patch.dict(dashboard.PROVIDER_DEADLINES, {"calendar": 0.05}):
+            result = dashboard.build_dashboard("kitchen")
+
+        self.assertEqual(result["widgets"]["calendar"], {"ok": False, "error": "timeout"})
+        self.assertEqual(result["widgets"]["weather"], {"ok": False, "error": "upstream down"})
+
+    @patch("dashboard.get_profile", return_value=PROFILE)
+    def test_hung_provider_is_joined_not_restarted(self, mock_get_profile):
+        calls = []
+        release = threading.Event()
+
+        def hang(profile, settings):
+            calls.append("calendar")
+            release.wait(2)
+            return {"events": []}
+
+        def weather(profile, settings):
+            calls.append("weather")
+            return {"temperature": 20}
+
+        self.addCleanup(release.set)
+        with patch.dict(dashboard.PROVIDERS, {"calendar": hang, "weather": weather}), \
+                patch.dict(dashboard.PROVIDER_DEADLINES, {"calendar": 0.05}):
+            results = [dashboard.build_dashboard("kitchen") for _ in range(6)]
+            release.set()
+            time.sleep(0.05)
+            recovered = dashboard.build_dashboard("kitchen")
+
+        self.assertEqual(calls.count("calendar"), 2)  # One hung call, then a fresh one once it returned
+        self.assertEqual(calls.count("weather"), 7)
+        self.assertTrue(all(r["widgets"]["weather"]["ok"] for r in results))
+        self.assertEqual(recovered["widgets"]["calendar"], {"ok": True, "data": {"events": []}})
+
+
+if __name__ == '__main__':
+    unittest.main()
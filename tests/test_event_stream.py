@@ -0,0 +1,89 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from flask import Flask
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR / "backend"))
+for var in ("TZ", "FLASK_ENV", "CITY"):
+    os.environ.setdefault(var, "test")
+
+import event_stream
+from event_stream import EventBus
+from shared_cache import set_cache_path
+
+
+class EventBusTest(unittest.TestCase):
+
+    def test_wait_returns_new_events(self):
+        bus = EventBus()
+        start = bus.resume_point(None)
+        bus.publish("weather", {"temperature": 20})
+
+        events = bus.wait_for_events(start, timeout=0.1)
+
+        self.assertEqual([(e[1], e[2]) for e in events], [("weather", {"temperature": 20})])
+
+    def test_wait_times_out_without_events(self):
+        bus = EventBus()
+        self.assertEqual(bus.wait_for_events(bus.resume_point(None), timeout=0.01), [])
+
+    def test_resume_point(self):
+        bus = EventBus(history_size=2)
+        first = bus.publish("a", {})
+        second = bus.publish("b", {})
+        bus.publish("c", {})
+        fourth = bus.publish("d", {})
+
+        self.assertEqual(bus.resume_point(fourth), 4)
+        self.assertEqual(bus.resume_point(second), 2)  # c and d still in the history
+        self.assertIsNone(bus.resume_point(first))  # b fell out of the history
+        self.assertIsNone(bus.resume_point("0-1"))  # Id from an earlier process
+
+    def test_workers_started_together_do_not_share_event_ids(self):
+        worker, other_worker = EventBus(), EventBus()
+        other_worker.publish("a", {})
+        resumed_elsewhere = other_worker.publish("b", {})
+        worker.publish("a", {})
+        worker.publish("b", {})
+        worker.publish("c", {})
+
+        self.assertNotEqual(worker.boot_id, other_worker.boot_id)
+        self.assertIsNone(worker.resume_point(resumed_elsewhere))
+
+
+class StreamRouteTest(unittest.TestCase):
+
+    def setUp(self):
+        set_cache_path(Path(tempfile.mkdtemp()) / "shared_cache.db")
+        app = Flask(__name__)
+        app.register_blueprint(event_stream.stream_api)
+        self.client = app.test_client()
+
+    def test_missed_events_replayed_and_filtered_by_profile(self):
+        last_id = event_stream.publish("calendar", {"events": []})
+        event_stream.publish("photo", {"profile": "living_room", "image_url": "/x"})
+        event_stream.publish("photo", {"profile": "kitchen", "image_url": "/y"})
+
+        response = self.client.get("/api/stream?profile=kitchen", headers={"Last-Event-ID": last_id})
+        chunks = iter(response.response)
+        body = next(chunks).decode() + next(chunks).decode()
+        response.close()
+
+        self.assertEqual(response.mimetype, "text/event-stream")
+        self.assertIn('"image_url": "/y"', body)
+        self.assertNotIn('"/x"', body)
+
+    def test_publish_is_shared_with_other_workers(self):
+        cache = set_cache_path(Path(tempfile.mkdtemp()) / "shared_cache.db")
+        event_stream.publish("weather", {"temperature": 20})
+
+        self.assertEqual(cache.last_event_seq(), 1)
+        self.assertEqual(cache.events_since(0), [])  # Own events are not relayed back
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import sys
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from google.auth.credentials import AnonymousCredentials
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from utils import google_utils
+
+
+def _fake_creds(expires_in):
+    creds = MagicMock()
+    creds.token = "token"
+    creds.refresh_token = "refresh"
+    creds.expiry = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(seconds=expires_in)
+    return creds
+
+
+def _run_concurrently(fn, count=8):
+    threads = [threading.Thread(target=fn) for _ in range(count)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+class GoogleRegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        for name in ("_credentials", "_services", "_key_locks"):
+            p = patch.object(google_utils, name, {})
+            p.start()
+            self.addCleanup(p.stop)
+        p = patch.object(google_utils, "_start_refresher")
+        p.start()
+        self.addCleanup(p.stop)
+
+    @patch("utils.google_utils.build")
+    @patch("utils.google_utils.load_google_creds")
+    def test_service_built_once_under_concurrency(self, mock_load, mock_build):
+        mock_load.return_value = _fake_creds(3600)
+        mock_build.side_effect = lambda *a, **kw: time.sleep(0.05) or MagicMock()
+
+        _run_concurrently(lambda: google_utils.build_google_service("calendar", "v3", [], "token.json"))
+
+        mock_load.assert_called_once()
+        mock_build.assert_called_once()
+        self.assertTrue(mock_build.call_args.kwargs["static_discovery"])
+
+    @patch("utils.google_utils._refresh_credentials")
+    @patch("utils.google_utils.load_google_creds")
+    def test_expiring_token_refreshed_once(self, mock_load, mock_refresh):
+        creds = _fake_creds(60)  # Inside the refresh-ahead window
+        mock_load.return_value = creds
+
+        def refresh(token_filename, c):
+            time.sleep(0.05)
+            c.expiry = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(hours=1)
+        mock_refresh.side_effect = refresh
+
+        google_utils.get_google_credentials("token.json", [])
+        creds.expiry = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(seconds=60)
+        _run_concurrently(lambda: google_utils.get_google_credentials("token.json", []))
+
+        mock_refresh.assert_called_once()
+
+    @patch("utils.google_utils.load_google_creds")
+    def test_root_url_override_moves_batch_endpoint(self, mock_load):
+        mock_load.return_value = AnonymousCredentials()
+        with patch.object(google_utils, "GOOGLE_API_ROOT_URL", "http://127.0.0.1:8099"):
+            service = google_utils.build_google_service("calendar", "v3", [], "token.json")
+
+        self.assertEqual(service.new_batch_http_request()._batch_uri, "http://127.0.0.1:8099/batch/calendar/v3")
+        self.assertTrue(service.events().list(calendarId="primary").uri.startswith("http://127.0.0.1:8099/calendar/v3/"))
+
+
+if __name__ == '__main__':
+    unittest.main()
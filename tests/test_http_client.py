@@ -0,0 +1,72 @@
+import gzip
+import os
+import sys
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT_DIR / "backend"), str(ROOT_DIR)]
+for var in ("TZ", "FLASK_ENV", "CITY"):
+    os.environ.setdefault(var, "test")
+
+from utils import http_client
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b"x" * 200_000
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            encoding = "gzip"
+        else:
+            encoding = "identity"
+        self.send_response(200)
+        self.send_header("Content-Encoding", encoding)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class HttpClientTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}/photo.jpg"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_connections_are_reused_across_threads(self):
+        before = http_client.connection_stats().get("127.0.0.1", {"requests": 0, "connections": 0})
+        for _ in range(3):
+            self.assertEqual(http_client.get(self.url, timeout=5).status_code, 200)
+        worker = threading.Thread(target=http_client.get, args=(self.url,), kwargs={"timeout": 5})
+        worker.start()
+        worker.join()
+
+        stats = http_client.connection_stats()["127.0.0.1"]
+        self.assertEqual(stats["requests"] - before["requests"], 4)
+        self.assertEqual(stats["connections"] - before["connections"], 1)
+
+    def test_download_streams_decompressed_body(self):
+        file = BytesIO()
+
+        http_client.download(self.url, file, timeout=5)
+
+        self.assertEqual(file.getvalue(), b"x" * 200_000)
+
+
+if __name__ == '__main__':
+    unittest.main()
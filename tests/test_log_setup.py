@@ -0,0 +1,122 @@
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from flask import Flask
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT_DIR / "backend"), str(ROOT_DIR)]
+for var in ("TZ", "FLASK_ENV", "CITY"):
+    os.environ.setdefault(var, "test")
+
+import log_setup
+import monitoring
+from config import log_error
+from shared_cache import SharedCache
+
+
+class LogSetupTest(unittest.TestCase):
+
+    def setUp(self):
+        self.log_dir = tempfile.mkdtemp()
+        self.cache_path = Path(tempfile.mkdtemp(), "shared_cache.db")
+        patches = [
+            patch.object(log_setup, "recent_errors", log_setup.RecentErrors(capacity=3, cache=SharedCache(self.cache_path))),
+            patch.object(log_setup, "is_leader", return_value=True),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.addCleanup(log_setup.shutdown_logging)
+
+    def _error_log(self):
+        return Path(self.log_dir, "error.log").read_text()
+
+    def test_errors_written_by_background_thread(self):
+        log_setup.setup_logging(self.log_dir)
+        writer_threads = []
+        original_emit = log_setup.LeaderRotatingFileHandler.emit
+
+        def emit(handler, record):
+            writer_threads.append(threading.current_thread())
+            original_emit(handler, record)
+
+        with patch.object(log_setup.LeaderRotatingFileHandler, "emit", emit):
+            log_error("Calendar refresh failed: offline")
+            logging.getLogger("weather").info("not an error")
+            log_setup.shutdown_logging()  # Drains the queue
+
+        self.assertRegex(self._error_log(), r"^\[\d{4}-\d\d-\d\d \d\d:\d\d:\d\d\] \[ERROR\] Calendar refresh failed: offline\n$")
+        self.assertEqual(len(writer_threads), 1)
+        self.assertIsNot(writer_threads[0], threading.current_thread())
+
+    def test_error_log_rotates_by_size(self):
+        log_setup.setup_logging(self.log_dir, max_bytes=200, backup_count=2)
+        for n in range(20):
+            log_error(f"failure number {n}")
+        log_setup.shutdown_logging()
+
+        files = sorted(os.listdir(self.log_dir))
+        self.assertEqual(files, ["error.log", "error.log.1", "error.log.2"])
+        self.assertIn("failure number 19", self._error_log())
+        self.assertTrue(all(os.path.getsize(Path(self.log_dir, f)) <= 200 for f in files))
+
+    def test_errors_are_written_in_batches(self):
+        with patch.object(log_setup, "LOG_FLUSH_INTERVAL", 60):
+            log_setup.setup_logging(self.log_dir)
+            log_error("first failure")
+            log_error("second failure")
+            time.sleep(0.1)
+
+            self.assertFalse(Path(self.log_dir, "error.log").exists())
+            self.assertEqual(log_setup.recent_errors._cache().recent_errors(10), [])
+            self.assertEqual([e["message"] for e in log_setup.recent_errors.recent()], ["first failure", "second failure"])
+            log_setup.shutdown_logging()
+
+        self.assertEqual(self._error_log().count("failure"), 2)
+        self.assertEqual(len(log_setup.recent_errors._cache().recent_errors(10)), 2)
+
+    def test_only_the_leader_rotates(self):
+        log_setup.setup_logging(self.log_dir, max_bytes=200, backup_count=2)
+        with patch.object(log_setup, "is_leader", return_value=False):
+            for n in range(20):
+                log_error(f"failure number {n}")
+            log_setup.shutdown_logging()
+
+        self.assertEqual(sorted(f for f in os.listdir(self.log_dir) if f.startswith("error.log")), ["error.log"])
+        self.assertEqual(self._error_log().count("failure number"), 20)
+
+    def test_recent_errors_endpoint_keeps_last_records(self):
+        log_setup.setup_logging(self.log_dir)
+        for n in range(5):
+            log_error(f"failure number {n}")
+        logging.getLogger("weather").warning("only a warning")
+        log_setup.shutdown_logging()  # The listener thread stores them
+
+        app = Flask(__name__)
+        app.register_blueprint(monitoring.monitoring_api)
+        with patch.object(monitoring, "recent_errors", log_setup.recent_errors):
+            errors = app.test_client().get("/api/logs/errors?limit=2").get_json()["errors"]
+
+        self.assertEqual([e["message"] for e in errors], ["failure number 3", "failure number 4"])
+        self.assertEqual(errors[0]["logger"], "dashboard")
+
+    def test_recent_errors_are_shared_between_workers(self):
+        workers = [log_setup.RecentErrors(capacity=3, cache=SharedCache(self.cache_path)) for _ in range(2)]
+        for n, worker in enumerate(workers):
+            worker.handle(logging.makeLogRecord({"name": "dashboard", "levelno": logging.ERROR,
+                                                 "levelname": "ERROR", "msg": f"worker {n} failed"}))
+            worker.flush()
+
+        for worker in workers:
+            self.assertEqual([e["message"] for e in worker.recent()], ["worker 0 failed", "worker 1 failed"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import sys
+import time
+import unittest
+from pathlib import Path
+
+from flask import Flask
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT_DIR / "backend"), str(ROOT_DIR)]
+for var in ("TZ", "FLASK_ENV", "CITY"):
+    os.environ.setdefault(var, "test")
+
+import monitoring
+from utils import metrics
+
+
+class MetricsTest(unittest.TestCase):
+
+    def test_histogram_renders_cumulative_buckets(self):
+        histogram = metrics.Histogram("test_latency_seconds", "Test.", ("route",), buckets=(0.1, 1))
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.observe(value, "/a")
+
+        text = histogram.render()
+        self.assertIn('test_latency_seconds_bucket{route="/a",le="0.1"} 2', text)
+        self.assertIn('test_latency_seconds_bucket{route="/a",le="1.0"} 3', text)
+        self.assertIn('test_latency_seconds_bucket{route="/a",le="+Inf"} 4', text)
+        self.assertIn('test_latency_seconds_count{route="/a"} 4', text)
+        self.assertIn('test_latency_seconds_sum{route="/a"} 3.65', text)
+
+    def test_upstream_call_counts_errors_and_reraises(self):
+        errors = metrics.UPSTREAM_ERRORS.value("test_provider")
+        with self.assertRaises(TimeoutError):
+            with metrics.upstream_call("test_provider"):
+                raise TimeoutError()
+        with metrics.upstream_call("test_provider"):
+            pass
+
+        self.assertEqual(metrics.UPSTREAM_ERRORS.value("test_provider"), errors + 1)
+        self.assertEqual(metrics.UPSTREAM_LATENCY.count("test_provider"), 2)
+
+    def test_hit_ratio_and_snapshot_age(self):
+        for result in ("hit", "hit", "hit", "miss"):
+            metrics.cache_lookup("test_cache", result)
+        metrics.register_snapshot("test_widget", lambda: time.time() - 120)
+        metrics.register_snapshot("test_broken", lambda: 1 / 0)
+
+        text = metrics.render()
+        self.assertIn('dashboard_cache_hit_ratio{cache="test_cache"} 0.75', text)
+        age = [line for line in text.splitlines() if line.startswith('dashboard_snapshot_age_seconds{widget="test_widget"}')]
+        self.assertAlmostEqual(float(age[0].split()[1]), 120, delta=5)
+        self.assertNotIn("test_broken", text)
+
+    def test_metrics_endpoint_times_routes_by_template(self):
+        app = Flask(__name__)
+        app.register_blueprint(monitoring.monitoring_api)
+        app.add_url_rule("/api/photo/<key>", "photo", lambda key: key)
+        client = app.test_client()
+
+        client.get("/api/photo/one")
+        client.get("/api/photo/two")
+        response = client.get("/metrics")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.mimetype.startswith("text/plain"))
+        text = response.get_data(as_text=True)
+        self.assertIn('dashboard_requests_total{route="/api/photo/<key>",method="GET",status="200"} 2', text)
+        self.assertIn('dashboard_request_duration_seconds_count{route="/api/photo/<key>",method="GET"} 2', text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from cryptography.fernet import Fernet
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from auth import onedrive_credentials
+
+
+class OneDriveTokenManagerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.msal_app = MagicMock()
+        self.msal_app.acquire_token_for_client.side_effect = self._acquire
+        self.issued = 0
+        patches = [
+            patch.object(onedrive_credentials, "TOKEN_PATH", Path(tempfile.mkdtemp()) / "onedrive_token.json"),
+            patch.object(onedrive_credentials, "ENCRYPTION_KEY", Fernet.generate_key().decode()),
+            patch.object(onedrive_credentials, "_token", None),
+            patch.object(onedrive_credentials, "_refresh_in_progress", False),
+            patch.object(onedrive_credentials, "_get_msal_app", return_value=self.msal_app),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def _acquire(self, scopes):
+        time.sleep(0.05)
+        self.issued += 1
+        return {"access_token": f"token-{self.issued}", "expires_in": 3600}
+
+    def test_token_served_from_memory(self):
+        self.assertEqual(onedrive_credentials.get_onedrive_token(), "token-1")
+        with patch.object(onedrive_credentials, "_decrypt_token") as mock_decrypt:
+            self.assertEqual(onedrive_credentials.get_onedrive_token(), "token-1")
+            mock_decrypt.assert_not_called()
+        self.msal_app.acquire_token_for_client.assert_called_once()
+
+    def test_expired_token_refreshed_once_under_concurrency(self):
+        onedrive_credentials._token = {"access_token": "old", "expires_at": time.time() - 10}
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(onedrive_credentials.get_onedrive_token()))
+                   for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(set(results), {"token-1"})
+        self.msal_app.acquire_token_for_client.assert_called_once()
+
+    def test_token_near_expiry_refreshed_in_background(self):
+        onedrive_credentials._token = {"access_token": "current", "expires_at": time.time() + 120}
+
+        self.assertEqual(onedrive_credentials.get_onedrive_token(), "current")
+
+        deadline = time.time() + 2
+        while onedrive_credentials._token["access_token"] == "current" and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(onedrive_credentials.get_onedrive_token(), "token-1")
+
+    def test_persisted_token_reused_after_restart(self):
+        onedrive_credentials.get_onedrive_token()
+        onedrive_credentials._token = None  # Simulate a fresh process
+
+        self.assertEqual(onedrive_credentials.get_onedrive_token(), "token-1")
+        self.msal_app.acquire_token_for_client.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
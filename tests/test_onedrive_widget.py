@@ -1,49 +1,98 @@
-import os
-import requests
+import sys
+import tempfile
+import time
 import unittest
 from unittest.mock import patch, MagicMock
 import json
 from pathlib import Path
-from backend import onedrive_widget
-from onedrive_widget.py import fetch_onedrive_images, get_next_image, CACHE_PATH
-from auth.credentials import load_onedrive_credentials
-from config import LOG_PATH, log_error
+from flask import Flask
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT_DIR / "backend"), str(ROOT_DIR)]
+
+import onedrive_index
+import onedrive_widget
+from onedrive_widget import fetch_onedrive_images, get_next_image
+from shared_cache import set_cache_path
+
+
+def _graph_item(item_id, name, **extra):
+    return {"id": item_id, "name": name, "cTag": f"c-{item_id}",
+            "file": {"mimeType": "image/jpeg", "hashes": {"quickXorHash": "test_hash"}},
+            "@microsoft.graph.downloadUrl": f"http://example.com/{name}", **extra}
+
 
 class OneDriveWidgetTest(unittest.TestCase):
 
+    def setUp(self):
+        set_cache_path(Path(tempfile.mkdtemp()) / "shared_cache.db")
+        patches = [
+            patch.object(onedrive_widget, "is_leader", return_value=True),
+            patch.object(onedrive_index, "INDEX_PATH", Path(tempfile.mkdtemp()) / "image_index.json"),
+            patch.object(onedrive_index, "_index", None),
+            patch.object(onedrive_widget, "_images", None),
+            patch.object(onedrive_widget, "_images_version", None),
+            patch.object(onedrive_widget, "_queues", {}),
+            patch.object(onedrive_widget, "discard"),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.app_context = Flask(__name__).app_context()
+        self.app_context.push()
+        self.addCleanup(self.app_context.pop)
+
     @patch("onedrive_widget.get_onedrive_token")
-    @patch("requests.get")
+    @patch("onedrive_index.http_client.get")
     def test_fetch_onedrive_images_success(self, mock_get, mock_get_onedrive_token):
         # Mock the token retrieval
         mock_get_onedrive_token.return_value = "test_token"
 
-        # Mock the API response
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {
-            "value": [
-                {"name": "image1.jpg", "file": {"mimeType": "image/jpeg", "hashes": {"quickXorHash": "test_hash"}}, "@microsoft.graph.downloadUrl": "http://example.com/image1.jpg"},
-                {"name": "image2.png", "file": {"mimeType": "image/png", "hashes": {"quickXorHash": "test_hash"}}, "@microsoft.graph.downloadUrl": "http://example.com/image2.png"},
-            ]
+        # Two pages: Graph paginates with @odata.nextLink and ends with a deltaLink
+        first_page = MagicMock(status_code=200)
+        first_page.json.return_value = {
+            "value": [_graph_item("1", "image1.jpg"), {"id": "folder", "name": "sub", "folder": {}}],
+            "@odata.nextLink": "http://graph/page2",
         }
-        mock_get.return_value = mock_response
+        second_page = MagicMock(status_code=200)
+        second_page.json.return_value = {
+            "value": [_graph_item("2", "image2.png")],
+            "@odata.deltaLink": "http://graph/delta?token=abc",
+        }
+        mock_get.side_effect = [first_page, second_page]
 
         # Call the function
-        image_links = fetch_onedrive_images()
+        images = fetch_onedrive_images()
 
         # Assertions
-        self.assertEqual(len(image_links), 2)
-        self.assertIn("http://example.com/image1.jpg", image_links)
-        self.assertIn("http://example.com/image2.png", image_links)
+        self.assertEqual(sorted(r["id"] for r in images), ["1", "2"])
+        self.assertEqual(images[0]["hash"], "test_hash")
         mock_get_onedrive_token.assert_called_once()
-        mock_get.assert_called_once()
+        self.assertEqual(mock_get.call_count, 2)
+        index = json.loads(onedrive_index.INDEX_PATH.read_text())
+        self.assertEqual(index["delta_link"], "http://graph/delta?token=abc")
 
-        # Clean up the cache file
-        if CACHE_PATH.exists():
-            CACHE_PATH.unlink()
+    @patch("onedrive_widget.get_onedrive_token")
+    @patch("onedrive_index.http_client.get")
+    def test_delta_refresh_applies_deletions(self, mock_get, mock_get_onedrive_token):
+        mock_get_onedrive_token.return_value = "test_token"
+        full = MagicMock(status_code=200)
+        full.json.return_value = {"value": [_graph_item("1", "a.jpg"), _graph_item("2", "b.jpg")],
+                                  "@odata.deltaLink": "http://graph/delta?token=1"}
+        delta = MagicMock(status_code=200)
+        delta.json.return_value = {"value": [{"id": "1", "deleted": {}}],
+                                   "@odata.deltaLink": "http://graph/delta?token=2"}
+        mock_get.side_effect = [full, delta]
+
+        fetch_onedrive_images()
+        images = fetch_onedrive_images()
+
+        self.assertEqual([r["id"] for r in images], ["2"])
+        self.assertEqual(mock_get.call_args.args[0], "http://graph/delta?token=1")
+        onedrive_widget.discard.assert_called_once_with("1")
 
     @patch("onedrive_widget.get_onedrive_token")
-    @patch("requests.get")
+    @patch("onedrive_index.http_client.get")
     def test_fetch_onedrive_images_api_failure(self, mock_get, mock_get_onedrive_token):
         # Mock the token retrieval
         mock_get_onedrive_token.return_value = "test_token"
@@ -61,29 +110,99 @@ class OneDriveWidgetTest(unittest.TestCase):
         self.assertEqual(len(image_links), 0)
         mock_get_onedrive_token.assert_called_once()
         mock_get.assert_called_once()
+        self.assertFalse(onedrive_index.INDEX_PATH.exists())
+
+    @patch("onedrive_index.http_client.post")
+    def test_download_urls_refreshed_in_batches(self, mock_post):
+        def batch_response(url, headers, json, timeout):
+            response = MagicMock(status_code=200)
+            response.json.return_value = {"responses": [
+                {"id": r["id"], "status": 200,
+                 "body": {"@microsoft.graph.downloadUrl": f"http://fresh/{r['url'].split('/')[4].split('?')[0]}"}}
+                for r in json["requests"]
+            ]}
+            return response
+        mock_post.side_effect = batch_response
+
+        resolved = onedrive_index.refresh_download_urls("test_token", [str(n) for n in range(25)])
+
+        self.assertEqual(mock_post.call_count, 2)  # 20 + 5
+        self.assertEqual(len(resolved), 25)
+        self.assertEqual(resolved["24"], "http://fresh/24")
+
+    @patch("onedrive_widget.get_onedrive_token")
+    @patch("onedrive_widget.refresh_download_urls")
+    def test_stale_download_url_resolved_lazily(self, mock_refresh, mock_get_onedrive_token):
+        mock_refresh.return_value = {"1": "http://fresh/1"}
+        onedrive_widget._set_images([
+            {"id": "1", "download_url": "http://old/1", "url_fetched_at": 0},
+            {"id": "2", "download_url": "http://new/2", "url_fetched_at": time.time()},
+        ])
 
-        # Clean up the cache file
-        if CACHE_PATH.exists():
-            CACHE_PATH.unlink()
+        self.assertEqual(onedrive_widget.resolve_download_url("2", "kitchen"), "http://new/2")
+        mock_refresh.assert_not_called()
+        self.assertEqual(onedrive_widget.resolve_download_url("1", "kitchen"), "http://fresh/1")
+        mock_refresh.assert_called_once()
 
+    def test_index_written_by_leader_is_picked_up(self):
+        self.assertEqual(onedrive_index.load_index_records("Photos"), [])
+
+        # Written the way another worker would, without touching this process's memory
+        onedrive_index.INDEX_PATH.write_text(json.dumps(
+            {"folder": "Photos", "delta_link": None, "items": {"1": {"id": "1"}}}))
+
+        self.assertEqual(onedrive_index.load_index_records("Photos"), [{"id": "1"}])
+
+    @patch("onedrive_widget.get_onedrive_token")
+    @patch("onedrive_widget.refresh_download_urls")
+    def test_follower_asks_leader_for_stale_urls(self, mock_refresh, mock_get_onedrive_token):
+        onedrive_index.INDEX_PATH.write_text(json.dumps({"folder": onedrive_widget.ONEDRIVE_FOLDER_NAME,
+                                                         "delta_link": "d", "items": {}}))
+        onedrive_widget._set_images([{"id": "1", "download_url": "http://old/1", "url_fetched_at": 0}])
+
+        with patch.object(onedrive_widget, "is_leader", return_value=False), \
+                patch.object(onedrive_widget, "URL_REQUEST_WAIT", 0):
+            with self.assertRaises(TimeoutError):
+                onedrive_widget.resolve_download_url("1", "kitchen")
+        mock_refresh.assert_not_called()
+        mock_get_onedrive_token.assert_not_called()
+
+        mock_refresh.return_value = {"1": "http://fresh/1"}
+        onedrive_widget.resolve_url_requests()
+        mock_refresh.assert_called_once_with(mock_get_onedrive_token.return_value, ["1"])
+        self.assertEqual(onedrive_widget.get_cache().get(onedrive_widget.URL_REQUEST_KEY), [])
+
+    @patch("onedrive_widget.SlideshowQueue._prefetch")
     @patch("onedrive_widget.load_cached_images")
-    def test_get_next_image_success(self, mock_load_cached_images):
+    def test_get_next_image_success(self, mock_load_cached_images, mock_prefetch):
         # Mock the cached images
-        mock_load_cached_images.return_value = ["http://example.com/image1.jpg", "http://example.com/image2.png"]
+        mock_load_cached_images.return_value = [{"id": "1", "download_url": "http://example.com/image1.jpg"},
+                                                {"id": "2", "download_url": "http://example.com/image2.png"}]
 
         # Call the function
-        response, status_code = get_next_image()
+        response, status_code = get_next_image("kitchen")
         data = json.loads(response.data)
 
         # Assertions
         self.assertEqual(status_code, 200)
         self.assertIn("image_url", data)
-        self.assertIn(data["image_url"], ["http://example.com/image1.jpg", "http://example.com/image2.png"])
+        self.assertRegex(data["image_url"], r"^/api/onedrive/photo/[12]\?profile=kitchen&v=[0-9a-f]{10}-\d+x\d+$")
         mock_load_cached_images.assert_called_once()
 
-        # Clean up the cache file
-        if CACHE_PATH.exists():
-            CACHE_PATH.unlink()
+    def test_photo_url_changes_when_photo_or_widget_size_changes(self):
+        images = {"1": {"id": "1", "cTag": "ctag-1"}}
+        size = [800, 480]
+        with patch("onedrive_widget.get_images", return_value=images), \
+                patch("onedrive_widget.photo_size", side_effect=lambda profile: tuple(size)):
+            original = onedrive_widget.photo_url("1", "kitchen")
+            self.assertEqual(onedrive_widget.photo_url("1", "kitchen"), original)
+            images["1"]["cTag"] = "ctag-2"  # Edited in OneDrive
+            edited = onedrive_widget.photo_url("1", "kitchen")
+            size[0] = 1024
+            resized = onedrive_widget.photo_url("1", "kitchen")
+
+        self.assertEqual(len({original, edited, resized}), 3)
+        self.assertTrue(resized.endswith("-1024x480"))
 
     @patch("onedrive_widget.load_cached_images")
     def test_get_next_image_no_images(self, mock_load_cached_images):
@@ -100,9 +219,5 @@ class OneDriveWidgetTest(unittest.TestCase):
         self.assertEqual(data["error"], "No images found")
         mock_load_cached_images.assert_called_once()
 
-        # Clean up the cache file
-        if CACHE_PATH.exists():
-            CACHE_PATH.unlink()
-
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()
@@ -0,0 +1,66 @@
+import random
+import sys
+import threading
+import unittest
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR / "backend"))
+
+from photo_queue import ShuffleBag, SlideshowQueue
+
+
+class ShuffleBagTest(unittest.TestCase):
+
+    def test_every_item_shown_once_per_round(self):
+        items = list(range(10))
+        bag = ShuffleBag(items, rng=random.Random(1))
+
+        for _ in range(5):
+            shown = [bag.next() for _ in items]
+            self.assertEqual(sorted(shown), items)
+
+    def test_no_back_to_back_repeat_across_rounds(self):
+        bag = ShuffleBag(["a", "b"], rng=random.Random(3))
+        shown = [bag.next() for _ in range(50)]
+        self.assertTrue(all(x != y for x, y in zip(shown, shown[1:])))
+
+    def test_peek_matches_next(self):
+        bag = ShuffleBag(list("abcde"), rng=random.Random(7))
+        upcoming = bag.peek(8)
+        self.assertEqual([bag.next() for _ in range(8)], upcoming)
+
+    def test_update_drops_removed_and_adds_new(self):
+        bag = ShuffleBag(["a", "b", "c"], rng=random.Random(0))
+        bag.next()
+        bag.update(["b", "c", "d"])
+        rest = [bag.next() for _ in range(len(bag.peek(3)))]
+        self.assertNotIn("a", rest)
+        self.assertIn("d", rest)
+
+    def test_empty_bag_returns_none(self):
+        self.assertIsNone(ShuffleBag().next())
+
+
+class SlideshowQueueTest(unittest.TestCase):
+
+    def test_next_prefetches_upcoming_photos(self):
+        prepared = []
+        done = threading.Event()
+
+        def prepare(key):
+            prepared.append(key)
+            if len(prepared) == 3:
+                done.set()
+
+        queue = SlideshowQueue(prepare, prefetch_count=2)
+        queue.update(["a", "b", "c", "d"])
+        key = queue.next()
+
+        self.assertTrue(done.wait(2))
+        self.assertIn(key, prepared)
+        self.assertEqual(len(set(prepared)), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
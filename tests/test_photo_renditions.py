@@ -0,0 +1,96 @@
+import io
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from PIL import Image
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR / "backend"))
+
+import photo_renditions
+
+
+def _jpeg_bytes(width, height, orientation=None, marker=None):
+    buffer = io.BytesIO()
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    img = Image.new("RGB", (width, height), "red")
+    if marker:
+        img.paste("blue", marker)
+    img.save(buffer, "JPEG", exif=exif)
+    return buffer.getvalue()
+
+
+def _download_response(data):
+    response = MagicMock()
+    response.__enter__.return_value = response
+    response.iter_content.return_value = [data]
+    return response
+
+
+class PhotoRenditionTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp_dir = Path(tempfile.mkdtemp())
+        for name, path in (("ORIGINALS_DIR", tmp_dir / "originals"), ("RENDITIONS_DIR", tmp_dir / "renditions")):
+            p = patch.object(photo_renditions, name, path)
+            p.start()
+            self.addCleanup(p.stop)
+
+    @patch("photo_renditions.http_client.get")
+    def test_rendition_is_sized_and_cached(self, mock_get):
+        mock_get.return_value = _download_response(_jpeg_bytes(1600, 1200))
+
+        first = photo_renditions.get_rendition("abc", "http://example.com/a.jpg", 500, 500, "webp")
+        second = photo_renditions.get_rendition("abc", "http://example.com/a.jpg", 500, 500, "webp")
+
+        self.assertEqual(first, second)
+        mock_get.assert_called_once()
+        with Image.open(first) as img:
+            self.assertEqual(img.format, "WEBP")
+            self.assertEqual(img.size, (500, 500))
+
+    @patch("photo_renditions.http_client.get")
+    def test_exif_orientation_is_applied(self, mock_get):
+        # Orientation 6 means the camera stored a portrait photo rotated 90° counter-clockwise,
+        # so the stored top-left corner belongs at the top right once displayed
+        mock_get.return_value = _download_response(_jpeg_bytes(400, 200, orientation=6, marker=(0, 0, 80, 80)))
+
+        path = photo_renditions.get_rendition("rot", "http://example.com/r.jpg", 100, 200, "jpeg")
+
+        with Image.open(path) as img:
+            self.assertEqual(img.size, (100, 200))
+            self.assertNotIn(0x0112, img.getexif())
+            top_right, top_left = img.getpixel((90, 10)), img.getpixel((10, 10))
+        self.assertGreater(top_right[2], 200)
+        self.assertLess(top_right[0], 60)
+        self.assertGreater(top_left[0], 200)
+        self.assertLess(top_left[2], 60)
+
+    @patch("photo_renditions.http_client.get")
+    def test_renditions_of_one_photo_do_not_share_a_temp_file(self, mock_get):
+        mock_get.return_value = _download_response(_jpeg_bytes(400, 200))
+        saved = []
+        real_save = Image.Image.save
+
+        def record_save(img, fp, *args, **kwargs):
+            saved.append(Path(fp).name)
+            return real_save(img, fp, *args, **kwargs)
+
+        with patch.object(Image.Image, "save", record_save):
+            for fmt in ("webp", "jpeg"):
+                photo_renditions.get_rendition("two", "http://example.com/t.jpg", 100, 100, fmt)
+
+        self.assertEqual(len(set(saved)), 2)
+
+    def test_unknown_format_rejected(self):
+        with self.assertRaises(ValueError):
+            photo_renditions.get_rendition("abc", "http://example.com/a.jpg", 10, 10, "gif")
+
+
+if __name__ == '__main__':
+    unittest.main()
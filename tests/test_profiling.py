@@ -0,0 +1,112 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from flask import Flask
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT_DIR / "backend"), str(ROOT_DIR)]
+for var in ("TZ", "FLASK_ENV", "CITY"):
+    os.environ.setdefault(var, "test")
+
+import profiling
+
+
+def slow_provider():
+    time.sleep(0.15)
+    return "slow"
+
+
+class ProfilingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.capture_dir = Path(tempfile.mkdtemp())
+        self.profiler = profiling.RequestProfiler(self.capture_dir, slow_ms=100, sample_ms=5, max_captures=2)
+        app = Flask(__name__)
+        app.register_blueprint(profiling.profiling_api)
+        app.add_url_rule("/slow", "slow", slow_provider)
+        app.add_url_rule("/fast", "fast", lambda: "fast")
+        self.client = app.test_client()
+
+    def _captures(self, count):
+        deadline = time.time() + 2
+        while len(self.profiler.captures()) < count and time.time() < deadline:
+            time.sleep(0.01)
+        return self.profiler.captures()
+
+    def test_disabled_by_default(self):
+        with patch.object(profiling, "profiler", None):
+            self.assertEqual(self.client.get("/fast").data, b"fast")
+            self.assertEqual(self.client.get("/api/admin/profiles").get_json(), {"enabled": False, "captures": []})
+
+    def test_only_slow_requests_are_sampled(self):
+        with patch.object(profiling, "profiler", self.profiler):
+            self.client.get("/fast")
+            self.client.get("/slow")
+            captures = self._captures(1)
+            folded = self.client.get(f"/api/admin/profiles/{captures[0]['id']}?format=folded").get_data(as_text=True)
+
+        self.assertEqual(len(captures), 1)
+        self.assertEqual((captures[0]["route"], captures[0]["reason"]), ("/slow", "slow"))
+        self.assertGreater(captures[0]["samples"], 5)
+        self.assertIn("test_profiling.slow_provider", folded)
+
+    def test_debug_header_profiles_fast_request(self):
+        with patch.object(profiling, "profiler", self.profiler):
+            self.client.get("/fast", headers={profiling.DEBUG_HEADER: "1"})
+            capture = self.profiler.load(self._captures(1)[0]["id"])
+
+        self.assertEqual(capture["reason"], "header")
+        self.assertTrue(capture["functions"])
+
+    def test_concurrent_debug_headers_share_one_cprofile(self):
+        responses = []
+
+        def forced_request():
+            responses.append(self.client.get("/slow", headers={profiling.DEBUG_HEADER: "1"}).status_code)
+
+        with patch.object(profiling, "profiler", self.profiler):
+            threads = [threading.Thread(target=forced_request) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            captures = [self.profiler.load(c["id"]) for c in self._captures(2)]
+
+        self.assertEqual(responses, [200, 200])
+        self.assertEqual([c["reason"] for c in captures], ["header", "header"])
+        self.assertEqual(sorted("functions" in c for c in captures), [False, True])
+
+    def test_debug_header_falls_back_when_another_profiler_is_active(self):
+        class BusyProfile:
+            def enable(self):
+                raise ValueError("Another profiling tool is already active")
+
+        with patch.object(profiling, "profiler", self.profiler), \
+                patch.object(profiling.cProfile, "Profile", BusyProfile):
+            response = self.client.get("/slow", headers={profiling.DEBUG_HEADER: "1"})
+            capture = self.profiler.load(self._captures(1)[0]["id"])
+            self.client.get("/fast", headers={profiling.DEBUG_HEADER: "1"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(capture["reason"], "header")
+        self.assertGreater(capture["samples"], 5)
+        self.assertFalse(self.profiler._cprofile_lock.locked())
+
+    def test_capture_directory_is_bounded(self):
+        with patch.object(profiling, "profiler", self.profiler):
+            for _ in range(4):
+                self.client.get("/fast", headers={profiling.DEBUG_HEADER: "1"})
+                time.sleep(0.02)
+            time.sleep(0.1)
+
+        self.assertEqual(len(list(self.capture_dir.glob("*.json"))), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import sys
+import unittest
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR / "backend"))
+
+from recurrence import expand
+
+
+def _utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+class ExpandTest(unittest.TestCase):
+
+    def test_weekly_series_keeps_wall_clock_across_dst(self):
+        master = {
+            "id": "standup",
+            "summary": "Standup",
+            "start": {"dateTime": "2025-03-03T09:00:00-05:00", "timeZone": "America/New_York"},
+            "end": {"dateTime": "2025-03-03T09:30:00-05:00", "timeZone": "America/New_York"},
+            "recurrence": ["RRULE:FREQ=WEEKLY;BYDAY=MO"],
+        }
+
+        events = [e for _, _, e in expand(master, _utc(2025, 3, 1), _utc(2025, 3, 15))]
+
+        self.assertEqual([e["start"] for e in events],
+                         ["2025-03-03T09:00:00-05:00", "2025-03-10T09:00:00-04:00"])
+        self.assertEqual(events[1]["id"], "standup_20250310T130000Z")
+        self.assertEqual(events[1]["recurring_event_id"], "standup")
+
+    def test_exdate_count_and_exceptions(self):
+        master = {
+            "id": "gym",
+            "start": {"dateTime": "2025-03-03T18:00:00Z"},
+            "end": {"dateTime": "2025-03-03T19:00:00Z"},
+            "recurrence": ["RRULE:FREQ=DAILY;COUNT=5", "EXDATE:20250304T180000Z"],
+        }
+
+        events = expand(master, _utc(2025, 3, 1), _utc(2025, 4, 1), exceptions={"gym_20250306T180000Z"})
+
+        self.assertEqual([e["id"] for _, _, e in events],
+                         ["gym_20250303T180000Z", "gym_20250305T180000Z", "gym_20250307T180000Z"])
+
+    def test_all_day_series_overlapping_window_start(self):
+        master = {
+            "id": "camp",
+            "start": {"date": "2025-03-01"},
+            "end": {"date": "2025-03-03"},
+            "recurrence": ["RRULE:FREQ=WEEKLY"],
+        }
+
+        events = [e for _, _, e in expand(master, _utc(2025, 3, 2, 12), _utc(2025, 3, 9))]
+
+        self.assertEqual([(e["id"], e["start"], e["end"]) for e in events],
+                         [("camp_20250301", "2025-03-01", "2025-03-03"), ("camp_20250308", "2025-03-08", "2025-03-10")])
+
+
+if __name__ == '__main__':
+    unittest.main()
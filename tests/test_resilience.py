@@ -0,0 +1,153 @@
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT_DIR / "backend"), str(ROOT_DIR)]
+for var in ("TZ", "FLASK_ENV", "CITY"):
+    os.environ.setdefault(var, "test")
+
+import onedrive_widget
+import weather
+from shared_cache import set_cache_path
+from utils import resilience
+from utils.resilience import CircuitBreaker, CircuitOpenError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class MaxJitter:
+    """Always picks the longest cool-down, so tests can step past it exactly."""
+
+    def uniform(self, low, high):
+        return high
+
+
+def fail():
+    raise ConnectionError("offline")
+
+
+class CircuitBreakerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker("test", failure_threshold=2, base_cooldown=5, max_cooldown=12,
+                                      clock=self.clock, rng=MaxJitter())
+
+    def trip(self):
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                self.breaker.call(fail)
+
+    def test_opens_after_threshold_and_rejects_without_calling(self):
+        self.trip()
+        calls = []
+
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.call(calls.append, 1)
+        self.assertEqual(self.breaker.state, "open")
+        self.assertEqual(calls, [])
+
+    def test_single_trial_after_cooldown_closes_on_success(self):
+        self.trip()
+        self.clock.now += 5
+
+        self.assertEqual(self.breaker.state, "half_open")
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())  # Only one trial at a time
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, "closed")
+
+    def test_failed_trials_double_the_cooldown_up_to_the_cap(self):
+        self.trip()
+        for cooldown in (10, 12, 12):
+            self.clock.now += 5
+            with self.assertRaises(ConnectionError):
+                self.breaker.call(fail)
+            self.clock.now += cooldown - 0.1
+            self.assertTrue(self.breaker.is_open())
+            self.clock.now += 0.1
+            self.assertFalse(self.breaker.is_open())
+            self.clock.now -= 5
+
+    def test_failing_results_count_as_failures(self):
+        for _ in range(2):
+            self.assertIsNone(self.breaker.call(lambda: None, is_failure=lambda result: result is None))
+
+        self.assertTrue(self.breaker.is_open())
+
+
+class CachedFallbackTest(unittest.TestCase):
+
+    def setUp(self):
+        set_cache_path(Path(tempfile.mkdtemp()) / "shared_cache.db")
+        patches = [
+            patch.dict(resilience._breakers, clear=True),
+            patch.object(weather, "is_leader", return_value=True),
+            patch.object(weather, "log_error"),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.addCleanup(weather.set_provider, None)
+
+    def test_stale_weather_served_at_once_while_provider_is_down(self):
+        stub = Path(tempfile.mkdtemp()) / "weather.json"
+        stub.write_text(json.dumps({"temperature": 21, "condition": "sunny"}))
+        weather.set_provider(weather.FileWeatherProvider(stub))
+        weather.get_weather("Springfield")
+        stub.unlink()
+        for _ in range(resilience.FAILURE_THRESHOLD):
+            weather._refresh("Springfield")
+
+        with patch.object(weather, "WEATHER_TTL", 0), patch.object(weather.threading, "Thread") as thread:
+            started = time.perf_counter()
+            result = weather.get_weather("Springfield")
+
+        self.assertLess(time.perf_counter() - started, 0.5)
+        self.assertEqual(result["temperature"], 21)
+        self.assertTrue(result["stale"])
+        thread.assert_not_called()
+
+    def test_offline_slideshow_skips_photos_that_are_not_on_disk(self):
+        cached = Path(tempfile.mkdtemp()) / "b.jpg"
+        cached.write_bytes(b"jpeg")
+        breaker = resilience.get_breaker("onedrive")
+        for _ in range(resilience.FAILURE_THRESHOLD):
+            breaker.record_failure()
+        patches = [
+            patch.object(onedrive_widget, "_queues", {}),
+            patch.object(onedrive_widget, "get_images", return_value={"a": {}, "b": {}, "c": {}}),
+            patch.object(onedrive_widget, "original_path",
+                         side_effect=lambda key: cached if key == "b" else cached.with_name(f"{key}.jpg")),
+            patch("onedrive_widget.SlideshowQueue._prefetch"),
+        ]
+        mocks = [p.start() for p in patches]
+        for p in patches:
+            self.addCleanup(p.stop)
+        prefetch = mocks[-1]
+        queue = onedrive_widget.get_slideshow("kitchen")
+        upcoming = queue.upcoming(3)
+
+        urls = {onedrive_widget.next_image_url("kitchen") for _ in range(4)}
+
+        self.assertEqual(urls, {onedrive_widget.photo_url("b", "kitchen")})
+        prefetch.assert_not_called()
+        self.assertEqual(queue.upcoming(3), upcoming)
+        with self.assertRaises(CircuitOpenError):
+            onedrive_widget.render_photo("a", "kitchen", "webp")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT_DIR / "backend"), str(ROOT_DIR)]
+for var in ("TZ", "FLASK_ENV", "CITY"):
+    os.environ.setdefault(var, "test")
+
+import leader
+from shared_cache import SharedCache
+
+# Runs in a separate interpreter, standing in for another gunicorn worker
+OTHER_WORKER = """
+import sys
+sys.path[:0] = [{backend!r}, {root!r}]
+import leader, shared_cache
+from pathlib import Path
+leader.LEADER_LOCK_PATH = Path({lock!r})
+cache = shared_cache.SharedCache({db!r})
+cache.put("calendar", {{"events": ["from other worker"]}})
+cache.append_event("weather", {{"temperature": 3}})
+print(leader.try_acquire())
+"""
+
+
+class SharedCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self.cache = SharedCache(self.dir / "shared_cache.db")
+
+    def _run_other_worker(self):
+        script = OTHER_WORKER.format(backend=str(ROOT_DIR / "backend"), root=str(ROOT_DIR),
+                                     lock=str(self.dir / "leader.lock"), db=str(self.dir / "shared_cache.db"))
+        return subprocess.run([sys.executable, "-c", script], capture_output=True, text=True,
+                              env={**os.environ}, check=True).stdout.strip()
+
+    def test_put_bumps_version(self):
+        self.assertIsNone(self.cache.get("weather:Springfield"))
+        self.assertEqual(self.cache.put("weather:Springfield", {"temperature": 20}), 1)
+        self.assertEqual(self.cache.put("weather:Springfield", {"temperature": 21}), 2)
+        entry = self.cache.get_entry("weather:Springfield")
+        self.assertEqual((entry["value"], entry["version"]), ({"temperature": 21}, 2))
+
+    def test_delete_prefix(self):
+        self.cache.put("weather:a", 1)
+        self.cache.put("weather:b", 2)
+        self.cache.put("calendar", 3)
+        self.cache.delete_prefix("weather:")
+        self.assertEqual(self.cache.items("weather:"), [])
+        self.assertEqual(self.cache.get("calendar"), 3)
+
+    def test_update_is_read_modify_write(self):
+        self.cache.put("weather_locations", ["Springfield"])
+
+        value = self.cache.update("weather_locations", lambda locations: locations + ["Shelbyville"])
+
+        self.assertEqual(value, ["Springfield", "Shelbyville"])
+        self.assertEqual(self.cache.update("missing", lambda v: v + [1], default=[]), [1])
+        with self.assertRaises(ZeroDivisionError):
+            self.cache.update("weather_locations", lambda locations: 1 / 0)
+        self.assertEqual(self.cache.get("weather_locations"), ["Springfield", "Shelbyville"])
+
+    def test_errors_table_keeps_the_newest(self):
+        self.cache.append_errors([{"message": f"e{n}"} for n in range(3)], retention=4)
+        self.cache.append_errors([{"message": f"e{n}"} for n in range(3, 6)], retention=4)
+
+        self.assertEqual([e["message"] for e in self.cache.recent_errors(10)], ["e2", "e3", "e4", "e5"])
+        self.assertEqual([e["message"] for e in self.cache.recent_errors(2)], ["e4", "e5"])
+
+    def test_other_process_sees_writes_and_cannot_lead(self):
+        with patch.object(leader, "LEADER_LOCK_PATH", self.dir / "leader.lock"), \
+                patch.object(leader, "_lock_file", None):
+            self.assertTrue(leader.try_acquire())
+            self.addCleanup(leader._lock_file.close)
+            start = self.cache.last_event_seq()
+
+            self.assertEqual(self._run_other_worker(), "False")
+
+        self.assertEqual(self.cache.get("calendar"), {"events": ["from other worker"]})
+        self.assertEqual([(t, d) for _, t, d in self.cache.events_since(start)],
+                         [("weather", {"temperature": 3})])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import sys
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from flask import Flask
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR / "backend"))
+
+import startup
+
+
+class StartupTest(unittest.TestCase):
+
+    def setUp(self):
+        patches = [
+            patch.object(startup, "_ready", startup.threading.Event()),
+            patch.object(startup, "_timings", {}),
+            patch.object(startup, "DEFERRED_IMPORTS", ()),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        app = Flask(__name__)
+        app.register_blueprint(startup.startup_api)
+        self.client = app.test_client()
+
+    def _wait_ready(self):
+        deadline = time.time() + 2
+        while not startup._ready.is_set() and time.time() < deadline:
+            time.sleep(0.01)
+
+    def test_ready_after_snapshots_load_even_if_one_fails(self):
+        self.assertEqual(self.client.get("/api/ready").status_code, 503)
+        loaded = []
+
+        def broken():
+            raise OSError("index missing")
+
+        startup.warm_up({"calendar": lambda: loaded.append("calendar"), "photos": broken})
+        self._wait_ready()
+
+        response = self.client.get("/api/ready")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(loaded, ["calendar"])
+        self.assertIn("warmup_seconds", response.json)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import gzip
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from flask import Flask, url_for
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT_DIR / "backend"), str(ROOT_DIR)]
+for var in ("TZ", "FLASK_ENV", "CITY"):
+    os.environ.setdefault(var, "test")
+
+import static_assets
+
+SCRIPT = b"function tick() { return 'tick'; }\n" * 200
+
+
+class StaticAssetsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.static_dir = Path(tempfile.mkdtemp())
+        (self.static_dir / "js").mkdir()
+        (self.static_dir / "js" / "dashboard.js").write_bytes(SCRIPT)
+        (self.static_dir / "notes.txt").write_text("not an asset")
+        self.dist_dir = self.static_dir / "dist"
+        self.manifest = static_assets.build_assets(self.static_dir, self.dist_dir)
+
+        patches = [
+            patch.object(static_assets, "DIST_DIR", self.dist_dir),
+            patch.object(static_assets, "_manifest", None),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.app = Flask(__name__, static_folder=str(self.static_dir), static_url_path="/static")
+        self.app.register_blueprint(static_assets.static_assets_api)
+
+    def test_build_writes_hashed_files_and_variants(self):
+        hashed = self.manifest["js/dashboard.js"]
+
+        self.assertRegex(hashed, r"^dist/js/dashboard\.[0-9a-f]{12}\.js$")
+        self.assertNotIn("notes.txt", self.manifest)
+        self.assertEqual((self.static_dir / hashed).read_bytes(), SCRIPT)
+        self.assertEqual(gzip.decompress((self.static_dir / f"{hashed}.gz").read_bytes()), SCRIPT)
+        self.assertEqual(self.manifest, static_assets.build_assets(self.static_dir, self.dist_dir))
+
+    def test_url_for_resolves_through_manifest(self):
+        with self.app.test_request_context():
+            self.assertEqual(url_for("static", filename="js/dashboard.js"), f"/static/{self.manifest['js/dashboard.js']}")
+            self.assertEqual(url_for("static", filename="css/other.css"), "/static/css/other.css")
+
+    def test_serves_precompressed_immutable_asset(self):
+        with self.app.test_request_context():
+            url = url_for("static", filename="js/dashboard.js")
+        client = self.app.test_client()
+
+        response = client.get(url, headers={"Accept-Encoding": "gzip, deflate"})
+        plain = client.get(url, headers={"Accept-Encoding": "identity"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.data), SCRIPT)
+        self.assertIn("immutable", response.headers["Cache-Control"])
+        self.assertIn("max-age=31536000", response.headers["Cache-Control"])
+        self.assertIn("Accept-Encoding", response.headers["Vary"])
+        self.assertNotIn("Content-Encoding", plain.headers)
+        self.assertEqual(plain.data, SCRIPT)
+        response.close()
+        plain.close()
+        self.assertEqual(client.get("/static/dist/../js/dashboard.js").status_code, 404)
+
+    def test_missing_vendor_libraries_are_reported(self):
+        vendor_dir = self.static_dir / "vendor"
+        vendor_dir.mkdir()
+        (vendor_dir / "interact.min.js").write_text("/* interact */")
+
+        self.assertEqual(static_assets.missing_vendor_libraries(vendor_dir), ["gridstack.min.js"])
+
+
+if __name__ == '__main__':
+    unittest.main()
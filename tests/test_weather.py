@@ -0,0 +1,106 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT_DIR / "backend"), str(ROOT_DIR)]
+for var in ("TZ", "FLASK_ENV", "CITY"):
+    os.environ.setdefault(var, "test")
+
+import weather
+from shared_cache import set_cache_path
+from weather import FileWeatherProvider, get_weather, set_provider
+
+
+class CountingProvider(FileWeatherProvider):
+    def __init__(self, path):
+        super().__init__(path)
+        self.calls = 0
+
+    def fetch(self, location):
+        self.calls += 1
+        return super().fetch(location)
+
+
+class WeatherCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        set_cache_path(Path(tempfile.mkdtemp()) / "shared_cache.db")
+        leader_patch = patch.object(weather, "is_leader", return_value=True)
+        leader_patch.start()
+        self.addCleanup(leader_patch.stop)
+        self.stub = Path(tempfile.mkdtemp()) / "weather.json"
+        self.stub.write_text(json.dumps({"Springfield": {"temperature": 21, "condition": "sunny"}}))
+        self.provider = CountingProvider(self.stub)
+        set_provider(self.provider)
+        self.addCleanup(set_provider, None)
+        log_patch = patch.object(weather, "log_error")
+        log_patch.start()
+        self.addCleanup(log_patch.stop)
+
+    def test_fresh_reading_served_from_memory(self):
+        first = get_weather("Springfield")
+        second = get_weather("Springfield")
+
+        self.assertEqual(first["temperature"], 21)
+        self.assertFalse(second["stale"])
+        self.assertEqual(self.provider.calls, 1)
+
+    def test_stale_reading_served_while_refreshing(self):
+        get_weather("Springfield")
+        self.stub.write_text(json.dumps({"Springfield": {"temperature": 25, "condition": "hot"}}))
+
+        with patch.object(weather, "WEATHER_TTL", 0):
+            stale = get_weather("Springfield")
+        self.assertEqual(stale["temperature"], 21)
+        self.assertTrue(stale["stale"])
+
+        deadline = time.time() + 2
+        while self.provider.calls < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.05)
+        self.assertEqual(get_weather("Springfield")["temperature"], 25)
+
+    def test_cold_cache_fetches_once_under_concurrency(self):
+        threads = [threading.Thread(target=get_weather, args=("Springfield",)) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(self.provider.calls, 1)
+
+    def test_upstream_failure_returns_error(self):
+        self.assertIn("error", get_weather("Nowhere"))
+
+    def test_failed_cold_fetch_is_not_retried_within_failure_ttl(self):
+        self.assertIn("error", get_weather("Nowhere"))
+        self.assertIn("error", get_weather("Nowhere"))
+        self.assertEqual(self.provider.calls, 1)
+
+        with patch.object(weather, "WEATHER_FAILURE_TTL", 0):
+            self.assertIn("error", get_weather("Nowhere"))
+        self.assertEqual(self.provider.calls, 2)
+
+    def test_provider_must_implement_fetch(self):
+        with self.assertRaises(TypeError):
+            weather.WeatherProvider()
+
+    def test_follower_never_calls_upstream(self):
+        with patch.object(weather, "is_leader", return_value=False):
+            self.assertIn("error", get_weather("Springfield"))
+        self.assertEqual(self.provider.calls, 0)
+
+        weather.refresh_stale_locations()  # what the leader's job does
+        with patch.object(weather, "is_leader", return_value=False):
+            self.assertEqual(get_weather("Springfield")["temperature"], 21)
+        self.assertEqual(self.provider.calls, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
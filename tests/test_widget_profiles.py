@@ -0,0 +1,72 @@
+import json
+import multiprocessing
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR / "backend"))
+
+import widget_profiles
+from widget_profiles import ProfileStore
+
+
+def _save_many(path, worker, count):
+    store = ProfileStore(path)
+    for n in range(count):
+        store.save(f"worker{worker}-{n}", {"clock": {"enabled": True}})
+
+
+class ProfileStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = Path(tempfile.mkdtemp()) / "widget_profiles.json"
+        self.path.write_text(json.dumps({"kitchen": {"clock": {"enabled": True}}}))
+
+    def test_reads_served_from_memory(self):
+        store = ProfileStore(self.path, check_interval=60)
+        self.assertEqual(store.get("kitchen"), {"clock": {"enabled": True}})
+
+        self.path.unlink()  # Would raise if the file were read again
+        self.assertEqual(store.get("kitchen"), {"clock": {"enabled": True}})
+        self.assertEqual(store.get("missing"), {})
+
+    def test_external_edit_invalidates_cache(self):
+        store = ProfileStore(self.path, check_interval=0)
+        store.get("kitchen")
+        self.path.write_text(json.dumps({"kitchen": {"clock": {"enabled": False}, "extra": {}}}))
+
+        self.assertEqual(store.get("kitchen"), {"clock": {"enabled": False}, "extra": {}})
+        self.assertEqual(store.version, 2)
+
+    def test_unknown_profile_falls_back_to_default(self):
+        with patch.object(widget_profiles, "profile_store", ProfileStore(self.path)):
+            self.assertEqual(widget_profiles.get_profile("kitchen"), {"clock": {"enabled": True}})
+            self.assertEqual(widget_profiles.get_profile("default"), widget_profiles.DEFAULT_WIDGETS)
+
+            self.path.write_text(json.dumps({"default": {"weather": {"enabled": True}}}))
+            widget_profiles.profile_store.check_interval = 0
+            self.assertEqual(widget_profiles.get_profile("hallway"), {"weather": {"enabled": True}})
+
+    def test_shipped_default_profile_enables_every_widget(self):
+        shipped = json.loads(widget_profiles.PROFILE_FILE.read_text())
+
+        self.assertTrue(all(widget["enabled"] for widget in shipped["default"].values()))
+
+    def test_concurrent_saves_across_threads_and_processes_keep_every_update(self):
+        processes = [multiprocessing.Process(target=_save_many, args=(self.path, w, 10)) for w in range(3)]
+        threads = [threading.Thread(target=_save_many, args=(self.path, w, 10)) for w in range(3, 6)]
+        for worker in processes + threads:
+            worker.start()
+        for worker in processes + threads:
+            worker.join()
+
+        profiles = json.loads(self.path.read_text())
+        self.assertEqual(len(profiles), 1 + 6 * 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,11 +2,22 @@
 
 import os
 import json
+import functools
+import threading
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
+import httplib2
+import google_auth_httplib2
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
+from googleapiclient.discovery import build, build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.http import HttpRequest
+
+from utils import http_client
+from utils.metrics import upstream_call
+from utils.resilience import TIMEOUTS
 
 # --- Configuration ---
 # Resolve project root: If this file is kitchen_dashboard/utils/google_utils.py
@@ -18,6 +29,25 @@ SECRETS_DIR = PROJECT_ROOT / "auth" / "secrets"
 # Ensure the secrets directory exists (though setup.sh should also do this)
 SECRETS_DIR.mkdir(parents=True, exist_ok=True)
 
+# Refresh access tokens this long before they expire, on the background refresher
+REFRESH_AHEAD = timedelta(minutes=5)
+REFRESHER_MAX_SLEEP = 60  # seconds
+
+# Points every Google client (batch endpoint included) at another host, e.g. the
+# local stand-in used by the benchmarks. Unset in production.
+GOOGLE_API_ROOT_URL = os.getenv("GOOGLE_API_ROOT_URL")
+
+# --- Process-wide registry ---
+# Credentials are keyed by token filename, services by (api, version, token filename).
+# Each key has its own lock so concurrent callers wait on a single load/refresh/build.
+_credentials = {}
+_services = {}
+_key_locks = {}
+_registry_lock = threading.Lock()
+_refresher_thread = None
+_refresher_wakeup = threading.Event()
+_thread_local = threading.local()
+
 def _get_credentials_path(filename_in_secrets_dir):
     """Constructs the full path to a file in the auth/secrets directory."""
     return SECRETS_DIR / filename_in_secrets_dir
@@ -59,7 +89,7 @@ def load_google_creds(token_filename: str, client_secrets_filename: str, scopes:
         if creds and creds.expired and creds.refresh_token:
             try:
                 print(f"🔄 Refreshing token: {token_filename}")
-                creds.refresh(Request())
+                creds.refresh(_token_request())
             except Exception as e:
                 print(f"🔴 ERROR: Failed to refresh token for {token_filename}. Error: {e}")
                 # Fall through to re-authenticate if refresh fails
@@ -99,11 +129,121 @@ def load_google_creds(token_filename: str, client_secrets_filename: str, scopes:
 
     return creds
 
+def _token_request():
+    """
+    Transport for token refreshes that gives up after TIMEOUTS['token'] seconds.
+    It goes through the shared connection pools, so a refresh reuses a kept-alive connection.
+    """
+    return functools.partial(Request(session=http_client.get_session()), timeout=TIMEOUTS["token"])
+
+def _lock_for(key):
+    with _registry_lock:
+        return _key_locks.setdefault(key, threading.Lock())
+
+def _utcnow():
+    # google-auth keeps expiry as a naive UTC datetime
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def _needs_refresh(creds):
+    """True when the token is missing, expired or inside the refresh-ahead window."""
+    if not creds.token:
+        return True
+    if creds.expiry is None:  # Non-expiring credentials
+        return False
+    return creds.expiry - _utcnow() < REFRESH_AHEAD
+
+def _refresh_credentials(token_filename, creds):
+    """Refreshes creds in place and persists the new token. Caller holds the key lock."""
+    print(f"🔄 Refreshing token: {token_filename}")
+    with upstream_call("google_token"):
+        creds.refresh(_token_request())
+    try:
+        with open(_get_credentials_path(token_filename), "w") as token_file:
+            token_file.write(creds.to_json())
+    except Exception as e:
+        print(f"⚠️ Warning: Could not save refreshed token {token_filename}. Error: {e}")
+
+def get_google_credentials(token_filename: str, scopes: list,
+                           client_secrets_filename: str = DEFAULT_CLIENT_SECRETS_FILENAME):
+    """
+    Returns cached credentials for a token file, loading them on first use.
+    Tokens close to expiry are refreshed once, even with many callers waiting.
+
+    Returns:
+        google.oauth2.credentials.Credentials: Authenticated credentials object, or None.
+    """
+    creds = _credentials.get(token_filename)
+    if creds and not _needs_refresh(creds):
+        return creds
+
+    with _lock_for(("creds", token_filename)):
+        creds = _credentials.get(token_filename)
+        if creds is None:
+            creds = load_google_creds(token_filename, client_secrets_filename, scopes)
+            if not creds:
+                return None
+            _credentials[token_filename] = creds
+            _start_refresher()
+        elif _needs_refresh(creds) and creds.refresh_token:
+            try:
+                _refresh_credentials(token_filename, creds)
+            except Exception as e:
+                print(f"🔴 ERROR: Failed to refresh token for {token_filename}. Error: {e}")
+        return creds
+
+def _refresher_loop():
+    """Background thread: refreshes cached tokens shortly before they expire."""
+    while True:
+        next_check = REFRESHER_MAX_SLEEP
+        for token_filename, creds in list(_credentials.items()):
+            if creds.refresh_token and _needs_refresh(creds):
+                with _lock_for(("creds", token_filename)):
+                    if _needs_refresh(creds):
+                        try:
+                            _refresh_credentials(token_filename, creds)
+                        except Exception as e:
+                            print(f"🔴 ERROR: Background refresh failed for {token_filename}. Error: {e}")
+                            continue
+            if creds.expiry is not None:
+                due_in = (creds.expiry - REFRESH_AHEAD - _utcnow()).total_seconds()
+                next_check = min(next_check, max(due_in, 1))
+        _refresher_wakeup.wait(next_check)
+        _refresher_wakeup.clear()
+
+def _start_refresher():
+    global _refresher_thread
+    with _registry_lock:
+        if _refresher_thread is None:
+            _refresher_thread = threading.Thread(target=_refresher_loop, name="google-token-refresher",
+                                                 daemon=True)
+            _refresher_thread.start()
+    _refresher_wakeup.set()
+
+def _build_request(http, *args, **kwargs):
+    """
+    httplib2 is not thread-safe, so a shared service gives every thread its own
+    connection (reused across that thread's calls) bound to the shared credentials.
+    """
+    thread_http = getattr(_thread_local, "http", None)
+    if thread_http is None:
+        thread_http = _thread_local.http = httplib2.Http(timeout=TIMEOUTS["google"])
+    authed_http = google_auth_httplib2.AuthorizedHttp(http.credentials, http=thread_http)
+    return HttpRequest(authed_http, *args, **kwargs)
+
+def _discovery_document(api_name, api_version):
+    """The bundled discovery document, re-rooted at GOOGLE_API_ROOT_URL."""
+    document = json.loads(get_static_doc(api_name, api_version))
+    document["rootUrl"] = GOOGLE_API_ROOT_URL.rstrip("/") + "/"
+    return document
+
 def build_google_service(api_name: str, api_version: str, scopes: list,
                          token_filename: str,
                          client_secrets_filename: str = DEFAULT_CLIENT_SECRETS_FILENAME):
     """
-    Builds and returns an authenticated Google API service client.
+    Returns an authenticated Google API service client.
+    Each client is built once per process from the discovery document bundled with
+    google-api-python-client and then reused; its credentials are kept fresh by the
+    background refresher.
 
     Args:
         api_name (str): Name of the API (e.g., "calendar", "gmail", "photoslibrary").
@@ -117,18 +257,33 @@ def build_google_service(api_name: str, api_version: str, scopes: list,
     Returns:
         googleapiclient.discovery.Resource: Authenticated API service client, or None.
     """
-    print(f"🛠️ Building Google service: {api_name} {api_version} using token '{token_filename}'")
-    creds = load_google_creds(token_filename, client_secrets_filename, scopes)
-    if not creds:
-        print(f"🔴 ERROR: Could not get credentials for service {api_name} using token {token_filename}.")
-        return None
-    try:
-        service = build(api_name, api_version, credentials=creds, static_discovery=False)
-        print(f"✅ Successfully built service: {api_name} {api_version}")
+    key = (api_name, api_version, token_filename)
+    service = _services.get(key)
+    if service is not None:
+        return service
+
+    with _lock_for(("service", key)):
+        if key in _services:
+            return _services[key]
+
+        print(f"🛠️ Building Google service: {api_name} {api_version} using token '{token_filename}'")
+        creds = get_google_credentials(token_filename, scopes, client_secrets_filename)
+        if not creds:
+            print(f"🔴 ERROR: Could not get credentials for service {api_name} using token {token_filename}.")
+            return None
+        try:
+            if GOOGLE_API_ROOT_URL:
+                service = build_from_document(_discovery_document(api_name, api_version), credentials=creds,
+                                              requestBuilder=_build_request)
+            else:
+                service = build(api_name, api_version, credentials=creds, static_discovery=True,
+                                requestBuilder=_build_request)
+            print(f"✅ Successfully built service: {api_name} {api_version}")
+        except Exception as e:
+            print(f"🔴 ERROR: Failed to build service {api_name} {api_version}. Error: {e}")
+            return None
+        _services[key] = service
         return service
-    except Exception as e:
-        print(f"🔴 ERROR: Failed to build service {api_name} {api_version}. Error: {e}")
-        return None
 
 # --- Example Usage (for testing this module directly) ---
 if __name__ == "__main__":
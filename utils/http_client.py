@@ -0,0 +1,123 @@
+# kitchen_dashboard/utils/http_client.py
+
+"""
+The one HTTP client for weather, Graph, photo downloads and OAuth token calls.
+
+Every session mounts the same adapter, so connections to a host are pooled and
+kept alive across threads and providers: a Graph call after a photo download
+reuses the TLS connection instead of handshaking again. Sessions themselves are
+per thread, because a requests.Session is not safe to share between threads.
+
+Requests and newly opened connections are counted per host; the gap between the
+two is the number of handshakes saved (see connection_stats() and /metrics).
+"""
+
+import os
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from utils.metrics import Counter, Gauge
+
+POOL_CONNECTIONS = int(os.getenv('HTTP_POOL_CONNECTIONS', '10'))  # Hosts kept pooled at once
+POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', '4'))  # Idle connections kept per host
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+DEFAULT_HEADERS = {
+    'Accept-Encoding': 'gzip, deflate',
+    'User-Agent': 'kitchen-dashboard',
+}
+
+HTTP_REQUESTS = Counter('dashboard_http_requests_total', 'Outgoing HTTP requests, by host.', ('host',))
+HTTP_CONNECTIONS = Counter('dashboard_http_connections_opened_total',
+                           'New TCP (and TLS) connections opened, by host.', ('host',))
+
+
+class _CountingHTTPPool(HTTPConnectionPool):
+    def _new_conn(self):
+        HTTP_CONNECTIONS.inc(self.host)
+        return super()._new_conn()
+
+
+class _CountingHTTPSPool(HTTPSConnectionPool):
+    def _new_conn(self):
+        HTTP_CONNECTIONS.inc(self.host)
+        return super()._new_conn()
+
+
+class PooledAdapter(HTTPAdapter):
+    """An HTTPAdapter whose pools count the connections they open."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {'http': _CountingHTTPPool, 'https': _CountingHTTPSPool}
+
+    def send(self, request, **kwargs):
+        HTTP_REQUESTS.inc(urlsplit(request.url).hostname)
+        return super().send(request, **kwargs)
+
+
+_adapter = None
+_adapter_lock = threading.Lock()
+_thread_local = threading.local()
+
+
+def _shared_adapter():
+    global _adapter
+    with _adapter_lock:
+        if _adapter is None:
+            _adapter = PooledAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+        return _adapter
+
+
+def new_session():
+    """A session on the shared connection pools, for a client that keeps its own (e.g. MSAL)."""
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    adapter = _shared_adapter()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session():
+    """This thread's session on the shared connection pools."""
+    session = getattr(_thread_local, 'session', None)
+    if session is None:
+        session = _thread_local.session = new_session()
+    return session
+
+
+def get(url, **kwargs):
+    return get_session().get(url, **kwargs)
+
+
+def post(url, **kwargs):
+    return get_session().post(url, **kwargs)
+
+
+def download(url, file, timeout):
+    """Streams a response body into an open binary file without holding it in memory."""
+    with get(url, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+            file.write(chunk)
+
+
+def connection_stats():
+    """Per host: requests sent, connections opened, and the share of requests that reused one."""
+    stats = {}
+    for (host, ), requests_sent in list(HTTP_REQUESTS._series.items()):
+        opened = HTTP_CONNECTIONS.value(host)
+        stats[host] = {
+            'requests': requests_sent,
+            'connections': opened,
+            'reuse_ratio': max(0.0, 1 - opened / requests_sent) if requests_sent else 0.0,
+        }
+    return stats
+
+
+Gauge('dashboard_http_connection_reuse_ratio', 'Share of outgoing requests sent on a kept-alive connection.',
+      ('host',), callback=lambda: {(host, ): s['reuse_ratio'] for host, s in connection_stats().items()})
@@ -0,0 +1,212 @@
+# kitchen_dashboard/utils/metrics.py
+
+"""
+Counters, gauges and histograms rendered in the Prometheus text format, without
+the prometheus_client dependency. Recording a sample is a dict lookup and an add
+under a lock, so instrumentation stays on in production.
+
+Metrics are kept per process: with several gunicorn workers each scrape sees the
+worker that answered it (the snapshot ages come from the shared cache and match
+on every worker).
+"""
+
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from a memo hit up to an upstream timeout
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_registry = []
+_registry_lock = threading.Lock()
+_snapshots = {}
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+    def _samples(self):
+        with self._lock:
+            series = dict(self._series)
+        return [f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+                for labels, value in sorted(series.items())]
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._series.get(labels, 0)
+
+
+class Gauge(_Metric):
+    """A value set directly, or computed at scrape time by callback() -> {label values: value}."""
+    type = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), callback=None):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._series[labels] = value
+
+    def _samples(self):
+        if self.callback is not None:
+            with self._lock:
+                self._series = dict(self.callback())
+        return super()._samples()
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)  # Bucket bounds are inclusive (le)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, *labels):
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def _samples(self):
+        with self._lock:
+            series = {labels: (list(counts), total) for labels, (counts, total) in self._series.items()}
+        lines = []
+        for labels, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                le = _labels(self.labelnames, labels, [("le", _number(bound))])
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+# --- Dashboard metrics ---
+
+REQUEST_LATENCY = Histogram("dashboard_request_duration_seconds",
+                            "Time spent building a response, by route.", ("route", "method"))
+REQUESTS = Counter("dashboard_requests_total", "Responses sent, by route and status.",
+                   ("route", "method", "status"))
+UPSTREAM_LATENCY = Histogram("dashboard_upstream_request_duration_seconds",
+                             "Calls to upstream services (calendar, weather, onedrive, "
+                             "google_token, onedrive_token).", ("provider",))
+UPSTREAM_ERRORS = Counter("dashboard_upstream_errors_total",
+                          "Upstream calls that failed or returned an error status.", ("provider",))
+CACHE_LOOKUPS = Counter("dashboard_cache_lookups_total",
+                        "Cache lookups by cache and result (hit, miss, stale).", ("cache", "result"))
+
+
+def _hit_ratios():
+    totals, hits = {}, {}
+    with CACHE_LOOKUPS._lock:
+        series = dict(CACHE_LOOKUPS._series)
+    for (cache, result), count in series.items():
+        totals[cache] = totals.get(cache, 0) + count
+        if result == "hit":
+            hits[cache] = hits.get(cache, 0) + count
+    return {(cache,): hits.get(cache, 0) / total for cache, total in totals.items() if total}
+
+
+def _snapshot_ages():
+    now = time.time()
+    ages = {}
+    for widget, updated_at in list(_snapshots.items()):
+        try:
+            timestamp = updated_at()
+        except Exception:
+            continue
+        if timestamp is not None:
+            ages[(widget,)] = max(0.0, now - timestamp)
+    return ages
+
+
+Gauge("dashboard_cache_hit_ratio", "Share of lookups answered from cache since the process started.",
+      ("cache",), callback=_hit_ratios)
+Gauge("dashboard_snapshot_age_seconds", "Seconds since a widget's data was last refreshed from upstream.",
+      ("widget",), callback=_snapshot_ages)
+
+
+@contextmanager
+def upstream_call(provider):
+    """Times one call to an upstream service; an exception raised inside counts as an error."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        UPSTREAM_ERRORS.inc(provider)
+        raise
+    finally:
+        UPSTREAM_LATENCY.observe(time.perf_counter() - started, provider)
+
+
+def upstream_error(provider):
+    """Counts a failed upstream call that did not raise (e.g. a non-200 response)."""
+    UPSTREAM_ERRORS.inc(provider)
+
+
+def cache_lookup(cache, result):
+    """Counts a cache lookup; result is 'hit', 'miss' or 'stale' (or a bool for hit/miss)."""
+    if isinstance(result, bool):
+        result = "hit" if result else "miss"
+    CACHE_LOOKUPS.inc(cache, result)
+
+
+def register_snapshot(widget, updated_at):
+    """Reports a widget's snapshot age; updated_at() returns epoch seconds of its last refresh, or None."""
+    _snapshots[widget] = updated_at
+
+
+def render():
+    """Every registered metric in the Prometheus text exposition format."""
+    with _registry_lock:
+        metrics = list(_registry)
+    return "\n".join(metric.render() for metric in metrics) + "\n"
@@ -0,0 +1,124 @@
+# kitchen_dashboard/utils/resilience.py
+
+"""
+Timeouts and circuit breakers for upstream calls.
+
+A breaker opens after FAILURE_THRESHOLD consecutive failures. While it is open,
+calls are rejected at once with CircuitOpenError, and callers serve their last
+good cached data flagged as stale instead of waiting on a dead network. After
+the cool-down one trial call is let through. Each failed trial doubles the
+cool-down (up to MAX_COOLDOWN), with random jitter so pollers do not retry in
+lockstep.
+"""
+
+import os
+import random
+import threading
+import time
+
+from utils.metrics import Gauge
+
+# Seconds to wait for a connection or a response before an upstream call gives up
+TIMEOUTS = {
+    'google': float(os.getenv('GOOGLE_TIMEOUT', '15')),
+    'weather': float(os.getenv('WEATHER_TIMEOUT', '5')),
+    'onedrive': float(os.getenv('ONEDRIVE_TIMEOUT', '10')),
+    'token': float(os.getenv('TOKEN_TIMEOUT', '10')),
+}
+
+FAILURE_THRESHOLD = 3  # Consecutive failures that open a breaker
+BASE_COOLDOWN = 5      # seconds before the first trial call
+MAX_COOLDOWN = 300     # seconds, upper bound for the doubling cool-down
+
+STATES = ('closed', 'half_open', 'open')
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose breaker is open."""
+
+
+class CircuitBreaker:
+
+    def __init__(self, name, failure_threshold=FAILURE_THRESHOLD, base_cooldown=BASE_COOLDOWN,
+                 max_cooldown=MAX_COOLDOWN, clock=time.monotonic, rng=None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self._clock = clock
+        self._rng = rng or random.Random()
+        self._failures = 0
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._failures < self.failure_threshold:
+                return 'closed'
+            return 'open' if self._clock() < self._retry_at else 'half_open'
+
+    def is_open(self):
+        """True while calls would be rejected. Unlike allow(), never uses up the trial call."""
+        return self.state == 'open'
+
+    def allow(self):
+        """
+        True if a call may go ahead. Once the cool-down has passed a single trial is
+        let through; others are held off for BASE_COOLDOWN in case it never reports back.
+        """
+        with self._lock:
+            if self._failures < self.failure_threshold:
+                return True
+            now = self._clock()
+            if now < self._retry_at:
+                return False
+            self._retry_at = now + self.base_cooldown
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                attempt = min(self._failures - self.failure_threshold, 16)
+                cooldown = min(self.max_cooldown, self.base_cooldown * 2 ** attempt)
+                self._retry_at = self._clock() + self._rng.uniform(cooldown / 2, cooldown)
+
+    def call(self, fn, *args, is_failure=None, **kwargs):
+        """
+        Runs fn(*args, **kwargs) unless the breaker is open. Exceptions (and results
+        for which is_failure(result) is true) count as failures.
+        """
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} is unavailable, retrying later")
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        if is_failure is not None and is_failure(result):
+            self.record_failure()
+        else:
+            self.record_success()
+        return result
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name):
+    """The process-wide breaker for an upstream provider (calendar, weather, onedrive)."""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name)
+        return breaker
+
+
+Gauge('dashboard_circuit_state', 'Upstream circuit breakers: 0 closed, 1 half open, 2 open.', ('provider',),
+      callback=lambda: {(name, ): STATES.index(b.state) for name, b in list(_breakers.items())})